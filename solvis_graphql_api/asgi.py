@@ -0,0 +1,240 @@
+"""An ASGI entry point serving `schema_root`, for container (non-Lambda) deployments.
+
+Queries are executed asynchronously on the event loop, and the resolvers of CPU-heavy fields are
+offloaded to the shared resolver thread pool (see `execution.get_executor`). One instance can so
+multiplex many concurrent slow queries without a worker per request, e.g.
+
+    uvicorn solvis_graphql_api.asgi:app --workers 1
+
+To run several worker processes, set PRELOAD_MODEL_IDS and preload the app in the parent process,
+which then loads the solutions before the workers are forked, so they inherit them copy-on-write.
+With SOLUTION_ARRAYS_PATH also set, the rupture x section matrix and ruptures frame arrays are saved
+and memory-mapped by any process that loads the solutions itself (see `shared_arrays.py`), e.g.
+
+    gunicorn solvis_graphql_api.asgi:app --preload --workers 4 -k uvicorn.workers.UvicornWorker
+
+An ASGI server is not a dependency of the package, install the `asgi` extra for uvicorn, e.g.
+`pip install solvis-graphql-api[asgi]`.
+
+The Flask WSGI app in `solvis_graphql_api.py` still serves the Lambda deployment. It shares its CORS
+configuration with this app (see `cors.py`), but the following Flask features are not available here:
+
+ - ETag / `If-None-Match` handling and the in-process response cache (`http_cache.py`).
+ - automatic persisted queries and the parsed document cache (`persisted_queries.py`).
+ - gzip / brotli response compression (`compression.py`), use the ASGI server or a proxy instead.
+ - the GraphiQL page.
+"""
+
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from graphql import GraphQLError, GraphQLSchema
+from graphql.pyutils import is_awaitable
+from graphql_server import (
+    HttpQueryError,
+    encode_execution_results,
+    format_error_default,
+    json_encode,
+    load_json_body,
+    run_http_query,
+)
+from werkzeug.datastructures import Headers
+
+from solvis_graphql_api.composite_solution.cached import preload_solution_arrays
+from solvis_graphql_api.composite_solution.composite_rupture_sections import (
+    SECTION_AGGREGATE_FIELDS,
+)
+from solvis_graphql_api.cors import cors_headers
+from solvis_graphql_api.data_store.config import PRELOAD_MODEL_IDS
+from solvis_graphql_api.execution import (
+    HEAVY_FIELDS,
+    StaticFieldsExecutionContext,
+    get_executor,
+)
+from solvis_graphql_api.schema import schema_root
+
+log = logging.getLogger(__name__)
+
+# fields whose resolvers load solutions or compute aggregates
+OFFLOAD_FIELDS = (
+    HEAVY_FIELDS
+    | SECTION_AGGREGATE_FIELDS
+    | {
+        "composite_solution",
+        "filter_ruptures",
+        "filter_rupture_sections_list",
+        "get_parent_fault_names",
+        "mfd_histograms",
+    }
+)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class OffloadMiddleware:
+    """graphql-core middleware running the resolvers of `fields` in a thread pool executor."""
+
+    def __init__(self, fields: Iterable[str] = OFFLOAD_FIELDS, executor=None):
+        self.fields = frozenset(fields)
+        self.executor = executor
+
+    def resolve(self, next_, root, info, **args):
+        if info.field_name not in self.fields:
+            return next_(root, info, **args)
+        return self.offload(next_, root, info, **args)
+
+    async def offload(self, next_, root, info, **args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor or get_executor(), partial(next_, root, info, **args)
+        )
+
+
+class GraphQLASGIApp:
+    """A minimal ASGI application serving a GraphQL schema at `path`."""
+
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        path: str = "/graphql",
+        middleware: Optional[List[Any]] = None,
+    ):
+        self.schema = schema
+        self.path = path
+        self.middleware = (
+            middleware if middleware is not None else [OffloadMiddleware()]
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(
+            [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in scope["headers"]
+            ]
+        )
+        cors = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in cors_headers(request_headers, scope["method"])
+        ]
+
+        if scope["path"].rstrip("/") != self.path:
+            await self.respond(send, 404, b"Not Found", b"text/plain", cors)
+            return
+
+        request_method = scope["method"].lower()
+        if request_method == "options":
+            await self.respond(send, 204, b"", b"text/plain", cors)
+            return
+
+        try:
+            body = await read_body(receive)
+            data = parse_body(
+                request_headers.get("content-type", "").encode("latin-1"), body
+            )
+            query_data = {
+                key: values[0]
+                for key, values in parse_qs(scope["query_string"].decode()).items()
+            }
+            execution_results, _ = run_http_query(
+                self.schema,
+                request_method,
+                data,
+                query_data=query_data,
+                run_sync=False,
+                middleware=self.middleware,
+                execution_context_class=StaticFieldsExecutionContext,
+            )
+            execution_results = [
+                await result if is_awaitable(result) else result
+                for result in execution_results
+            ]
+            result, status_code = encode_execution_results(
+                execution_results, is_batch=isinstance(data, list)
+            )
+            await self.respond(send, status_code, result.encode(), extra_headers=cors)
+        except HttpQueryError as err:
+            await self.respond(
+                send,
+                err.status_code,
+                json_encode(
+                    dict(errors=[format_error_default(GraphQLError(err.message))])
+                ).encode(),
+                extra_headers=cors
+                + [
+                    (key.lower().encode(), value.encode())
+                    for key, value in (err.headers or {}).items()
+                ],
+            )
+
+    @staticmethod
+    async def respond(
+        send: Send,
+        status: int,
+        body: bytes,
+        content_type: bytes = b"application/json",
+        extra_headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        headers = [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers + (extra_headers or []),
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+def parse_body(content_type: bytes, body: bytes) -> Any:
+    mimetype = content_type.split(b";")[0].strip().decode()
+    if mimetype == "application/graphql":
+        return {"query": body.decode()}
+    elif mimetype == "application/json":
+        return load_json_body(body.decode())
+    elif mimetype == "application/x-www-form-urlencoded":
+        return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+    return {}
+
+
+def create_app() -> GraphQLASGIApp:
+    """Function that creates our ASGI application."""
+    return GraphQLASGIApp(schema_root.graphql_schema)
+
+
+app = create_app()
+
+# with `--preload` this runs in the parent process, before the workers are forked
+if PRELOAD_MODEL_IDS:
+    preload_solution_arrays(PRELOAD_MODEL_IDS)
@@ -1,10 +1,23 @@
 from .composite_rupture_detail import (  # SortRupturesArgs,
     CompositeRuptureDetail,
     CompositeRuptureDetailArgs,
+    NearestRuptureConnection,
     RuptureDetailConnection,
     SimpleSortRupturesArgs,
 )
-from .composite_rupture_sections import CompositeRuptureSections
+from .composite_rupture_sections import (
+    CompositeRuptureSections,
+    LocationRadiiSummary,
+    MagFreqDistHistograms,
+    get_composite_rupture_sections_list,
+    get_location_radii_summary,
+    get_mfd_histograms,
+)
 from .composite_solution import CompositeSolution
-from .filtered_ruptures_args import FilterRupturesArgs, FilterRupturesArgsInput
-from .schema import paginated_filtered_ruptures
+from .filtered_ruptures_args import (
+    FilterRupturesArgs,
+    FilterRupturesArgsInput,
+    LocationRadiiSummaryArgsInput,
+    NearestRupturesArgsInput,
+)
+from .schema import paginated_filtered_ruptures, paginated_nearest_ruptures
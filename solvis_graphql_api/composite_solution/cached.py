@@ -7,10 +7,24 @@ import warnings
 from functools import lru_cache
 
 # from pathlib import Path
-from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Set, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import geopandas as gpd
+import numpy as np
 import nzshm_model
+import pandas as pd
+import shapely
 import solvis
 from nzshm_common.location.location import location_by_id
 from solvis import InversionSolution
@@ -18,8 +32,26 @@ from solvis.filter import FilterRuptureIds
 from solvis.geometry import circle_polygon
 
 from solvis_graphql_api.data_store import model
+from solvis_graphql_api.data_store.archive import RangeReadArchive
+from solvis_graphql_api.data_store.config import SOLUTION_ARRAYS_PATH
+from solvis_graphql_api.data_store.query_cache import QueryCache, get_query_cache
 
+from .filter_key import FilterKey
 from .filter_set_logic_options import _solvis_join
+from .location_filter import (
+    LOCATION_FILTER_ENGINE,
+    SectionLocationFilter,
+    join_rupture_ids,
+)
+from .mfd import build_mfd, build_mfds, grouped_bin_rates, mfd_frames
+from .rupture_section_matrix import RuptureSectionMatrix
+from .shared_arrays import (
+    load_rupture_section_matrix,
+    load_ruptures_frame,
+    save_rupture_section_matrix,
+    save_ruptures_frame,
+)
+from .subsumption import SupersetResults
 
 if TYPE_CHECKING:
     import shapely.geometry.polygon.Polygon
@@ -30,6 +62,14 @@ log = logging.getLogger(__name__)
 
 FAULT_SECTION_LIMIT = 1e4
 
+# the fault systems of a CompositeSolution archive
+FAULT_SYSTEMS = ["CRU", "PUY", "HIK"]
+
+# the FilterKey arguments whose results depend on the location filter engine
+LOCATION_ARGUMENTS = ("location_ids", "points", "polygon")
+
+superset_results = SupersetResults()
+
 
 @lru_cache
 def get_location_polygon(
@@ -84,20 +124,375 @@ def get_polygons(
         )
 
 
+def get_location_points(location_ids: Iterable[str]) -> List[Tuple[float, float]]:
+    """
+    Returns the (latitude, longitude) of each of the given location IDs.
+
+    Args:
+        location_ids (Iterable[str]): An iterable of location IDs.
+
+    Returns:
+        List[Tuple[float, float]]: The location coordinates.
+    """
+    return [
+        (location["latitude"], location["longitude"])
+        for location in map(location_by_id, location_ids)
+    ]
+
+
+def get_site_point(
+    location_id: Union[None, str] = None, point: Union[None, Dict[str, float]] = None
+) -> Tuple[float, float]:
+    """
+    Returns the (latitude, longitude) of a site given by location ID or by point.
+
+    Args:
+        location_id (str): A location ID, takes precedence over point.
+        point (Dict[str, float]): A point with `latitude` and `longitude`.
+
+    Raises:
+        ValueError: if neither is given.
+    """
+    if location_id:
+        return get_location_points([location_id])[0]
+    if point:
+        return (float(point["latitude"]), float(point["longitude"]))
+    raise ValueError("One of `location_id` or `point` is required.")
+
+
+@lru_cache
+def get_filter_polygon(wkt: str) -> "shapely.geometry.base.BaseGeometry":
+    """
+    Returns the (multi)polygon of a FilterKey `polygon`.
+
+    Args:
+        wkt (str): The normalised WKT of the polygon.
+
+    Returns:
+        shapely.geometry.base.BaseGeometry: The polygon.
+    """
+    return shapely.from_wkt(wkt)
+
+
+@lru_cache
+def archive_version(model_id: str) -> str:
+    """Return the identity (S3 ETag) of the stored CompositeSolution archive of model_id."""
+    return get_solution_archive(model_id).etag
+
+
+def query_arguments(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the arguments of a persisted query, with the identity of everything its result depends on.
+
+    A re-uploaded archive gives new keys so that stale results are never read back. Only results
+    filtered by location are keyed by the location filter engine too, so the unfiltered default view
+    artefacts uploaded by the cli are found whatever engine the API runs.
+
+    Args:
+        arguments (Dict[str, Any]): The JSON serialisable arguments, including `model_id`.
+
+    Returns:
+        Dict[str, Any]: The arguments with the archive version, and the location filter engine if
+            they filter by location.
+    """
+    arguments = dict(arguments, archive=archive_version(arguments["model_id"]))
+    if any(arguments.get(name) for name in LOCATION_ARGUMENTS):
+        arguments["location_filter_engine"] = LOCATION_FILTER_ENGINE
+    return arguments
+
+
+def persisted_query(
+    namespace: str,
+    arguments: Dict[str, Any],
+    compute: Callable[[], gpd.GeoDataFrame],
+) -> gpd.GeoDataFrame:
+    """
+    Return the result of `compute()`, via the second-tier query cache when one is configured.
+
+    Args:
+        namespace (str): The name of the cached query.
+        arguments (Dict[str, Any]): The JSON serialisable arguments identifying the result, see
+            `query_arguments`.
+        compute (Callable): Computes the result on a cache miss.
+
+    Returns:
+        gpd.GeoDataFrame: The cached or computed result.
+    """
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return compute()
+
+    arguments = query_arguments(arguments)
+    tic0 = time.perf_counter()
+    result = query_cache.get_dataframe(namespace, arguments)
+    if result is not None:
+        log.debug(
+            "persisted_query(%s): cache hit in %2.3f seconds"
+            % (namespace, time.perf_counter() - tic0)
+        )
+        return result
+
+    result = compute()
+    query_cache.put_dataframe(namespace, arguments, result)
+    return result
+
+
+def query_cache_info() -> Dict[str, Dict[str, Any]]:
+    """
+    Return hit/miss metrics for the in-process caches keyed on FilterKey.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: cache_info fields and hit_ratio for each cached function.
+    """
+    metrics = {}
+    for function in [matched_rupture_sections, fault_section_aggregates, mfd_histogram]:
+        info = function.cache_info()
+        lookups = info.hits + info.misses
+        metrics[function.__name__] = dict(
+            hits=info.hits,
+            misses=info.misses,
+            currsize=info.currsize,
+            hit_ratio=info.hits / lookups if lookups else 0.0,
+        )
+    lookups = superset_results.hits + superset_results.misses
+    metrics["superset_results"] = dict(
+        hits=superset_results.hits,
+        misses=superset_results.misses,
+        currsize=len(superset_results),
+        hit_ratio=superset_results.hits / lookups if lookups else 0.0,
+    )
+    return metrics
+
+
+def source_logic_tree(model_id: str) -> "SourceLogicTree":
+    """
+    Return the source logic tree of a model.
+
+    Raises:
+        ValueError: if nzshm_model has no such model (older nzshm_model versions return None).
+    """
+    model_version = nzshm_model.get_model_version(model_id)
+    if model_version is None:
+        raise ValueError("unknown model_id: %s" % model_id)
+    return model_version.source_logic_tree
+
+
+def fault_system_codes(model_id: str) -> List[str]:
+    """
+    Return the codes of the fault systems in a model, as loaded by `CompositeSolution.from_archive`.
+
+    Args:
+        model_id (str): The ID of the model.
+
+    Returns:
+        List[str]: The fault system codes e.g. `PUY`, `HIK`, `CRU`.
+
+    Raises:
+        ValueError: if nzshm_model has no such model.
+    """
+    slt = source_logic_tree(model_id)
+    return [
+        branch_set.short_name
+        for branch_set in slt.branch_sets
+        if branch_set.short_name in FAULT_SYSTEMS
+    ]
+
+
+@lru_cache
+def get_solution_archive(model_id: str) -> RangeReadArchive:
+    """Return range-read access to the stored CompositeSolution archive of model_id."""
+    blob = model.BinaryLargeObject.get(
+        object_type="CompositeSolution", object_id=model_id
+    )
+    return blob.object_archive()
+
+
+@lru_cache
+def get_fault_system_solution(
+    model_id: str, fault_system: str
+) -> solvis.FaultSystemSolution:
+    """
+    Return one fault system solution of the given model_id.
+
+    Only the `<fault_system>_fault_system_solution.zip` member of the stored CompositeSolution archive
+    is read, see `RangeReadArchive`, so e.g. a CRU query never downloads the HIK and PUY members.
+
+    The solution is loaded in full by each process, only its rupture x section matrix and ruptures
+    frame are memory-mapped from SOLUTION_ARRAYS_PATH when configured, see `shared_arrays.py`.
+
+    Args:
+        model_id (str): The ID of the model.
+        fault_system (str): The fault system code e.g. `CRU`.
+
+    Returns:
+        solvis.FaultSystemSolution: The fault system solution.
+    """
+    log.info("get_fault_system_solution: %s %s" % (model_id, fault_system))
+    archive = get_solution_archive(model_id)
+    fss = solvis.FaultSystemSolution.from_archive(
+        io.BytesIO(archive.read_member(f"{fault_system}_fault_system_solution.zip"))
+    )
+    get_ruptures_with_rupture_rates(model_id, fault_system, fss)
+    get_rupture_section_matrix(model_id, fault_system, fss)
+    if LOCATION_FILTER_ENGINE == "strtree":
+        get_section_location_filter(model_id, fault_system, fss).tree
+    return fss
+
+
 @lru_cache
 def get_composite_solution(model_id: str) -> solvis.CompositeSolution:
     """
     Return a composite solution for the given model_id
 
-    CompositeSolution zip file are stored/retrieved via the BinaryLargeObject class.
+    CompositeSolution zip file are stored/retrieved via the BinaryLargeObject class, the fault system
+    solutions are shared with `get_fault_system_solution`.
     """
     log.info("get_composite_solution: %s" % model_id)
-    assert nzshm_model.get_model_version(model_id) is not None
-    slt = nzshm_model.get_model_version(model_id).source_logic_tree
-    blob = model.BinaryLargeObject.get(
-        object_type="CompositeSolution", object_id=model_id
+    solution = solvis.CompositeSolution(source_logic_tree(model_id))
+    for fault_system in fault_system_codes(model_id):
+        solution.add_fault_system_solution(
+            fault_system, get_fault_system_solution(model_id, fault_system)
+        )
+    return solution
+
+
+@lru_cache
+def get_rupture_section_matrix(
+    model_id: str, fault_system: str, solution: InversionSolution
+) -> RuptureSectionMatrix:
+    """
+    Return the rupture x section incidence matrix for a fault system solution.
+
+    If SOLUTION_ARRAYS_PATH is configured, the matrix arrays are memory-mapped from there when
+    another process has already saved them for this archive version, otherwise they are built and
+    saved for the others.
+
+    Args:
+        model_id (str): The composite solution model id.
+        fault_system (str): The fault system e.g. `CRU`.
+        solution (InversionSolution): The fault system solution.
+
+    Returns:
+        RuptureSectionMatrix: The CSR matrix built from `fault_sections_with_rupture_rates`.
+    """
+    tic0 = time.perf_counter()
+    if SOLUTION_ARRAYS_PATH:
+        matrix = load_rupture_section_matrix(
+            SOLUTION_ARRAYS_PATH, model_id, archive_version(model_id), fault_system
+        )
+        if matrix is not None:
+            log.debug(
+                "get_rupture_section_matrix(): mapped %s matrix in %2.3f seconds"
+                % (matrix.shape, time.perf_counter() - tic0)
+            )
+            return matrix
+
+    matrix = RuptureSectionMatrix.from_fault_sections_with_rupture_rates(
+        solution.model.fault_sections_with_rupture_rates
+    )
+    log.debug(
+        "get_rupture_section_matrix(): built %s matrix with %s entries in %2.3f seconds"
+        % (matrix.shape, matrix.nnz, time.perf_counter() - tic0)
+    )
+    if SOLUTION_ARRAYS_PATH:
+        save_rupture_section_matrix(
+            matrix,
+            SOLUTION_ARRAYS_PATH,
+            model_id,
+            archive_version(model_id),
+            fault_system,
+        )
+    return matrix
+
+
+@lru_cache
+def get_ruptures_with_rupture_rates(
+    model_id: str, fault_system: str, solution: InversionSolution
+) -> pd.DataFrame:
+    """
+    Return the ruptures_with_rupture_rates frame of a fault system solution.
+
+    If SOLUTION_ARRAYS_PATH is configured, the columns are memory-mapped from there when another
+    process has already saved them for this archive version, otherwise they are saved for the others.
+
+    Args:
+        model_id (str): The composite solution model id.
+        fault_system (str): The fault system e.g. `CRU`.
+        solution (InversionSolution): The fault system solution.
+
+    Returns:
+        pd.DataFrame: The ruptures with their rates, read-only when memory-mapped.
+
+    Note:
+        Only the frame returned here is shared, `solution.model.ruptures_with_rupture_rates` is still
+        built privately if solvis code reads it.
+    """
+    tic0 = time.perf_counter()
+    if SOLUTION_ARRAYS_PATH:
+        ruptures = load_ruptures_frame(
+            SOLUTION_ARRAYS_PATH, model_id, archive_version(model_id), fault_system
+        )
+        if ruptures is not None:
+            log.debug(
+                "get_ruptures_with_rupture_rates(): mapped %s frame in %2.3f seconds"
+                % (ruptures.shape, time.perf_counter() - tic0)
+            )
+            return ruptures
+
+    ruptures = solution.model.ruptures_with_rupture_rates
+    if SOLUTION_ARRAYS_PATH:
+        save_ruptures_frame(
+            ruptures,
+            SOLUTION_ARRAYS_PATH,
+            model_id,
+            archive_version(model_id),
+            fault_system,
+        )
+    return ruptures
+
+
+def preload_solution_arrays(model_ids: Iterable[str]) -> None:
+    """
+    Load the fault system solutions of each model, saving their shared arrays.
+
+    Call this in the parent process before worker processes are forked (e.g. with `gunicorn
+    --preload`, see `asgi.py`). The workers then inherit the loaded solutions copy-on-write, and the
+    matrix and ruptures frame arrays are saved for any process that loads the solutions itself
+    (e.g. a restarted worker), which maps them rather than building its own.
+
+    Args:
+        model_ids (Iterable[str]): The ids of the models to load.
+    """
+    for model_id in model_ids:
+        for fault_system in fault_system_codes(model_id):
+            tic0 = time.perf_counter()
+            get_fault_system_solution(model_id, fault_system)
+            log.info(
+                "preload_solution_arrays(): loaded %s %s in %2.3f seconds"
+                % (model_id, fault_system, time.perf_counter() - tic0)
+            )
+    # boto3 clients (and their connections) must not be shared by forked processes
+    model.reset_s3_pool()
+
+
+@lru_cache
+def get_section_location_filter(
+    model_id: str, fault_system: str, solution: InversionSolution
+) -> SectionLocationFilter:
+    """
+    Return the section geometries of a fault system solution, prepared for location filtering.
+
+    Args:
+        model_id (str): The composite solution model id.
+        fault_system (str): The fault system e.g. `CRU`.
+        solution (InversionSolution): The fault system solution.
+
+    Returns:
+        SectionLocationFilter: The location filter for the fault system solution.
+    """
+    return SectionLocationFilter.from_solution(
+        solution, get_rupture_section_matrix(model_id, fault_system, solution)
     )
-    return solvis.CompositeSolution.from_archive(io.BytesIO(blob.object_blob), slt)
 
 
 @lru_cache
@@ -117,7 +512,6 @@ def get_rupture_ids_for_fault_names(
     )
 
 
-@lru_cache
 def matched_rupture_sections_gdf(
     model_id: str,
     fault_system: str,
@@ -135,68 +529,280 @@ def matched_rupture_sections_gdf(
     Query the solvis.CompositeSolution instance identified by model ID.
 
     return a dataframe of the matched ruptures.
+
+    The arguments are normalised to a FilterKey, the unused `union` argument is ignored.
     """
-    log.debug(
-        "matched_rupture_sections_gdf()  filter_set_options: %s" % filter_set_options
+    return matched_rupture_sections(
+        FilterKey.create(
+            model_id,
+            fault_system,
+            location_ids=location_ids,
+            radius_km=radius_km,
+            min_rate=min_rate,
+            max_rate=max_rate,
+            min_mag=min_mag,
+            max_mag=max_mag,
+            corupture_fault_names=corupture_fault_names,
+            filter_set_options=filter_set_options,
+        )
     )
 
-    tic0 = time.perf_counter()
-    composite_solution = get_composite_solution(model_id)
 
-    fss = composite_solution._solutions[fault_system]
+@lru_cache
+def matched_rupture_sections(filter_key: FilterKey) -> gpd.GeoDataFrame:
+    """
+    Return a dataframe of the ruptures matching the filter_key.
+
+    A filter differing from a previous one only by narrower magnitude/rate ranges is answered
+    from that previous result, see `SupersetResults`.
+
+    Args:
+        filter_key (FilterKey): The normalised filter arguments.
+
+    Returns:
+        gpd.GeoDataFrame: The matched rows of `ruptures_with_rupture_rates`.
+    """
+    log.debug("matched_rupture_sections() filter_key: %s" % (filter_key,))
+    ruptures = superset_results.get(filter_key)
+    if ruptures is None:
+        ruptures = persisted_query(
+            "matched_rupture_sections",
+            filter_key.as_dict(),
+            lambda: _matched_rupture_sections(filter_key),
+        )
+    superset_results.put(filter_key, ruptures)
+    return ruptures
+
+
+@lru_cache
+def mfd_histogram(filter_key: FilterKey) -> pd.DataFrame:
+    """
+    Return the magnitude frequency distribution of the ruptures matching filter_key.
+
+    Args:
+        filter_key (FilterKey): the normalised filter arguments.
+
+    Returns:
+        pd.DataFrame: the `bin_center`, `rate` and `cumulative_rate` columns, see `mfd.build_mfd`.
+    """
+    return persisted_query(
+        "mfd_histogram",
+        filter_key.as_dict(),
+        lambda: build_mfd(matched_rupture_sections(filter_key)),
+    )
+
+
+def mfd_histograms(filter_keys: Sequence[FilterKey]) -> List[pd.DataFrame]:
+    """
+    Return the magnitude frequency distributions of several filters, with aligned bins.
+
+    The matched ruptures of each distinct filter come from the shared `matched_rupture_sections`
+    cache, then all the histograms are binned in a single pass.
+
+    Args:
+        filter_keys (Sequence[FilterKey]): the normalised filter arguments.
+
+    Returns:
+        List[pd.DataFrame]: a histogram for each filter key, see `mfd.build_mfds`.
+    """
+    distinct_keys = list(dict.fromkeys(filter_keys))
+    histograms = dict(
+        zip(
+            distinct_keys,
+            build_mfds([matched_rupture_sections(key) for key in distinct_keys]),
+        )
+    )
+    return [histograms[key] for key in filter_keys]
+
+
+def _matched_rupture_sections(filter_key: FilterKey) -> gpd.GeoDataFrame:
+    tic0 = time.perf_counter()
+    fss = get_fault_system_solution(filter_key.model_id, filter_key.fault_system)
     tic1 = time.perf_counter()
     log.debug(
-        "matched_rupture_sections_gdf(): time to load fault system solution: %2.3f seconds"
+        "matched_rupture_sections(): time to load fault system solution: %2.3f seconds"
         % (tic1 - tic0)
     )
 
-    df0 = fss.model.ruptures_with_rupture_rates
+    df0 = get_ruptures_with_rupture_rates(
+        filter_key.model_id, filter_key.fault_system, fss
+    )
 
     # attribute filters
-    df0 = df0 if not max_mag else df0[df0.Magnitude <= max_mag]
-    df0 = df0 if not min_mag else df0[df0.Magnitude > min_mag]
-    df0 = df0 if not max_rate else df0[df0.rate_weighted_mean <= max_rate]
-    df0 = df0 if not min_rate else df0[df0.rate_weighted_mean > min_rate]
+    df0 = filter_key.filter_attributes(df0)
 
     tic2 = time.perf_counter()
     log.debug(
-        "matched_rupture_sections_gdf(): time apply attribute filters: %2.3f seconds"
+        "matched_rupture_sections(): time apply attribute filters: %2.3f seconds"
         % (tic2 - tic1)
     )
 
     # rupture filter
     flt_rupture_ids = FilterRuptureIds(fss)
-    if corupture_fault_names and len(corupture_fault_names):
-        fault_join_type = _solvis_join(filter_set_options, "multiple_faults")
+    if filter_key.corupture_fault_names:
         rupture_ids = flt_rupture_ids.for_parent_fault_names(
-            corupture_fault_names, join_type=fault_join_type
+            filter_key.corupture_fault_names,
+            join_type=filter_key.join_type("multiple_faults"),
         )
         df0 = df0[df0["Rupture Index"].isin(list(rupture_ids))]
 
     tic3 = time.perf_counter()
     log.debug(
-        "matched_rupture_sections_gdf(): time apply co-rupture filter: %2.3f seconds"
+        "matched_rupture_sections(): time apply co-rupture filter: %2.3f seconds"
         % (tic3 - tic2)
     )
 
-    # location filters
-    if location_ids is not None and len(location_ids):
-        location_join_type = _solvis_join(filter_set_options, "multiple_locations")
-        polygons = get_polygons(location_ids, radius_km)
-        rupture_ids = flt_rupture_ids.for_polygons(
-            polygons, join_type=location_join_type
-        )
+    # location filters, the named locations, then the points, then the polygon. Every engine joins
+    # the parts in this order, each list in the order of the key (the client's order for DIFFERENCE)
+    if filter_key.has_locations:
+        join_type = filter_key.join_type("multiple_locations")
+        points = get_location_points(filter_key.location_ids) + list(filter_key.points)
+        circles = [
+            get_location_polygon(filter_key.radius_km, lat=lat, lon=lon)
+            for lat, lon in points
+        ]
+        areas = [get_filter_polygon(filter_key.polygon)] if filter_key.polygon else []
+        if LOCATION_FILTER_ENGINE == "solvis":
+            rupture_ids = flt_rupture_ids.for_polygons(
+                circles + areas, join_type=join_type
+            )
+        else:
+            location_filter = get_section_location_filter(
+                filter_key.model_id, filter_key.fault_system, fss
+            )
+            if LOCATION_FILTER_ENGINE == "distance":
+                rupture_id_sets = [
+                    location_filter.rupture_ids_for_locations(
+                        [point], filter_key.radius_km
+                    )
+                    for point in points
+                ]
+                # areas have no distance table, use the spatial index
+                rupture_id_sets += [
+                    location_filter.rupture_ids_for_polygons([area]) for area in areas
+                ]
+                rupture_ids = join_rupture_ids(rupture_id_sets, join_type)
+            else:
+                rupture_ids = location_filter.rupture_ids_for_polygons(
+                    circles + areas,
+                    join_type=join_type,
+                    engine=LOCATION_FILTER_ENGINE,
+                )
         df0 = df0[df0["Rupture Index"].isin(rupture_ids)]
 
     tic4 = time.perf_counter()
     log.debug(
-        "matched_rupture_sections_gdf(): time apply location filters: %2.3f seconds"
+        "matched_rupture_sections(): time apply location filters: %2.3f seconds"
         % (tic4 - tic3)
     )
     return df0
 
 
-@lru_cache
+@lru_cache(maxsize=256)
+def nearest_ruptures(
+    model_id: str,
+    fault_system: str,
+    lat: float,
+    lon: float,
+    max_distance_km: Union[None, float] = None,
+    min_rate: Union[None, float] = None,
+    min_mag: Union[None, float] = None,
+    max_mag: Union[None, float] = None,
+) -> pd.DataFrame:
+    """
+    Return the ruptures of a fault system ranked by their minimum distance to a location.
+
+    Args:
+        model_id (str): The ID of the model.
+        fault_system (str): The fault system e.g. `PUY`.
+        lat (float): The latitude of the location.
+        lon (float): The longitude of the location.
+        max_distance_km (float): Optionally exclude ruptures further than this from the location.
+        min_rate, min_mag, max_mag: Optional rupture attribute ranges, as for the rupture filters.
+
+    Returns:
+        pd.DataFrame: `Rupture Index`, `distance_km`, `rate_weighted_mean` and `Magnitude` columns,
+        ordered by distance and then by descending rate.
+    """
+    fss = get_fault_system_solution(model_id, fault_system)
+    location_filter = get_section_location_filter(model_id, fault_system, fss)
+    matrix = location_filter.matrix
+
+    df0 = pd.DataFrame(
+        {
+            "Rupture Index": matrix.rupture_ids,
+            "distance_km": location_filter.rupture_distances(lat, lon),
+            "rate_weighted_mean": matrix.rates,
+            "Magnitude": matrix.magnitudes,
+        }
+    )
+    df0 = FilterKey.create(
+        model_id, fault_system, min_rate=min_rate, min_mag=min_mag, max_mag=max_mag
+    ).filter_attributes(df0)
+    if max_distance_km is not None:
+        df0 = df0[df0.distance_km <= max_distance_km]
+    return df0.sort_values(
+        by=["distance_km", "rate_weighted_mean"], ascending=[True, False]
+    ).reset_index(drop=True)
+
+
+@lru_cache(maxsize=256)
+def location_radii_summary(
+    model_id: str,
+    fault_system: str,
+    lat: float,
+    lon: float,
+    radii_km: Tuple[float, ...],
+    min_rate: Union[None, float] = None,
+    min_mag: Union[None, float] = None,
+    max_mag: Union[None, float] = None,
+) -> Tuple[pd.DataFrame, List[pd.DataFrame]]:
+    """
+    Summarise the ruptures within each of several radii of a location, in one pass.
+
+    The ruptures of `nearest_ruptures` are sorted by distance, so the ruptures within each radius are a
+    prefix of them. Each rupture is assigned the ring of the smallest radius containing it, the ring
+    counts, rates and MFD bin rates are binned once and accumulated over the rings.
+
+    Args:
+        radii_km (Tuple[float, ...]): The ascending radii in km.
+
+    Returns:
+        Tuple[pd.DataFrame, List[pd.DataFrame]]: the `radius_km`, `rupture_count` and `total_rate` of
+        each radius, and the MFD histogram (see `build_mfd`) of each radius.
+    """
+    ruptures = nearest_ruptures(
+        model_id,
+        fault_system,
+        lat=lat,
+        lon=lon,
+        max_distance_km=max(radii_km),
+        min_rate=min_rate,
+        min_mag=min_mag,
+        max_mag=max_mag,
+    )
+    distances = ruptures.distance_km.to_numpy()
+    rates = ruptures.rate_weighted_mean.to_numpy(dtype="float64")
+    prefix_lengths = np.searchsorted(distances, radii_km, side="right")
+    total_rates = np.concatenate([[0.0], np.cumsum(rates)])[prefix_lengths]
+
+    rings = np.searchsorted(radii_km, distances, side="left")
+    ring_bin_rates = grouped_bin_rates(
+        ruptures.Magnitude.to_numpy(dtype="float64", na_value=np.nan),
+        rates,
+        rings,
+        len(radii_km),
+    )
+    summary = pd.DataFrame(
+        {
+            "radius_km": radii_km,
+            "rupture_count": prefix_lengths,
+            "total_rate": total_rates,
+        }
+    )
+    return summary, mfd_frames(ring_bin_rates.cumsum(axis=0))
+
+
 def fault_section_aggregates_gdf(
     model_id: str,
     fault_system: str,
@@ -214,6 +820,8 @@ def fault_section_aggregates_gdf(
     """
     Query the solvis.CompositeSolution instance identified by model ID.
 
+    The arguments are normalised to a FilterKey, see `fault_section_aggregates()`.
+
     Args:
         model_id (str): The ID of the model to query.
         fault_system (str): The name of the fault system to consider.
@@ -224,70 +832,82 @@ def fault_section_aggregates_gdf(
         min_mag (float): The minimum magnitude to filter by.
         max_mag (float): The maximum magnitude to filter by.
         filter_set_options (Tuple[Any]): A tuple of filter set options.
-        union (bool, optional): Whether to union the results. Defaults to False.
+        union (bool, optional): Unused, retained for compatibility. Defaults to False.
         trace_only (bool, optional): Whether to return only the fault traces. Defaults to False.
         corupture_fault_names (Union[None, Tuple[str]], optional): The names of the faults to consider for co-ruptures. Defaults to None.
 
     Returns:
         gpd.GeoDataFrame: A GeoDataFrame containing the fault section aggregates.
     """
+    return fault_section_aggregates(
+        FilterKey.create(
+            model_id,
+            fault_system,
+            location_ids=location_ids,
+            radius_km=radius_km,
+            min_rate=min_rate,
+            max_rate=max_rate,
+            min_mag=min_mag,
+            max_mag=max_mag,
+            corupture_fault_names=corupture_fault_names,
+            filter_set_options=filter_set_options,
+        ),
+        trace_only=trace_only,
+    )
+
+
+@lru_cache
+def fault_section_aggregates(
+    filter_key: FilterKey, trace_only: bool = False
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate the rupture rates and magnitudes of the ruptures matching filter_key by fault section.
+
+    Args:
+        filter_key (FilterKey): The normalised filter arguments.
+        trace_only (bool, optional): Whether to return only the fault traces. Defaults to False.
+
+    Returns:
+        gpd.GeoDataFrame: A GeoDataFrame containing the fault section aggregates.
+    """
+    return persisted_query(
+        "fault_section_aggregates",
+        dict(filter_key.as_dict(), trace_only=trace_only),
+        lambda: _fault_section_aggregates(filter_key, trace_only),
+    )
+
+
+def _fault_section_aggregates(
+    filter_key: FilterKey, trace_only: bool
+) -> gpd.GeoDataFrame:
     tic0 = time.perf_counter()
-    composite_solution = get_composite_solution(model_id)
-    fss = composite_solution._solutions[fault_system]
+    fss = get_fault_system_solution(filter_key.model_id, filter_key.fault_system)
 
     tic1 = time.perf_counter()
     log.debug(
-        "fault_section_aggregates_gdf(): time to load fault system solution: %2.3f seconds"
+        "fault_section_aggregates(): time to load fault system solution: %2.3f seconds"
         % (tic1 - tic0)
     )
 
-    df0 = matched_rupture_sections_gdf(
-        model_id,
-        fault_system,
-        location_ids,
-        radius_km,
-        min_rate,
-        max_rate,
-        min_mag,
-        max_mag,
-        filter_set_options,
-        union,
-        corupture_fault_names,
-    )
+    df0 = matched_rupture_sections(filter_key)
 
     tic2 = time.perf_counter()
     log.debug(
-        "fault_section_aggregates_gdf(): time to filter rupture sections: %2.3f seconds"
+        "fault_section_aggregates(): time to filter rupture sections: %2.3f seconds"
         % (tic2 - tic1)
     )
 
-    fsr = fss.model.fault_sections_with_rupture_rates
-    fsr = fsr[fsr["Rupture Index"].isin(df0["Rupture Index"].unique())]
+    matrix = get_rupture_section_matrix(
+        filter_key.model_id, filter_key.fault_system, fss
+    )
+    section_aggregates = matrix.section_aggregates(df0["Rupture Index"])
 
     tic3 = time.perf_counter()
     log.debug(
-        "fault_section_aggregates_gdf(): time to filter fault sections: %2.3f seconds"
+        "fault_section_aggregates(): time to aggregate fault sections: %2.3f seconds"
         % (tic3 - tic2)
     )
 
-    section_aggregates = fsr.pivot_table(
-        index=["section"],
-        aggfunc=dict(
-            rate_weighted_mean=["sum", "min", "max", "mean"],
-            Magnitude=["count", "min", "max", "mean"],
-        ),
-    )
-
-    tic4 = time.perf_counter()
-    log.debug(
-        "fault_section_aggregates_gdf(): time to aggregate fault sections: %2.3f seconds"
-        % (tic4 - tic3)
-    )
-
-    section_aggregates.columns = [
-        ".".join(a) for a in section_aggregates.columns.to_flat_index()
-    ]
-
     if trace_only:
         rupture_sections_gdf = gpd.GeoDataFrame(
             section_aggregates.join(
@@ -300,10 +920,10 @@ def fault_section_aggregates_gdf(
             fss.fault_surfaces(), "section", how="inner", rsuffix="_R"
         )
         rupture_sections_gdf = gpd.GeoDataFrame(section_aggregates_detail)
-        tic5 = time.perf_counter()
+        tic4 = time.perf_counter()
         log.debug(
-            "fault_section_aggregates_gdf(): time to build fault surfaces: %2.3f seconds"
-            % (tic5 - tic4)
+            "fault_section_aggregates(): time to build fault surfaces: %2.3f seconds"
+            % (tic4 - tic3)
         )
 
     section_count = (
@@ -313,3 +933,112 @@ def fault_section_aggregates_gdf(
         raise ValueError("No fault sections satisfy the filter.")
 
     return rupture_sections_gdf
+
+
+def default_filter_key(model_id: str, fault_system: str) -> FilterKey:
+    """Return the FilterKey of the unfiltered (default) view of a fault system."""
+    return FilterKey.create(model_id, fault_system)
+
+
+def _fault_systems(model_id: str) -> pd.DataFrame:
+    return pd.DataFrame(dict(fault_system=fault_system_codes(model_id)))
+
+
+def _parent_fault_names(model_id: str, fault_system: str) -> pd.DataFrame:
+    fss = get_fault_system_solution(model_id, fault_system)
+    return pd.DataFrame(dict(parent_fault_name=parent_fault_names(fss)))
+
+
+@lru_cache
+def get_fault_systems(model_id: str) -> List[str]:
+    """
+    Return the fault system names of a model, without loading the solution if they are persisted.
+
+    Args:
+        model_id (str): The ID of the model.
+
+    Returns:
+        List[str]: The fault system names e.g. `CRU`, `PUY`, `HIK`.
+    """
+    fault_systems = persisted_query(
+        "fault_systems", dict(model_id=model_id), lambda: _fault_systems(model_id)
+    )
+    return fault_systems["fault_system"].tolist()
+
+
+@lru_cache
+def get_parent_fault_names(model_id: str, fault_system: str) -> List[str]:
+    """
+    Return the parent fault names of a fault system, without loading the solution if they are persisted.
+
+    Args:
+        model_id (str): The ID of the model.
+        fault_system (str): The name of the fault system.
+
+    Returns:
+        List[str]: The parent fault names.
+    """
+    names = persisted_query(
+        "parent_fault_names",
+        dict(model_id=model_id, fault_system=fault_system),
+        lambda: _parent_fault_names(model_id, fault_system),
+    )
+    return names["parent_fault_name"].tolist()
+
+
+def precompute_default_artefacts(
+    model_id: str, query_cache: QueryCache
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Compute the default view artefacts of a model and store them in the query cache.
+
+    The artefacts are the model's fault systems and, for each fault system, the unfiltered matched
+    ruptures, fault section aggregates (surfaces and traces), MFD and parent fault names. These are
+    stored under the same keys as `persisted_query` uses, so the default view is served without
+    loading the CompositeSolution. Existing artefacts are replaced, and the keys include the archive
+    version so results persisted for a previous upload are never read back.
+
+    Args:
+        model_id (str): The ID of the model, its CompositeSolution must already be stored.
+        query_cache (QueryCache): The query cache to store the artefacts in.
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: The namespace and arguments of each stored artefact.
+    """
+    fault_systems = _fault_systems(model_id)
+    artefacts: List[Tuple[str, Dict[str, Any], Callable[[], pd.DataFrame]]] = [
+        ("fault_systems", dict(model_id=model_id), lambda: fault_systems)
+    ]
+    for fault_system in fault_systems["fault_system"]:
+        filter_key = default_filter_key(model_id, fault_system)
+        ruptures = _matched_rupture_sections(filter_key)
+        artefacts += [
+            ("matched_rupture_sections", filter_key.as_dict(), lambda r=ruptures: r),
+            (
+                "fault_section_aggregates",
+                dict(filter_key.as_dict(), trace_only=False),
+                lambda k=filter_key: _fault_section_aggregates(k, False),
+            ),
+            (
+                "fault_section_aggregates",
+                dict(filter_key.as_dict(), trace_only=True),
+                lambda k=filter_key: _fault_section_aggregates(k, True),
+            ),
+            ("mfd_histogram", filter_key.as_dict(), lambda r=ruptures: build_mfd(r)),
+            (
+                "parent_fault_names",
+                dict(model_id=model_id, fault_system=fault_system),
+                lambda fs=fault_system: _parent_fault_names(model_id, fs),
+            ),
+        ]
+
+    stored = []
+    for namespace, arguments, compute in artefacts:
+        tic0 = time.perf_counter()
+        query_cache.put_dataframe(namespace, query_arguments(arguments), compute())
+        log.info(
+            "precompute_default_artefacts(): stored %s %s in %2.3f seconds"
+            % (namespace, arguments, time.perf_counter() - tic0)
+        )
+        stored.append((namespace, arguments))
+    return stored
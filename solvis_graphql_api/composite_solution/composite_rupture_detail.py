@@ -13,7 +13,7 @@ from solvis_graphql_api.geojson_style import (
     apply_geojson_style,
 )
 
-from .cached import get_composite_solution
+from .cached import get_fault_system_solution, get_ruptures_with_rupture_rates
 
 # from graphene.types import Scalar
 # from graphql.language import ast
@@ -39,8 +39,8 @@ def rupture_detail(
     Returns:
         pandas.DataFrame: A DataFrame containing the details of the specified rupture.
     """
-    fss = get_composite_solution(model_id).get_fault_system_solution(fault_system)
-    sr = fss.model.ruptures_with_rupture_rates
+    fss = get_fault_system_solution(model_id, fault_system)
+    sr = get_ruptures_with_rupture_rates(model_id, fault_system, fss)
     return sr[sr["Rupture Index"] == rupture_index]
 
 
@@ -171,10 +171,8 @@ class CompositeRuptureDetail(graphene.ObjectType):
         log.info(
             f"resolve resolve_fault_surfaces : {root.model_id}, {root.fault_system} style: {style}"
         )
-        composite_solution = get_composite_solution(root.model_id)
-        rupture_surface_gdf = composite_solution._solutions[
-            root.fault_system
-        ].rupture_surface(root.rupture_index)
+        fss = get_fault_system_solution(root.model_id, root.fault_system)
+        rupture_surface_gdf = fss.rupture_surface(root.rupture_index)
 
         rupture_surface_gdf = rupture_surface_gdf.drop(
             columns=[
@@ -208,6 +206,20 @@ class RuptureDetailConnection(relay.Connection):
     total_count = graphene.Int()
 
 
+class NearestRuptureConnection(relay.Connection):
+    """Ruptures ranked by their minimum distance to a site."""
+
+    class Meta:
+        node = CompositeRuptureDetail
+
+    class Edge:
+        distance_km = graphene.Float(
+            description="minimum distance (km) from the rupture's fault sections to the site"
+        )
+
+    total_count = graphene.Int()
+
+
 class CompositeRuptureDetailArgs(graphene.InputObjectType):
     model_id = graphene.String()
     fault_system = graphene.String(
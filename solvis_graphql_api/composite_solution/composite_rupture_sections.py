@@ -2,9 +2,12 @@
 
 import json
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
 
 import graphene
-import pandas as pd
 
 from solvis_graphql_api.color_scale import (
     ColorScale,
@@ -18,27 +21,55 @@ from solvis_graphql_api.geojson_style import (
     GeojsonLineStyleArgumentsInput,
 )
 
-from .cached import fault_section_aggregates_gdf, matched_rupture_sections_gdf
+from . import cached
+from .cached import (
+    fault_section_aggregates,
+    get_site_point,
+    location_radii_summary,
+    matched_rupture_sections,
+    mfd_histogram,
+    mfd_histograms,
+    query_cache_info,
+)
+from .filter_key import FilterKey
 from .filtered_ruptures_args import FilterRupturesArgs
 
 log = logging.getLogger(__name__)
 
+BATCH_QUERY_WORKERS = int(os.getenv("BATCH_QUERY_WORKERS", "4"))
+
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor_lock = threading.Lock()
+
+# CompositeRuptureSections fields resolved from each of the cached aggregates
+SECTION_AGGREGATE_FIELDS = {
+    "section_count",
+    "max_magnitude",
+    "min_magnitude",
+    "max_participation_rate",
+    "min_participation_rate",
+    "fault_surfaces",
+    "color_scale",
+}
+
+
+# aggregate columns not included in the styled fault surfaces and traces
+UNSTYLED_COLUMNS = [
+    "rate_weighted_mean.max",
+    "rate_weighted_mean.min",
+    "rate_weighted_mean.mean",
+    "Target Slip Rate",
+    "Target Slip Rate StdDev",
+]
+
 
 def get_fault_section_aggregates(filter_args, trace_only=False):
     log.debug(">>> get_fault_section_aggregates")
-    return fault_section_aggregates_gdf(
-        filter_args.model_id,
-        filter_args.fault_system,
-        tuple(filter_args.location_ids),
-        filter_args.radius_km,
-        min_rate=filter_args.minimum_rate or 1e-20,
-        max_rate=filter_args.maximum_rate,
-        min_mag=filter_args.minimum_mag,
-        max_mag=filter_args.maximum_mag,
-        filter_set_options=frozenset(dict(filter_args.filter_set_options).items()),
-        trace_only=trace_only,
-        corupture_fault_names=tuple(filter_args.corupture_fault_names),
+    fault_sections_gdf = fault_section_aggregates(
+        FilterKey.from_filter_args(filter_args), trace_only=trace_only
     )
+    log.debug("fault_section_aggregates cache_info: %s" % query_cache_info())
+    return fault_sections_gdf
 
 
 class MagFreqDist(graphene.ObjectType):
@@ -47,6 +78,182 @@ class MagFreqDist(graphene.ObjectType):
     cumulative_rate = graphene.Float()
 
 
+class MagFreqDistSeries(graphene.ObjectType):
+    """The MFD of one filter, aligned with MagFreqDistHistograms.bin_centers."""
+
+    filter_arguments = graphene.Field(FilterRupturesArgs)
+    rates = graphene.List(graphene.Float)
+    cumulative_rates = graphene.List(graphene.Float)
+
+
+class MagFreqDistHistograms(graphene.ObjectType):
+    """
+    The magnitude frequency distributions of several filters, computed together.
+
+    Every series shares the same bins, so `rates[i]` and `cumulative_rates[i]` of each series are for
+    `bin_centers[i]`.
+    """
+
+    bin_centers = graphene.List(graphene.Float)
+    histograms = graphene.List(MagFreqDistSeries)
+
+
+def get_mfd_histograms(filters) -> MagFreqDistHistograms:
+    log.debug(">>> get_mfd_histograms")
+    filter_arguments = [FilterRupturesArgs(**filter) for filter in filters]
+    histograms = mfd_histograms(
+        [FilterKey.from_filter_args(filter_args) for filter_args in filter_arguments]
+    )
+    log.debug("mfd_histograms cache_info: %s" % query_cache_info())
+    return MagFreqDistHistograms(
+        bin_centers=histograms[0].bin_center.tolist() if histograms else [],
+        histograms=[
+            MagFreqDistSeries(
+                filter_arguments=filter_args,
+                rates=histogram.rate.tolist(),
+                cumulative_rates=histogram.cumulative_rate.tolist(),
+            )
+            for filter_args, histogram in zip(filter_arguments, histograms)
+        ],
+    )
+
+
+class RadiusSummary(graphene.ObjectType):
+    """The ruptures within a radius of the site."""
+
+    radius_km = graphene.Float()
+    rupture_count = graphene.Int()
+    total_rate = graphene.Float(description="sum of rate_weighted_mean of the ruptures")
+    rates = graphene.List(graphene.Float)
+    cumulative_rates = graphene.List(graphene.Float)
+
+
+class LocationRadiiSummary(graphene.ObjectType):
+    """
+    Rupture counts, rates and MFDs within each radius of a radii set, computed together.
+
+    Every radius shares the same MFD bins, so `rates[i]` and `cumulative_rates[i]` of each radius are
+    for `bin_centers[i]`.
+    """
+
+    radii_set_id = graphene.Int()
+    bin_centers = graphene.List(graphene.Float)
+    radii = graphene.List(RadiusSummary)
+
+
+def get_location_radii_summary(
+    site, radii_set_id: int, radii_m: List[float]
+) -> LocationRadiiSummary:
+    log.debug(">>> get_location_radii_summary")
+    lat, lon = get_site_point(site.get("location_id"), site.get("point"))
+    summary, histograms = location_radii_summary(
+        site["model_id"],
+        site["fault_system"],
+        lat=lat,
+        lon=lon,
+        radii_km=tuple(sorted(radius / 1e3 for radius in radii_m)),
+        min_rate=site.get("minimum_rate"),
+        min_mag=site.get("minimum_mag"),
+        max_mag=site.get("maximum_mag"),
+    )
+    return LocationRadiiSummary(
+        radii_set_id=radii_set_id,
+        bin_centers=histograms[0].bin_center.tolist() if histograms else [],
+        radii=[
+            RadiusSummary(
+                radius_km=row.radius_km,
+                rupture_count=row.rupture_count,
+                total_rate=row.total_rate,
+                rates=histogram.rate.tolist(),
+                cumulative_rates=histogram.cumulative_rate.tolist(),
+            )
+            for row, histogram in zip(summary.itertuples(index=False), histograms)
+        ],
+    )
+
+
+def selected_fields(info) -> Set[str]:
+    """Return the names of the fields selected on the current field (fragments are not expanded)."""
+    return {
+        selection.name.value
+        for field_node in info.field_nodes
+        for selection in (
+            field_node.selection_set.selections if field_node.selection_set else []
+        )
+        if hasattr(selection, "name")
+    }
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool warming batched filters, creating it on first use."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=max(1, BATCH_QUERY_WORKERS),
+                thread_name_prefix="batch-filter",
+            )
+        return _batch_executor
+
+
+def warm_filter_caches(filter_keys: List[FilterKey], fields: Set[str]) -> None:
+    """
+    Populate the cached aggregates needed by `fields` for each distinct filter key, in the shared
+    batch thread pool.
+
+    Errors are logged and ignored here, the field resolvers will raise them for the affected filter.
+    """
+
+    def warm(filter_key: FilterKey) -> None:
+        try:
+            matched_rupture_sections(filter_key)
+            if fields & SECTION_AGGREGATE_FIELDS:
+                fault_section_aggregates(filter_key, trace_only=False)
+            if "fault_traces" in fields:
+                fault_section_aggregates(filter_key, trace_only=True)
+            if "mfd_histogram" in fields:
+                mfd_histogram(filter_key)
+        except Exception as err:
+            log.warning("warm_filter_caches() %s failed: %s" % (filter_key, err))
+
+    distinct_keys = list(dict.fromkeys(filter_keys))
+    # load each fault system once, before the workers race to load it
+    for model_id, fault_system in dict.fromkeys(
+        (filter_key.model_id, filter_key.fault_system) for filter_key in distinct_keys
+    ):
+        try:
+            cached.get_fault_system_solution(model_id, fault_system)
+        except Exception as err:
+            log.warning(
+                "warm_filter_caches() model %s %s failed: %s"
+                % (model_id, fault_system, err)
+            )
+
+    list(get_batch_executor().map(warm, distinct_keys))
+
+
+def get_composite_rupture_sections_list(
+    filters, info
+) -> List["CompositeRuptureSections"]:
+    log.debug(">>> get_composite_rupture_sections_list")
+    filter_arguments = [FilterRupturesArgs(**filter) for filter in filters]
+    if filter_arguments:
+        warm_filter_caches(
+            [
+                FilterKey.from_filter_args(filter_args)
+                for filter_args in filter_arguments
+            ],
+            selected_fields(info),
+        )
+    log.debug("filter_rupture_sections_list cache_info: %s" % query_cache_info())
+    return [
+        CompositeRuptureSections(
+            model_id=filter_args.model_id, filter_arguments=filter_args
+        )
+        for filter_args in filter_arguments
+    ]
+
+
 class CompositeRuptureSections(graphene.ObjectType):
     """
     A collection of ruptures and their fault sections that have a geojson represention.  They also
@@ -140,61 +347,8 @@ class CompositeRuptureSections(graphene.ObjectType):
         )
 
     def resolve_mfd_histogram(root, info, *args, **kwargs):
-        filter_args = root.filter_arguments
-
-        df0 = matched_rupture_sections_gdf(
-            filter_args.model_id,
-            filter_args.fault_system,
-            tuple(filter_args.location_ids),
-            filter_args.radius_km,
-            min_rate=filter_args.minimum_rate or 1e-20,
-            max_rate=filter_args.maximum_rate,
-            min_mag=filter_args.minimum_mag,
-            max_mag=filter_args.maximum_mag,
-            filter_set_options=frozenset(dict(filter_args.filter_set_options).items()),
-            corupture_fault_names=tuple(filter_args.corupture_fault_names),
-        )
-
-        # TODO - move this function into solvis (see solvis.mfd_hist)
-        def build_mfd(
-            fault_sections_gdf: pd.DataFrame,
-            rate_col: str,
-            magnitude_col: str,
-            min_mag: float = 6.8,
-            max_mag: float = 9.8,
-        ) -> pd.DataFrame:
-            bins = [round(x / 100, 2) for x in range(500, 1000, 10)]
-            df = pd.DataFrame(
-                {
-                    "rate": fault_sections_gdf[rate_col],
-                    "magnitude": fault_sections_gdf[magnitude_col],
-                }
-            )
-
-            df["bins"] = pd.cut(df["magnitude"], bins=bins)
-            df["bin_center"] = df["bins"].apply(lambda x: x.mid)
-            df = df.drop(columns=["magnitude"])
-            # df.groupby "observed" parameter default will change to True in
-            # later Pandas versions, so marking it as explicitly False to
-            # maintain existing behaviour.
-            #
-            # See:
-            # - https://pandas.pydata.org/pandas-docs/stable/whatsnew/v2.1.0.html#deprecations
-            # - https://github.com/pandas-dev/pandas/issues/43999
-            df = pd.DataFrame(
-                df.groupby(df.bin_center, observed=False).sum(numeric_only=True)
-            )
-
-            # reverse cumsum
-            df["cumulative_rate"] = df.loc[::-1, "rate"].cumsum()[::-1]
-            df = df.reset_index()
-            df.bin_center = pd.to_numeric(df.bin_center)
-            df = df[df.bin_center.between(min_mag, max_mag)]
-            return df
-
-        df = build_mfd(df0, "rate_weighted_mean", "Magnitude")
-        for row in df.itertuples():
-            yield row
+        filter_key = FilterKey.from_filter_args(root.filter_arguments)
+        return list(mfd_histogram(filter_key).itertuples(index=False))
 
     def resolve_min_magnitude(root, info):
         filter_args = root.filter_arguments
@@ -231,7 +385,10 @@ class CompositeRuptureSections(graphene.ObjectType):
             "resolve_fault_surfaces args: %s filter_args:%s" % (kwargs, filter_args)
         )
 
-        fault_sections_gdf = get_fault_section_aggregates(filter_args)
+        # style a new frame, the cached aggregates are shared by concurrent resolvers
+        fault_sections_gdf = get_fault_section_aggregates(
+            filter_args, trace_only=False
+        ).drop(columns=UNSTYLED_COLUMNS)
 
         if color_scale_args:
             color_values = get_colour_values(
@@ -266,15 +423,6 @@ class CompositeRuptureSections(graphene.ObjectType):
             fault_sections_gdf["stroke-opacity"] = stroke_opacity
 
         log.debug(f"columns: {fault_sections_gdf.columns}")
-        fault_sections_gdf = fault_sections_gdf.drop(
-            columns=[
-                "rate_weighted_mean.max",
-                "rate_weighted_mean.min",
-                "rate_weighted_mean.mean",
-                "Target Slip Rate",
-                "Target Slip Rate StdDev",
-            ]
-        )
         # import solvis
         # solvis.export_geojson(fault_sections_gdf, 'fault_surfaces.geojson', indent=2)
 
@@ -289,7 +437,10 @@ class CompositeRuptureSections(graphene.ObjectType):
             "resolve_fault_surfaces args: %s filter_args:%s" % (kwargs, filter_args)
         )
 
-        fault_sections_gdf = get_fault_section_aggregates(filter_args, trace_only=True)
+        # style a new frame, the cached aggregates are shared by concurrent resolvers
+        fault_sections_gdf = get_fault_section_aggregates(
+            filter_args, trace_only=True
+        ).drop(columns=UNSTYLED_COLUMNS)
 
         if color_scale_args:
             color_values = get_colour_values(
@@ -320,15 +471,6 @@ class CompositeRuptureSections(graphene.ObjectType):
             # fault_sections_gdf['fill-opacity'] = stroke_opacity  # TODO remove again
             # fault_sections_gdf['fill'] = color_values if color_scale_args else style_args.stroke_color
 
-        fault_sections_gdf = fault_sections_gdf.drop(
-            columns=[
-                "rate_weighted_mean.max",
-                "rate_weighted_mean.min",
-                "rate_weighted_mean.mean",
-                "Target Slip Rate",
-                "Target Slip Rate StdDev",
-            ]
-        )
         # import solvis
         # solvis.export_geojson(fault_sections_gdf, 'fault_traces.geojson', indent=2)
 
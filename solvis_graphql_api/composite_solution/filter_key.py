@@ -0,0 +1,240 @@
+"""A canonical, hashable key for rupture filter arguments.
+
+The cached query functions are keyed on a FilterKey so that equivalent filters share one cache entry,
+regardless of how the arguments were spelled by the caller.
+"""
+
+import dataclasses
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple, Union
+
+import shapely
+import shapely.geometry
+import solvis.solution.typing
+
+from .filter_set_logic_options import DEFAULT_FILTER_SET_OPTIONS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_MIN_RATE = 1e-20
+
+
+def _sorted_unique(
+    values: Optional[Iterable[str]], ordered: bool = False
+) -> Tuple[str, ...]:
+    if not values:
+        return tuple()
+    return tuple(values) if ordered else tuple(sorted(set(values)))
+
+
+def _sorted_points(
+    points: Optional[Iterable[Any]], ordered: bool = False
+) -> Tuple[Tuple[float, float], ...]:
+    def lat_lon(point: Any) -> Tuple[float, float]:
+        if isinstance(point, dict):
+            return (float(point["latitude"]), float(point["longitude"]))
+        lat, lon = point
+        return (float(lat), float(lon))
+
+    if not points:
+        return tuple()
+    return (
+        tuple(map(lat_lon, points))
+        if ordered
+        else tuple(sorted(set(map(lat_lon, points))))
+    )
+
+
+def canonical_polygon(value: Any) -> Optional[str]:
+    """
+    Return the normalised WKT of a GeoJSON (Multi)Polygon geometry or Feature, or None.
+
+    Args:
+        value: a GeoJSON dict or string, a shapely geometry, or WKT.
+
+    Raises:
+        ValueError: if the value is not a valid polygon or multipolygon.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = (
+            shapely.from_wkt(value)
+            if not value.lstrip().startswith("{")
+            else json.loads(value)
+        )
+    if isinstance(value, dict):
+        value = shapely.geometry.shape(value.get("geometry") or value)
+    if value.geom_type not in ("Polygon", "MultiPolygon") or not value.is_valid:
+        raise ValueError("`polygon` must be a valid GeoJSON Polygon or MultiPolygon.")
+    return shapely.normalize(value).wkt
+
+
+def _set_operation_value(value: Any) -> int:
+    return solvis.solution.typing.SetOperationEnum(value).value
+
+
+def _is_difference(value: Any) -> bool:
+    return (
+        _set_operation_value(value)
+        == solvis.solution.typing.SetOperationEnum.DIFFERENCE.value
+    )
+
+
+def _lower_bound_covers(bound: Optional[float], other: Optional[float]) -> bool:
+    return bound is None or (other is not None and other >= bound)
+
+
+def _upper_bound_covers(bound: Optional[float], other: Optional[float]) -> bool:
+    return bound is None or (other is not None and other <= bound)
+
+
+@dataclasses.dataclass(frozen=True)
+class FilterKey:
+    """
+    The normalised form of FilterRupturesArgs.
+
+    Use `FilterKey.create()` or `FilterKey.from_filter_args()` rather than the constructor, these apply
+    the normalisation rules:
+
+     - `location_ids` and `corupture_fault_names` are sorted and de-duplicated, unless they are joined
+       by DIFFERENCE, where the order given is significant and kept.
+     - `points` are sorted and de-duplicated on the same terms as `location_ids`, a `polygon` is
+       stored as normalised WKT.
+     - `radius_km` is dropped when there are no locations or points.
+     - `min_rate` defaults to DEFAULT_MIN_RATE, other unset (or zero) bounds become None.
+     - `filter_set_options` have defaults applied, and options that cannot affect the result
+       are dropped e.g. `multiple_locations` when there is only one location.
+    """
+
+    model_id: str
+    fault_system: str
+    location_ids: Tuple[str, ...] = tuple()
+    radius_km: Optional[int] = None
+    points: Tuple[Tuple[float, float], ...] = tuple()
+    polygon: Optional[str] = None
+    min_rate: float = DEFAULT_MIN_RATE
+    max_rate: Optional[float] = None
+    min_mag: Optional[float] = None
+    max_mag: Optional[float] = None
+    corupture_fault_names: Tuple[str, ...] = tuple()
+    filter_set_options: Tuple[Tuple[str, int], ...] = tuple()
+
+    @classmethod
+    def create(
+        cls,
+        model_id: str,
+        fault_system: str,
+        location_ids: Optional[Iterable[str]] = None,
+        radius_km: Optional[int] = None,
+        points: Optional[Iterable[Any]] = None,
+        polygon: Any = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        min_mag: Optional[float] = None,
+        max_mag: Optional[float] = None,
+        corupture_fault_names: Optional[Iterable[str]] = None,
+        filter_set_options: Union[None, Dict, Iterable[Tuple[str, Any]]] = None,
+    ) -> "FilterKey":
+        """Build a normalised FilterKey from raw filter arguments."""
+        options = dict(DEFAULT_FILTER_SET_OPTIONS)
+        options.update(dict(filter_set_options or {}))
+
+        ordered_locations = _is_difference(options["multiple_locations"])
+        location_ids = _sorted_unique(location_ids, ordered=ordered_locations)
+        points = _sorted_points(points, ordered=ordered_locations)
+        polygon = canonical_polygon(polygon)
+        corupture_fault_names = _sorted_unique(
+            corupture_fault_names, ordered=_is_difference(options["multiple_faults"])
+        )
+        areas = len(location_ids) + len(points) + (1 if polygon else 0)
+
+        relevant = dict(
+            multiple_locations=areas > 1,
+            multiple_faults=len(corupture_fault_names) > 1,
+            locations_and_faults=bool(areas and corupture_fault_names),
+        )
+
+        return cls(
+            model_id=model_id.strip(),
+            fault_system=fault_system,
+            location_ids=location_ids,
+            radius_km=radius_km if (location_ids or points) else None,
+            points=points,
+            polygon=polygon,
+            min_rate=min_rate or DEFAULT_MIN_RATE,
+            max_rate=max_rate or None,
+            min_mag=min_mag or None,
+            max_mag=max_mag or None,
+            corupture_fault_names=corupture_fault_names,
+            filter_set_options=tuple(
+                sorted(
+                    (member, _set_operation_value(value))
+                    for member, value in options.items()
+                    if relevant.get(member)
+                )
+            ),
+        )
+
+    @classmethod
+    def from_filter_args(cls, filter_args: Any) -> "FilterKey":
+        """Build a FilterKey from a FilterRupturesArgs object or FilterRupturesArgsInput value."""
+        return cls.create(
+            model_id=filter_args.model_id,
+            fault_system=filter_args.fault_system,
+            location_ids=filter_args.location_ids,
+            radius_km=filter_args.radius_km,
+            points=getattr(filter_args, "points", None),
+            polygon=getattr(filter_args, "polygon", None),
+            min_rate=filter_args.minimum_rate,
+            max_rate=filter_args.maximum_rate,
+            min_mag=filter_args.minimum_mag,
+            max_mag=filter_args.maximum_mag,
+            corupture_fault_names=filter_args.corupture_fault_names,
+            filter_set_options=filter_args.filter_set_options,
+        )
+
+    @property
+    def has_locations(self) -> bool:
+        """True if the key filters on location_ids, points or a polygon."""
+        return bool(self.location_ids or self.points or self.polygon)
+
+    def join_type(self, member: str) -> solvis.solution.typing.SetOperationEnum:
+        """Return the solvis set operation for a filter set option member."""
+        options = dict(DEFAULT_FILTER_SET_OPTIONS)
+        options.update(dict(self.filter_set_options))
+        return solvis.solution.typing.SetOperationEnum(options[member])
+
+    def without_ranges(self) -> "FilterKey":
+        """Return this key with the magnitude and rate ranges removed."""
+        return dataclasses.replace(
+            self, min_rate=DEFAULT_MIN_RATE, max_rate=None, min_mag=None, max_mag=None
+        )
+
+    def covers(self, other: "FilterKey") -> bool:
+        """
+        Return True if every rupture matching `other` also matches this key.
+
+        Only the (monotone) magnitude and rate ranges may differ, all other arguments must be equal.
+        """
+        return (
+            self.without_ranges() == other.without_ranges()
+            and _lower_bound_covers(self.min_mag, other.min_mag)
+            and _upper_bound_covers(self.max_mag, other.max_mag)
+            and _lower_bound_covers(self.min_rate, other.min_rate)
+            and _upper_bound_covers(self.max_rate, other.max_rate)
+        )
+
+    def filter_attributes(self, ruptures: "pd.DataFrame") -> "pd.DataFrame":
+        """Apply the magnitude and rate ranges to a ruptures_with_rupture_rates dataframe."""
+        df0 = ruptures
+        df0 = df0 if not self.max_mag else df0[df0.Magnitude <= self.max_mag]
+        df0 = df0 if not self.min_mag else df0[df0.Magnitude > self.min_mag]
+        df0 = df0 if not self.max_rate else df0[df0.rate_weighted_mean <= self.max_rate]
+        df0 = df0 if not self.min_rate else df0[df0.rate_weighted_mean > self.min_rate]
+        return df0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the key as a JSON serialisable dict."""
+        return dataclasses.asdict(self)
@@ -16,6 +16,12 @@ def _solvis_join(
 # Construct graphene Enum from native Solvis type.
 SetOperationEnum = graphene.Enum.from_enum(solvis.solution.typing.SetOperationEnum)
 
+DEFAULT_FILTER_SET_OPTIONS = dict(
+    multiple_locations=SetOperationEnum.INTERSECTION.value,  # type: ignore
+    multiple_faults=SetOperationEnum.UNION.value,  # type: ignore
+    locations_and_faults=SetOperationEnum.INTERSECTION.value,  # type: ignore
+)
+
 
 class FilterSetLogicOptionsBase:
     """Let the user define how the result sets are combined"""
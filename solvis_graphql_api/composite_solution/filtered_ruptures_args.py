@@ -5,6 +5,7 @@ import logging
 import graphene
 
 from .filter_set_logic_options import (
+    DEFAULT_FILTER_SET_OPTIONS,
     FilterSetLogicOptions,
     FilterSetLogicOptionsInput,
     SetOperationEnum,
@@ -13,6 +14,21 @@ from .filter_set_logic_options import (
 log = logging.getLogger(__name__)
 
 
+class LatLonBase:
+    latitude = graphene.Float(required=True, description="latitude in decimal degrees.")
+    longitude = graphene.Float(
+        required=True, description="longitude in decimal degrees."
+    )
+
+
+class LatLon(LatLonBase, graphene.ObjectType):
+    """A point location"""
+
+
+class LatLonInput(LatLonBase, graphene.InputObjectType):
+    """A point location, passed as LatLon"""
+
+
 class FilterRupturesArgsBase:
     """Defines filter arguments for Inversions analysis, must be subtyped"""
 
@@ -42,6 +58,21 @@ class FilterRupturesArgsBase:
         required=False, description="The rupture/location intersection radius in km"
     )
 
+    points = graphene.List(
+        LatLon,
+        required=False,
+        description="Optional list of points for proximity filtering, within radius_km of each point. "
+        "Points are joined with location_ids by the `multiple_locations` filter set option, "
+        "a DIFFERENCE join keeps the order given, after the location_ids.",
+    )
+
+    polygon = graphene.JSONString(
+        required=False,
+        description="Optional GeoJSON Polygon or MultiPolygon (geometry or Feature) for area filtering. The "
+        "area is joined with the locations and points by the `multiple_locations` filter set option, "
+        "a DIFFERENCE join takes it last.",
+    )
+
     filter_set_options = graphene.Field(FilterSetLogicOptions)
 
     minimum_rate = graphene.Float(
@@ -67,14 +98,19 @@ class FilterRupturesArgsInput(FilterRupturesArgsBase, graphene.InputObjectType):
 
     # DEFAULT_LOCATION_OPTION: SetOperationEnum = SetOperationEnum.INTERSECTION.value
 
+    points = graphene.List(
+        graphene.NonNull(LatLonInput),
+        required=False,
+        default_value=tuple([]),
+        description="Optional list of points for proximity filtering, within radius_km of each point. "
+        "Points are joined with location_ids by the `multiple_locations` filter set option, "
+        "a DIFFERENCE join keeps the order given, after the location_ids.",
+    )
+
     filter_set_options = graphene.Field(
         FilterSetLogicOptionsInput,
         required=False,
-        default_value=dict(
-            multiple_locations=SetOperationEnum.INTERSECTION.value,  # type: ignore
-            multiple_faults=SetOperationEnum.UNION.value,  # type: ignore
-            locations_and_faults=SetOperationEnum.INTERSECTION.value,  # type: ignore
-        ),
+        default_value=dict(DEFAULT_FILTER_SET_OPTIONS),
     )
 
 
@@ -82,3 +118,50 @@ class FilterRupturesArgs(FilterRupturesArgsBase, graphene.ObjectType):
     """Arguments FilterRupturesArgs"""
 
     filter_set_options = graphene.Field(FilterSetLogicOptions)
+
+
+class SiteArgsBase:
+    """Arguments selecting the ruptures of a fault system around a site"""
+
+    model_id = graphene.String(required=True, description="The ID of NSHM model")
+
+    fault_system = graphene.String(
+        required=True,
+        description="The fault systems [`HIK`, `PUY`, `CRU`]",
+    )
+
+    location_id = graphene.String(
+        required=False, description="The site location id e.g. `WLG`"
+    )
+
+    point = graphene.Field(
+        LatLonInput,
+        required=False,
+        description="The site point, used when no location_id is given.",
+    )
+
+    minimum_rate = graphene.Float(
+        required=False,
+        description="Constrain to ruptures having a annual rate above the value supplied.",
+    )
+    minimum_mag = graphene.Float(
+        required=False,
+        description="Constrain to ruptures having a magnitude above the value supplied.",
+    )
+    maximum_mag = graphene.Float(
+        required=False,
+        description="Constrain to ruptures having a magnitude below the value supplied.",
+    )
+
+
+class NearestRupturesArgsInput(SiteArgsBase, graphene.InputObjectType):
+    """Arguments for ranking the ruptures of a fault system by distance to a site"""
+
+    maximum_distance_km = graphene.Float(
+        required=False,
+        description="Exclude ruptures further than this distance (km) from the site.",
+    )
+
+
+class LocationRadiiSummaryArgsInput(SiteArgsBase, graphene.InputObjectType):
+    """Arguments for summarising the ruptures of a fault system within the radii of a site"""
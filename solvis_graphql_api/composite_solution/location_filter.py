@@ -0,0 +1,438 @@
+"""Location filters, finding the ruptures with a fault section inside location polygons.
+
+`solvis.filter.FilterRuptureIds.for_polygons` intersects every section geometry with each polygon on
+the request thread. SectionLocationFilter answers the same question with alternative engines, chosen
+by LOCATION_FILTER_ENGINE:
+
+ - `strtree` (default): a shapely STRtree over the section geometries, built once per fault system,
+   is queried with the polygons.
+ - `solvis`: FilterRuptureIds.for_polygons.
+ - `process_pool`: the section geometries are partitioned into chunks of LOCATION_FILTER_CHUNK_SIZE
+   and intersected with the polygons in a pool of LOCATION_FILTER_WORKERS processes. The geometries
+   are written once to a file under LOCATION_FILTER_GEOMETRIES_PATH, named by their hash, and each
+   pool process loads them once, so a request only sends its polygons and the chunk ranges.
+ - `distance`: no polygons are built. The minimum distance from each section to a location is computed
+   once (vectorised, in the location's azimuthal equidistant projection) and kept in a distance table,
+   so a radius filter of any size is a single comparison.
+
+Matching sections are mapped to ruptures with the RuptureSectionMatrix. The rupture ids of each polygon
+are kept in a bounded table keyed by `geometry_hash`, so repeated custom areas are not re-intersected.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from numpy.typing import NDArray
+from solvis.solution.typing import SetOperationEnum
+
+from .rupture_section_matrix import RuptureSectionMatrix
+
+if TYPE_CHECKING:
+    from solvis import InversionSolution
+
+log = logging.getLogger(__name__)
+
+LOCATION_FILTER_ENGINE = os.getenv("LOCATION_FILTER_ENGINE", "strtree").lower()
+LOCATION_FILTER_WORKERS = int(os.getenv("LOCATION_FILTER_WORKERS", "2"))
+LOCATION_FILTER_CHUNK_SIZE = int(os.getenv("LOCATION_FILTER_CHUNK_SIZE", "500"))
+LOCATION_FILTER_GEOMETRIES_PATH = os.getenv(
+    "LOCATION_FILTER_GEOMETRIES_PATH",
+    os.path.join(tempfile.gettempdir(), "solvis_location_filter"),
+)
+# the section geometry sets (fault systems) kept by each pool process
+LOCATION_FILTER_WORKER_GEOMETRIES_MAXSIZE = 16
+LOCATION_DISTANCES_MAXSIZE = 1024
+LOCATION_POLYGONS_MAXSIZE = 1024
+
+# the sphere radius used by solvis.geometry.circle_polygon
+EARTH_RADIUS_KM = 6371.0
+
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+_process_pool_lock = threading.Lock()
+
+# the section geometries loaded by a pool process, keyed by their file path
+_worker_geometries: "OrderedDict[str, NDArray]" = OrderedDict()
+
+
+def get_process_pool(max_workers: int = LOCATION_FILTER_WORKERS) -> ProcessPoolExecutor:
+    """Return the shared location filter process pool of max_workers processes, creating it on first use."""
+    with _process_pool_lock:
+        if max_workers not in _process_pools:
+            # spawn, as forking a multi-threaded server process is unsafe
+            _process_pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pools[max_workers]
+
+
+def save_geometries(
+    geometries_wkb: Sequence[bytes], folder: Optional[str] = None
+) -> str:
+    """
+    Write WKB geometries to a file named by their hash, unless already written.
+
+    Args:
+        geometries_wkb (Sequence[bytes]): the geometries.
+        folder (str): the folder, defaults to `LOCATION_FILTER_GEOMETRIES_PATH`.
+
+    Returns:
+        str: the file path, for `load_geometries`.
+    """
+    offsets = np.cumsum([0] + [len(geometry) for geometry in geometries_wkb])
+    data = b"".join(geometries_wkb)
+    digest = hashlib.sha256(offsets.tobytes() + data).hexdigest()
+    path = Path(folder or LOCATION_FILTER_GEOMETRIES_PATH) / f"{digest}.npz"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique temporary file, so concurrent writers never clash
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.name, suffix=".tmp", delete=False
+        ) as tmp_file:
+            try:
+                np.savez(tmp_file, wkb=np.frombuffer(data, np.uint8), offsets=offsets)
+            except OSError:
+                os.unlink(tmp_file.name)
+                raise
+        os.replace(tmp_file.name, path)
+    return str(path)
+
+
+def load_geometries(path: str) -> NDArray:
+    """Return the geometries written by `save_geometries`, loaded once per process."""
+    if path in _worker_geometries:
+        _worker_geometries.move_to_end(path)
+        return _worker_geometries[path]
+
+    with np.load(path) as saved:
+        data = saved["wkb"].tobytes()
+        offsets = saved["offsets"]
+    geometries_wkb = np.empty(len(offsets) - 1, dtype=object)
+    geometries_wkb[:] = [
+        data[first:last] for first, last in zip(offsets[:-1], offsets[1:])
+    ]
+    geometries = shapely.from_wkb(geometries_wkb)
+    _worker_geometries[path] = geometries
+    while len(_worker_geometries) > LOCATION_FILTER_WORKER_GEOMETRIES_MAXSIZE:
+        _worker_geometries.popitem(last=False)
+    return geometries
+
+
+def join_rupture_ids(
+    rupture_id_sets: Sequence[NDArray], join_type: SetOperationEnum
+) -> NDArray:
+    """Join rupture id arrays with a set operation, as `FilterRuptureIds.for_polygons` does."""
+    if join_type == SetOperationEnum.INTERSECTION:
+        operation = np.intersect1d
+    elif join_type == SetOperationEnum.UNION:
+        operation = np.union1d
+    elif join_type == SetOperationEnum.DIFFERENCE:
+        operation = np.setdiff1d
+    else:
+        raise ValueError(
+            "Only INTERSECTION, UNION & DIFFERENCE operations are supported for `join_type`"
+        )
+    rupture_ids = rupture_id_sets[0]
+    for other in rupture_id_sets[1:]:
+        rupture_ids = operation(rupture_ids, other)
+    return rupture_ids
+
+
+def geometry_hash(geometry: "shapely.Geometry") -> str:
+    """Return a hash of the normalised geometry, equal for equal geometries however they are ordered."""
+    return hashlib.sha256(shapely.to_wkb(shapely.normalize(geometry))).hexdigest()
+
+
+def intersecting_positions(
+    geometries_path: str, start: int, stop: int, polygons_wkb: Sequence[bytes]
+) -> List[NDArray]:
+    """
+    Return, for each polygon, the positions in start:stop of the saved geometries intersecting it.
+
+    This runs in the pool processes, so its arguments and results are plain (picklable) WKB and arrays.
+    The geometries are loaded from geometries_path once per process, see `load_geometries`.
+    """
+    geometries = load_geometries(geometries_path)[start:stop]
+    polygons = shapely.from_wkb(np.asarray(polygons_wkb, dtype=object))
+    intersects = shapely.intersects(geometries[:, np.newaxis], polygons[np.newaxis, :])
+    return [np.flatnonzero(intersects[:, index]) for index in range(len(polygons))]
+
+
+def azimuthal_equidistant(
+    lat: float, lon: float, lats: NDArray, lons: NDArray
+) -> Tuple[NDArray, NDArray]:
+    """
+    Project coordinates into the spherical azimuthal equidistant projection centred on (lat, lon).
+
+    Distances from the centre are preserved, so `hypot(x, y)` is the great circle distance in km.
+    """
+    phi0, lambda0 = np.radians(lat), np.radians(lon)
+    phi, delta = np.radians(lats), np.radians(lons) - lambda0
+    cos_c = np.sin(phi0) * np.sin(phi) + np.cos(phi0) * np.cos(phi) * np.cos(delta)
+    c = np.arccos(np.clip(cos_c, -1.0, 1.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = np.where(c > 0, c / np.sin(c), 1.0)
+    x = EARTH_RADIUS_KM * k * np.cos(phi) * np.sin(delta)
+    y = (
+        EARTH_RADIUS_KM
+        * k
+        * (np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(delta))
+    )
+    return x, y
+
+
+class SectionLocationFilter:
+    """The section geometries of a fault system solution, for location filtering."""
+
+    def __init__(
+        self,
+        section_ids: NDArray,
+        geometries: NDArray,
+        matrix: RuptureSectionMatrix,
+    ):
+        self.section_ids = section_ids
+        self.geometries = geometries
+        self.matrix = matrix
+        self._geometries_path: Optional[str] = None
+        self._geometries_path_lock = threading.Lock()
+        self._tree: Optional[shapely.STRtree] = None
+        self._tree_lock = threading.Lock()
+        self._distances: "OrderedDict[Tuple[float, float], NDArray]" = OrderedDict()
+        self._distances_lock = threading.Lock()
+        self._coordinates: Optional[Tuple[NDArray, NDArray]] = None
+        self._matrix_section_positions: Optional[NDArray] = None
+        self._polygon_rupture_ids: "OrderedDict[str, NDArray]" = OrderedDict()
+        self._polygon_rupture_ids_lock = threading.Lock()
+
+    @classmethod
+    def from_solution(
+        cls, solution: "InversionSolution", matrix: RuptureSectionMatrix
+    ) -> "SectionLocationFilter":
+        fault_sections = solution.solution_file.fault_sections
+        return cls(
+            section_ids=fault_sections.index.to_numpy(dtype="float64"),
+            geometries=np.asarray(fault_sections.geometry.values, dtype=object),
+            matrix=matrix,
+        )
+
+    @property
+    def geometries_path(self) -> str:
+        """The file the process pool loads the section geometries from, written on first use."""
+        with self._geometries_path_lock:
+            if self._geometries_path is None:
+                self._geometries_path = save_geometries(
+                    list(shapely.to_wkb(self.geometries))
+                )
+            return self._geometries_path
+
+    @property
+    def tree(self) -> shapely.STRtree:
+        """The spatial index over the section geometries, built on first use."""
+        with self._tree_lock:
+            if self._tree is None:
+                self._tree = shapely.STRtree(self.geometries)
+            return self._tree
+
+    def section_ids_for_polygons_strtree(
+        self, polygons: Sequence["shapely.geometry.Polygon"]
+    ) -> List[NDArray]:
+        """Return the ids of the sections intersecting each polygon, found with the STRtree."""
+        polygon_index, geometry_index = self.tree.query(
+            np.asarray(polygons, dtype=object), predicate="intersects"
+        )
+        return [
+            self.section_ids[np.sort(geometry_index[polygon_index == index])]
+            for index in range(len(polygons))
+        ]
+
+    def section_distances(self, lat: float, lon: float) -> NDArray:
+        """
+        Return the minimum distance (km) from each section geometry to the location.
+
+        Each segment of a section trace is measured in the location's azimuthal equidistant projection,
+        the same projection `solvis.geometry.circle_polygon` builds its circles in. Results are kept in
+        a bounded distance table keyed by location.
+        """
+        key = (float(lat), float(lon))
+        with self._distances_lock:
+            if key in self._distances:
+                self._distances.move_to_end(key)
+                return self._distances[key]
+
+        if self._coordinates is None:
+            self._coordinates = shapely.get_coordinates(
+                self.geometries, return_index=True
+            )
+        coordinates, geometry_index = self._coordinates
+        x, y = azimuthal_equidistant(lat, lon, coordinates[:, 1], coordinates[:, 0])
+
+        distances = np.full(len(self.geometries), np.inf)
+        np.minimum.at(distances, geometry_index, np.hypot(x, y))
+
+        # the closest point of each segment to the origin
+        segment = geometry_index[:-1] == geometry_index[1:]
+        ax, ay = x[:-1][segment], y[:-1][segment]
+        dx, dy = x[1:][segment] - ax, y[1:][segment] - ay
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.clip(np.where(length2 > 0, -(ax * dx + ay * dy) / length2, 0), 0, 1)
+        np.minimum.at(
+            distances, geometry_index[:-1][segment], np.hypot(ax + t * dx, ay + t * dy)
+        )
+
+        with self._distances_lock:
+            self._distances[key] = distances
+            while len(self._distances) > LOCATION_DISTANCES_MAXSIZE:
+                self._distances.popitem(last=False)
+        return distances
+
+    def section_ids_within(self, lat: float, lon: float, radius_km: float) -> NDArray:
+        """Return the ids of the sections within radius_km of the location."""
+        return self.section_ids[self.section_distances(lat, lon) <= radius_km]
+
+    @property
+    def matrix_section_positions(self) -> NDArray:
+        """
+        The position in `section_ids` of each of the matrix section ids.
+
+        Raises:
+            ValueError: if a matrix section has no geometry.
+        """
+        if self._matrix_section_positions is None:
+            positions = pd.Index(self.section_ids).get_indexer(self.matrix.section_ids)
+            if (positions < 0).any():
+                raise ValueError(
+                    "sections without a geometry: %s"
+                    % self.matrix.section_ids[positions < 0].tolist()
+                )
+            self._matrix_section_positions = positions
+        return self._matrix_section_positions
+
+    def rupture_distances(self, lat: float, lon: float) -> NDArray:
+        """
+        Return the minimum distance (km) from each rupture to the location.
+
+        The distances are aligned with `matrix.rupture_ids`, each is the minimum of the rupture's section
+        distances from the distance table.
+        """
+        if not len(self.matrix.rupture_ids):
+            return np.empty(0)
+        section_distances = self.section_distances(lat, lon)[
+            self.matrix_section_positions
+        ]
+        return np.minimum.reduceat(
+            section_distances[self.matrix.indices], self.matrix.indptr[:-1]
+        )
+
+    def rupture_ids_for_locations(
+        self,
+        locations: Iterable[Tuple[float, float]],
+        radius_km: float,
+        join_type: SetOperationEnum = SetOperationEnum.UNION,
+    ) -> NDArray:
+        """
+        Return the ids of the ruptures with a section within radius_km of the locations.
+
+        Args:
+            locations (Iterable[Tuple[float, float]]): the (lat, lon) of each location.
+            radius_km (float): the radius, any value is supported.
+            join_type (SetOperationEnum): how to join the ruptures of each location.
+
+        Returns:
+            NDArray: the sorted rupture ids.
+        """
+        return join_rupture_ids(
+            [
+                self.matrix.rupture_ids_for_sections(
+                    self.section_ids_within(lat, lon, radius_km)
+                )
+                for lat, lon in locations
+            ],
+            join_type,
+        )
+
+    def section_ids_for_polygons_process_pool(
+        self,
+        polygons: Sequence["shapely.geometry.Polygon"],
+        workers: int = LOCATION_FILTER_WORKERS,
+        chunk_size: int = LOCATION_FILTER_CHUNK_SIZE,
+    ) -> List[NDArray]:
+        """Return the ids of the sections intersecting each polygon, computed in the process pool."""
+        polygons_wkb = list(shapely.to_wkb(np.asarray(polygons, dtype=object)))
+        starts = range(0, len(self.section_ids), chunk_size)
+        futures = [
+            get_process_pool(workers).submit(
+                intersecting_positions,
+                self.geometries_path,
+                start,
+                start + chunk_size,
+                polygons_wkb,
+            )
+            for start in starts
+        ]
+        positions: List[List[NDArray]] = [[] for _ in polygons]
+        for start, future in zip(starts, futures):
+            for index, chunk_positions in enumerate(future.result()):
+                positions[index].append(chunk_positions + start)
+        return [
+            self.section_ids[np.concatenate(chunks)] if chunks else np.empty(0)
+            for chunks in positions
+        ]
+
+    def rupture_ids_for_polygons(
+        self,
+        polygons: Iterable["shapely.geometry.Polygon"],
+        join_type: SetOperationEnum = SetOperationEnum.UNION,
+        engine: str = "strtree",
+    ) -> NDArray:
+        """
+        Return the ids of the ruptures with a section intersecting the polygons.
+
+        Args:
+            polygons (Iterable[Polygon]): the location polygons.
+            join_type (SetOperationEnum): how to join the ruptures of each polygon.
+            engine (str): the engine finding the sections intersecting each polygon.
+
+        Returns:
+            NDArray: the sorted rupture ids.
+        """
+        polygons = list(polygons)
+        hashes = [geometry_hash(polygon) for polygon in polygons]
+        with self._polygon_rupture_ids_lock:
+            cached = {key: self._polygon_rupture_ids.get(key) for key in hashes}
+            for key in hashes:
+                if cached[key] is not None:
+                    self._polygon_rupture_ids.move_to_end(key)
+
+        missing = [index for index, key in enumerate(hashes) if cached[key] is None]
+        if missing:
+            missing_polygons = [polygons[index] for index in missing]
+            if engine == "strtree":
+                section_id_sets = self.section_ids_for_polygons_strtree(
+                    missing_polygons
+                )
+            elif engine == "process_pool":
+                section_id_sets = self.section_ids_for_polygons_process_pool(
+                    missing_polygons
+                )
+            else:
+                raise ValueError(f"Unsupported location filter engine `{engine}`.")
+            with self._polygon_rupture_ids_lock:
+                for index, section_ids in zip(missing, section_id_sets):
+                    cached[hashes[index]] = self._polygon_rupture_ids[hashes[index]] = (
+                        self.matrix.rupture_ids_for_sections(section_ids)
+                    )
+                while len(self._polygon_rupture_ids) > LOCATION_POLYGONS_MAXSIZE:
+                    self._polygon_rupture_ids.popitem(last=False)
+
+        return join_rupture_ids([cached[key] for key in hashes], join_type)
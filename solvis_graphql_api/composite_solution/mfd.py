@@ -0,0 +1,139 @@
+"""Magnitude frequency distribution (MFD) histograms of filtered ruptures.
+
+The bin edges are fixed, so they and the bin centres are computed once at import and every histogram
+shares the same bins. Binning is a single `np.digitize` and the per bin rates a single `np.bincount`.
+"""
+
+import logging
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+MFD_BIN_EDGES = np.array([round(x / 100, 2) for x in range(500, 1000, 10)])
+MFD_BIN_CENTERS = pd.IntervalIndex.from_breaks(MFD_BIN_EDGES).mid.to_numpy()
+MFD_MIN_MAG = 6.8
+MFD_MAX_MAG = 9.8
+
+
+def mfd_bin_positions(magnitudes: np.ndarray) -> np.ndarray:
+    """
+    Return the MFD bin position of each magnitude, or -1 if it falls outside the bins.
+
+    Bins are closed on the right i.e. `(MFD_BIN_EDGES[i], MFD_BIN_EDGES[i + 1]]`, as for `pd.cut`.
+    """
+    positions = np.digitize(magnitudes, MFD_BIN_EDGES, right=True) - 1
+    positions[(positions < 0) | (positions >= len(MFD_BIN_CENTERS))] = -1
+    return positions
+
+
+def build_mfds(
+    ruptures_list: Sequence[pd.DataFrame],
+    rate_col: str = "rate_weighted_mean",
+    magnitude_col: str = "Magnitude",
+    min_mag: float = MFD_MIN_MAG,
+    max_mag: float = MFD_MAX_MAG,
+) -> List[pd.DataFrame]:
+    """
+    Build the MFD histograms of several ruptures dataframes in a single pass.
+
+    All the histograms share the same (aligned) bins. The rates of every dataframe are binned together
+    with one `np.bincount` over (dataframe, bin) positions, see `grouped_bin_rates`.
+
+    Args:
+        ruptures_list (Sequence[pd.DataFrame]): the ruptures, each with rate and magnitude columns.
+        rate_col (str): the name of the rate column.
+        magnitude_col (str): the name of the magnitude column.
+        min_mag (float): the smallest bin center returned.
+        max_mag (float): the largest bin center returned.
+
+    Returns:
+        List[pd.DataFrame]: an MFD histogram for each dataframe, see `build_mfd`.
+    """
+    magnitudes, rates, groups = [], [], []
+    for index, ruptures in enumerate(ruptures_list):
+        magnitudes.append(
+            ruptures[magnitude_col].to_numpy(dtype="float64", na_value=np.nan)
+        )
+        rates.append(ruptures[rate_col].to_numpy(dtype="float64", na_value=np.nan))
+        groups.append(np.full(len(ruptures), index))
+
+    def concatenate(arrays):
+        return np.concatenate(arrays) if arrays else np.empty(0)
+
+    return mfd_frames(
+        grouped_bin_rates(
+            concatenate(magnitudes),
+            concatenate(rates),
+            concatenate(groups).astype("int64"),
+            len(ruptures_list),
+        ),
+        min_mag,
+        max_mag,
+    )
+
+
+def grouped_bin_rates(
+    magnitudes: np.ndarray, rates: np.ndarray, groups: np.ndarray, group_count: int
+) -> np.ndarray:
+    """
+    Return the summed rates by (group, MFD bin), with a single `np.bincount`.
+
+    Ruptures with a group outside `range(group_count)`, a NaN rate, or a magnitude outside the bins
+    are ignored.
+
+    Returns:
+        np.ndarray: the (group_count, len(MFD_BIN_CENTERS)) bin rates.
+    """
+    bin_count = len(MFD_BIN_CENTERS)
+    bins = mfd_bin_positions(magnitudes)
+    binned = (bins >= 0) & ~np.isnan(rates) & (groups >= 0) & (groups < group_count)
+    return np.bincount(
+        bins[binned] + groups[binned] * bin_count,
+        weights=rates[binned],
+        minlength=group_count * bin_count,
+    ).reshape(group_count, bin_count)
+
+
+def mfd_frames(
+    bin_rates: np.ndarray, min_mag: float = MFD_MIN_MAG, max_mag: float = MFD_MAX_MAG
+) -> List[pd.DataFrame]:
+    """Return an MFD histogram (see `build_mfd`) for each row of the grouped bin rates."""
+    cumulative_rates = bin_rates[:, ::-1].cumsum(axis=1)[:, ::-1]
+    in_range = (MFD_BIN_CENTERS >= min_mag) & (MFD_BIN_CENTERS <= max_mag)
+    return [
+        pd.DataFrame(
+            {
+                "bin_center": MFD_BIN_CENTERS[in_range],
+                "rate": bin_rates[index, in_range],
+                "cumulative_rate": cumulative_rates[index, in_range],
+            }
+        )
+        for index in range(len(bin_rates))
+    ]
+
+
+def build_mfd(
+    ruptures: pd.DataFrame,
+    rate_col: str = "rate_weighted_mean",
+    magnitude_col: str = "Magnitude",
+    min_mag: float = MFD_MIN_MAG,
+    max_mag: float = MFD_MAX_MAG,
+) -> pd.DataFrame:
+    """
+    Build the MFD histogram of a ruptures dataframe.
+
+    Args:
+        ruptures (pd.DataFrame): the ruptures, with rate and magnitude columns.
+        rate_col (str): the name of the rate column.
+        magnitude_col (str): the name of the magnitude column.
+        min_mag (float): the smallest bin center returned.
+        max_mag (float): the largest bin center returned.
+
+    Returns:
+        pd.DataFrame: the `bin_center`, `rate` and `cumulative_rate` of each bin between min_mag and
+            max_mag. The cumulative rate includes the rate of all bins at or above the bin center.
+    """
+    return build_mfds([ruptures], rate_col, magnitude_col, min_mag, max_mag)[0]
@@ -0,0 +1,191 @@
+"""A sparse rupture x section incidence matrix for fast filtered aggregation.
+
+`fault_sections_with_rupture_rates` is a long table with one row per (rupture, section) pair. Filtering
+it with `isin` and then pivoting costs time proportional to the whole table for every query. Here the
+same table is held in compressed sparse row (CSR) form, indexed by rupture, so a filter only gathers the
+rows belonging to the selected ruptures and the per section reductions are numpy `bincount`/`reduceat`
+calls over that selection.
+
+The CSR arrays are plain numpy arrays (`indptr`, `indices`) rather than a scipy matrix, scipy is not a
+dependency of this project.
+"""
+
+import logging
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+log = logging.getLogger(__name__)
+
+SECTION_AGGREGATE_COLUMNS = [
+    "Magnitude.count",
+    "Magnitude.max",
+    "Magnitude.mean",
+    "Magnitude.min",
+    "rate_weighted_mean.max",
+    "rate_weighted_mean.mean",
+    "rate_weighted_mean.min",
+    "rate_weighted_mean.sum",
+]
+
+
+class RuptureSectionMatrix:
+    """
+    The CSR (ruptures x sections) incidence matrix of a fault system solution.
+
+    Row `i` holds the section positions of the rupture `rupture_ids[i]` in
+    `indices[indptr[i]:indptr[i + 1]]`. The rupture attributes `rates` and `magnitudes` are aligned
+    with `rupture_ids` (magnitude is NaN where unknown).
+    """
+
+    def __init__(
+        self,
+        rupture_ids: NDArray,
+        section_ids: NDArray,
+        indptr: NDArray,
+        indices: NDArray,
+        rates: NDArray,
+        magnitudes: NDArray,
+    ):
+        self.rupture_ids = rupture_ids
+        self.section_ids = section_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.rates = rates
+        self.magnitudes = magnitudes
+
+    @property
+    def shape(self):
+        return (len(self.rupture_ids), len(self.section_ids))
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_fault_sections_with_rupture_rates(
+        cls, fault_sections_with_rupture_rates: pd.DataFrame
+    ) -> "RuptureSectionMatrix":
+        """Build the matrix from a solution model's `fault_sections_with_rupture_rates` table."""
+        fsr = fault_sections_with_rupture_rates
+        row_ruptures = fsr["Rupture Index"].to_numpy(dtype="int64")
+        row_sections = fsr["section"].to_numpy(dtype="float64")
+
+        rupture_ids, row_rupture_pos = np.unique(row_ruptures, return_inverse=True)
+        section_ids, row_section_pos = np.unique(row_sections, return_inverse=True)
+
+        order = np.argsort(row_rupture_pos, kind="stable")
+        counts = np.bincount(row_rupture_pos, minlength=len(rupture_ids))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+
+        # rupture attributes are repeated on each of its rows, take the first
+        first_rows = order[indptr[:-1]]
+        rates = fsr["rate_weighted_mean"].to_numpy(dtype="float64")[first_rows]
+        magnitudes = fsr["Magnitude"].to_numpy(dtype="float64", na_value=np.nan)[
+            first_rows
+        ]
+
+        return cls(
+            rupture_ids=rupture_ids,
+            section_ids=section_ids,
+            indptr=indptr,
+            indices=row_section_pos[order],
+            rates=rates,
+            magnitudes=magnitudes,
+        )
+
+    def rupture_positions(self, rupture_ids: Iterable[int]) -> NDArray:
+        """Return the (sorted) matrix row positions of those rupture_ids present in the matrix."""
+        ids = np.unique(np.asarray(list(rupture_ids), dtype="int64"))
+        positions = np.searchsorted(self.rupture_ids, ids)
+        found = positions < len(self.rupture_ids)
+        found[found] = self.rupture_ids[positions[found]] == ids[found]
+        return positions[found]
+
+    def rupture_ids_for_sections(self, section_ids: Iterable[float]) -> NDArray:
+        """Return the (sorted) ids of the ruptures involving any of the given sections."""
+        ids = np.unique(np.asarray(list(section_ids), dtype="float64"))
+        positions = np.searchsorted(self.section_ids, ids)
+        found = positions < len(self.section_ids)
+        found[found] = self.section_ids[positions[found]] == ids[found]
+        if not found.any():
+            return np.empty(0, dtype=self.rupture_ids.dtype)
+
+        selected = np.zeros(len(self.section_ids), dtype=bool)
+        selected[positions[found]] = True
+        # every rupture has at least one section, so no row is empty
+        involved = np.logical_or.reduceat(selected[self.indices], self.indptr[:-1])
+        return self.rupture_ids[involved]
+
+    def gather(self, positions: NDArray) -> NDArray:
+        """Return the indices of the non-zero entries in the given rows, row by row."""
+        lengths = self.indptr[positions + 1] - self.indptr[positions]
+        row_starts = np.repeat(self.indptr[positions], lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        return row_starts + offsets
+
+    def section_aggregates(self, rupture_ids: Iterable[int]) -> pd.DataFrame:
+        """
+        Aggregate rupture rates and magnitudes by section over the given ruptures.
+
+        The result matches `fault_sections_with_rupture_rates.pivot_table(index=["section"], ...)` as
+        used by `fault_section_aggregates` i.e. the flattened `rate_weighted_mean` sum, min, max, mean
+        and `Magnitude` count, min, max, mean columns indexed by `section`.
+        """
+        positions = self.rupture_positions(rupture_ids)
+        entries = self.gather(positions)
+        lengths = self.indptr[positions + 1] - self.indptr[positions]
+
+        row_sections = self.indices[entries]
+        row_rates = np.repeat(self.rates[positions], lengths)
+        row_magnitudes = np.repeat(self.magnitudes[positions], lengths)
+
+        section_pos, group, counts = np.unique(
+            row_sections, return_inverse=True, return_counts=True
+        )
+        order = np.argsort(group, kind="stable")
+        group_starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype("int64")
+
+        rate_sum = np.bincount(group, weights=row_rates, minlength=len(section_pos))
+        has_magnitude = ~np.isnan(row_magnitudes)
+        magnitude_count = np.bincount(
+            group, weights=has_magnitude, minlength=len(section_pos)
+        ).astype("int64")
+        magnitude_sum = np.bincount(
+            group,
+            weights=np.where(has_magnitude, row_magnitudes, 0.0),
+            minlength=len(section_pos),
+        )
+
+        def reduce(ufunc, values):
+            if not len(values):
+                return values
+            return ufunc.reduceat(values[order], group_starts)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            magnitude_mean = np.where(
+                magnitude_count > 0, magnitude_sum / magnitude_count, np.nan
+            )
+
+        aggregates = pd.DataFrame(
+            {
+                "Magnitude.count": pd.array(magnitude_count, dtype="Int64"),
+                "Magnitude.max": reduce(np.fmax, row_magnitudes),
+                "Magnitude.mean": magnitude_mean,
+                "Magnitude.min": reduce(np.fmin, row_magnitudes),
+                "rate_weighted_mean.max": reduce(np.fmax, row_rates),
+                "rate_weighted_mean.mean": rate_sum / np.maximum(counts, 1),
+                "rate_weighted_mean.min": reduce(np.fmin, row_rates),
+                "rate_weighted_mean.sum": rate_sum,
+            },
+            index=pd.Index(self.section_ids[section_pos], name="section"),
+        )
+        for column in ["Magnitude.max", "Magnitude.mean", "Magnitude.min"]:
+            aggregates[column] = pd.array(
+                aggregates[column].to_numpy(dtype="float32"), dtype="Float32"
+            )
+        return aggregates[SECTION_AGGREGATE_COLUMNS]
@@ -2,7 +2,7 @@
 
 import logging
 import math
-from typing import Dict, Sequence, Tuple
+from typing import Dict, Sequence, Tuple, Type
 
 import geopandas as gpd
 import graphene
@@ -12,8 +12,13 @@ import pandas as pd
 from graphene import relay
 from numpy.typing import NDArray
 
-from .cached import matched_rupture_sections_gdf
-from .composite_rupture_detail import CompositeRuptureDetail, RuptureDetailConnection
+from .cached import get_site_point, matched_rupture_sections, nearest_ruptures
+from .composite_rupture_detail import (
+    CompositeRuptureDetail,
+    NearestRuptureConnection,
+    RuptureDetailConnection,
+)
+from .filter_key import FilterKey
 
 log = logging.getLogger(__name__)
 
@@ -103,25 +108,30 @@ def build_ruptures_connection(
     fault_system: str,
     first: int,
     after: graphene.ID = None,
+    connection: Type[relay.Connection] = RuptureDetailConnection,
+    edge_columns: Sequence[str] = (),
 ):
+    """Build a page of the ruptures, the edge_columns of each row are set on its connection edge."""
     # stolen from FaultSystemRuptures resolver....
     cursor_offset = int(graphql_relay.from_global_id(after)[1]) + 1 if after else 0
 
     rupture_ids = list(rupture_sections_gdf["Rupture Index"])
+    page = rupture_sections_gdf.iloc[cursor_offset : cursor_offset + first]
     nodes = [
         CompositeRuptureDetail(
             model_id=model_id, fault_system=fault_system, rupture_index=rid
         )
-        for rid in rupture_ids[cursor_offset : cursor_offset + first]
+        for rid in page["Rupture Index"]
     ]
 
     # based on https://gist.github.com/AndrewIngram/b1a6e66ce92d2d0befd2f2f65eb62ca5#file-pagination-py-L152
     edges = [
-        RuptureDetailConnection.Edge(
+        connection.Edge(
             node=node,
             cursor=graphql_relay.to_global_id(
                 "RuptureDetailConnectionCursor", str(cursor_offset + idx)
             ),
+            **{column: page[column].iloc[idx].item() for column in edge_columns},
         )
         for idx, node in enumerate(nodes)
     ]
@@ -132,9 +142,7 @@ def build_ruptures_connection(
     #     edges_geojson.append(json.loads(e.node.fault_surfaces))
 
     # REF https://stackoverflow.com/questions/46179559/custom-connectionfield-in-graphene
-    connection_field = relay.ConnectionField.resolve_connection(
-        RuptureDetailConnection, {}, edges
-    )
+    connection_field = relay.ConnectionField.resolve_connection(connection, {}, edges)
 
     total_count = len(rupture_ids)
     has_next = (
@@ -160,26 +168,12 @@ def paginated_filtered_ruptures(
     ### query that accepts both the rupture filter & sortby_args args and the pagination args
     log.info("paginated_ruptures args: %s filter_args:%s" % (kwargs, filter_args))
 
-    min_rate = filter_args.get("minimum_rate") or 1e-20
-
-    rupture_sections_gdf = (
-        matched_rupture_sections_gdf(  # is this working in both scenarios?
-            filter_args["model_id"],
-            filter_args["fault_system"],
-            tuple(filter_args["location_ids"]),
-            filter_args["radius_km"],
-            min_rate=min_rate,
-            max_rate=filter_args.get("maximum_rate"),
-            min_mag=filter_args.get("minimum_mag"),
-            max_mag=filter_args.get("maximum_mag"),
-            filter_set_options=frozenset(dict(filter_args.filter_set_options).items()),
-            corupture_fault_names=tuple(filter_args.corupture_fault_names or []),
-        )
-    )
+    filter_key = FilterKey.from_filter_args(filter_args)
+    rupture_sections_gdf = matched_rupture_sections(filter_key)
 
     if sortby_args:
         rupture_sections_gdf = auto_sorted_dataframe(
-            rupture_sections_gdf, sortby_args, min_rate
+            rupture_sections_gdf, sortby_args, filter_key.min_rate
         )
 
     first = kwargs.get("first", 5)  # how many to fetch
@@ -195,6 +189,36 @@ def paginated_filtered_ruptures(
     )
 
 
+def paginated_nearest_ruptures(nearest_args, **kwargs) -> NearestRuptureConnection:
+    """Page through the ruptures ranked by distance to the site given by location_id or point."""
+    log.info(
+        "paginated_nearest_ruptures args: %s nearest_args:%s" % (kwargs, nearest_args)
+    )
+
+    lat, lon = get_site_point(
+        nearest_args.get("location_id"), nearest_args.get("point")
+    )
+    ruptures = nearest_ruptures(
+        nearest_args["model_id"],
+        nearest_args["fault_system"],
+        lat=lat,
+        lon=lon,
+        max_distance_km=nearest_args.get("maximum_distance_km"),
+        min_rate=nearest_args.get("minimum_rate"),
+        min_mag=nearest_args.get("minimum_mag"),
+        max_mag=nearest_args.get("maximum_mag"),
+    )
+    return build_ruptures_connection(
+        ruptures,
+        model_id=nearest_args["model_id"],
+        fault_system=nearest_args["fault_system"],
+        first=kwargs.get("first", 5),
+        after=kwargs.get("after"),
+        connection=NearestRuptureConnection,
+        edge_columns=["distance_km"],
+    )
+
+
 class CompositeRuptureSections(graphene.ObjectType):
     model_id = graphene.String()
 
@@ -0,0 +1,222 @@
+"""Share two derived arrays of each fault system solution between worker processes via memory-mapped files.
+
+When SOLUTION_ARRAYS_PATH is set, the first process to build a fault system's arrays (e.g. the parent
+of preforked gunicorn workers, see `cached.preload_solution_arrays`, or the cli) writes them there as
+`.npy` files. Other processes then map those files read-only (`np.load(mmap_mode="r")`) instead of
+building their own copy, so the operating system page cache holds a single copy of them.
+
+Only these arrays are shared for each fault system:
+
+ - the RuptureSectionMatrix arrays.
+ - the columns of the `ruptures_with_rupture_rates` frame returned by
+   `cached.get_ruptures_with_rupture_rates`.
+
+Each process still loads its own `FaultSystemSolution` (see `cached.get_fault_system_solution`), so the
+fault sections, their geometries and any other frame solvis builds are private to the process, unless
+they were loaded before the workers were forked and are inherited copy-on-write.
+
+The arrays are stored under the archive version (the S3 ETag of the CompositeSolution archive), so a
+re-uploaded archive is never answered from stale arrays.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from pandas.core.arrays.masked import BaseMaskedArray
+
+from .rupture_section_matrix import RuptureSectionMatrix
+
+log = logging.getLogger(__name__)
+
+# bump this when the arrays or their meaning change
+ARRAYS_VERSION = "v2"
+ARRAY_NAMES = ["rupture_ids", "section_ids", "indptr", "indices", "rates", "magnitudes"]
+FRAME_META = "frame.json"
+
+
+def solution_arrays_path(
+    root: Union[str, Path],
+    model_id: str,
+    archive_version: str,
+    fault_system: str,
+    name: str,
+) -> Path:
+    return (
+        Path(root) / ARRAYS_VERSION / model_id / archive_version / fault_system / name
+    )
+
+
+def matrix_path(
+    root: Union[str, Path], model_id: str, archive_version: str, fault_system: str
+) -> Path:
+    return solution_arrays_path(
+        root, model_id, archive_version, fault_system, "rupture_section_matrix"
+    )
+
+
+def ruptures_path(
+    root: Union[str, Path], model_id: str, archive_version: str, fault_system: str
+) -> Path:
+    return solution_arrays_path(
+        root, model_id, archive_version, fault_system, "ruptures_with_rupture_rates"
+    )
+
+
+def _save_folder(folder: Path, write: Callable[[Path], None]) -> Path:
+    """
+    Write a folder of arrays, unless another process already has.
+
+    The arrays are written to a temporary folder that is then renamed into place, so readers never
+    see a partial set.
+    """
+    if folder.exists():
+        return folder
+
+    folder.parent.mkdir(parents=True, exist_ok=True)
+    tmp_folder = Path(tempfile.mkdtemp(dir=folder.parent, prefix=f".{folder.name}-"))
+    try:
+        write(tmp_folder)
+        os.rename(tmp_folder, folder)
+        log.info("shared_arrays wrote %s" % folder)
+    except OSError as err:
+        # another process won the race
+        log.debug("shared_arrays %s: %s" % (folder, err))
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+    return folder
+
+
+def _load(folder: Path, name: str) -> np.ndarray:
+    return np.load(folder / f"{name}.npy", mmap_mode="r")
+
+
+def save_rupture_section_matrix(
+    matrix: RuptureSectionMatrix,
+    root: Union[str, Path],
+    model_id: str,
+    archive_version: str,
+    fault_system: str,
+) -> Path:
+    """
+    Write the matrix arrays under root, unless another process already has.
+
+    Returns:
+        Path: the folder holding the arrays.
+    """
+
+    def write(folder: Path) -> None:
+        for name in ARRAY_NAMES:
+            np.save(folder / f"{name}.npy", getattr(matrix, name))
+
+    return _save_folder(
+        matrix_path(root, model_id, archive_version, fault_system), write
+    )
+
+
+def load_rupture_section_matrix(
+    root: Union[str, Path], model_id: str, archive_version: str, fault_system: str
+) -> Optional[RuptureSectionMatrix]:
+    """
+    Map the matrix arrays saved under root read-only.
+
+    Returns:
+        Optional[RuptureSectionMatrix]: the memory-mapped matrix, or None if it has not been saved.
+    """
+    folder = matrix_path(root, model_id, archive_version, fault_system)
+    if not folder.exists():
+        return None
+    return RuptureSectionMatrix(**{name: _load(folder, name) for name in ARRAY_NAMES})
+
+
+def save_ruptures_frame(
+    frame: pd.DataFrame,
+    root: Union[str, Path],
+    model_id: str,
+    archive_version: str,
+    fault_system: str,
+) -> Path:
+    """
+    Write the columns of a ruptures_with_rupture_rates frame under root, unless already written.
+
+    Categorical columns are stored as their codes, nullable (masked) columns as their values and mask.
+    The frame index must be made of its own columns, as solvis builds it.
+
+    Returns:
+        Path: the folder holding the arrays.
+    """
+    index_names = list(frame.index.names)
+    if not set(index_names) <= set(frame.columns):
+        raise ValueError(
+            "the frame index must be made of its columns: %s" % index_names
+        )
+
+    def write(folder: Path) -> None:
+        columns = []
+        for position, (name, series) in enumerate(frame.items()):
+            column: Dict[str, Any] = dict(name=name, dtype=str(series.dtype))
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column.update(
+                    kind="categorical",
+                    categories=series.cat.categories.tolist(),
+                    ordered=bool(series.cat.ordered),
+                )
+                np.save(folder / f"{position}.npy", series.cat.codes.to_numpy())
+            elif isinstance(series.array, BaseMaskedArray):
+                column.update(kind="masked")
+                np.save(folder / f"{position}.npy", series.array._data)
+                np.save(folder / f"{position}.mask.npy", series.array._mask)
+            else:
+                column.update(kind="numpy")
+                np.save(folder / f"{position}.npy", series.to_numpy())
+            columns.append(column)
+        (folder / FRAME_META).write_text(
+            json.dumps(dict(columns=columns, index=index_names))
+        )
+
+    return _save_folder(
+        ruptures_path(root, model_id, archive_version, fault_system), write
+    )
+
+
+def load_ruptures_frame(
+    root: Union[str, Path], model_id: str, archive_version: str, fault_system: str
+) -> Optional[pd.DataFrame]:
+    """
+    Map the columns of a ruptures_with_rupture_rates frame saved under root read-only.
+
+    Returns:
+        Optional[pd.DataFrame]: the frame over memory-mapped columns, or None if it has not been saved.
+    """
+    folder = ruptures_path(root, model_id, archive_version, fault_system)
+    if not folder.exists():
+        return None
+
+    meta = json.loads((folder / FRAME_META).read_text())
+    columns: Dict[str, Any] = {}
+    for position, column in enumerate(meta["columns"]):
+        values = _load(folder, str(position))
+        if column["kind"] == "categorical":
+            columns[column["name"]] = pd.Categorical.from_codes(
+                values,
+                dtype=pd.CategoricalDtype(column["categories"], column["ordered"]),
+            )
+        elif column["kind"] == "masked":
+            array_type = pd.api.types.pandas_dtype(
+                column["dtype"]
+            ).construct_array_type()
+            columns[column["name"]] = array_type(
+                values, _load(folder, f"{position}.mask")
+            )
+        else:
+            columns[column["name"]] = values
+
+    frame = pd.DataFrame(columns, copy=False)
+    frame.set_index(meta["index"], drop=False, inplace=True)
+    return frame
@@ -0,0 +1,82 @@
+"""Answer narrow rupture filters from cached results of wider ones.
+
+Slider-driven UI interactions issue a stream of filters that differ only in their magnitude or rate
+ranges. These ranges are monotone, so a cached result for e.g. `min_mag=7` contains every rupture
+matching `min_mag=7.5` (with identical other arguments) and the narrower result is just that cached
+result with the narrower ranges applied.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .filter_key import FilterKey
+
+log = logging.getLogger(__name__)
+
+SUPERSET_RESULTS_MAXSIZE = 128
+
+
+class SupersetResults:
+    """
+    A bounded, thread-safe registry of matched rupture results indexed for subsumption lookups.
+
+    Entries are grouped by `FilterKey.without_ranges()`, so a lookup only scans results that differ
+    from the request in their magnitude and rate ranges.
+    """
+
+    def __init__(self, maxsize: int = SUPERSET_RESULTS_MAXSIZE):
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[FilterKey, pd.DataFrame]" = OrderedDict()
+        self._groups: Dict[FilterKey, List[FilterKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, filter_key: FilterKey, ruptures: pd.DataFrame) -> None:
+        with self._lock:
+            if filter_key in self._entries:
+                self._entries.move_to_end(filter_key)
+                return
+            self._entries[filter_key] = ruptures
+            self._groups.setdefault(filter_key.without_ranges(), []).append(filter_key)
+            while len(self._entries) > self._maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                group = self._groups[evicted.without_ranges()]
+                group.remove(evicted)
+                if not group:
+                    del self._groups[evicted.without_ranges()]
+
+    def get(self, filter_key: FilterKey) -> Optional[pd.DataFrame]:
+        """
+        Return the ruptures matching filter_key, derived from the smallest cached superset (if any).
+        """
+        with self._lock:
+            candidates: List[Tuple[int, FilterKey]] = [
+                (len(self._entries[key]), key)
+                for key in self._groups.get(filter_key.without_ranges(), [])
+                if key.covers(filter_key)
+            ]
+            if not candidates:
+                self.misses += 1
+                return None
+            _, superset_key = min(candidates, key=lambda candidate: candidate[0])
+            self._entries.move_to_end(superset_key)
+            superset = self._entries[superset_key]
+            self.hits += 1
+
+        log.debug("SupersetResults.get() %s covered by %s" % (filter_key, superset_key))
+        return filter_key.filter_attributes(superset)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self.hits = 0
+            self.misses = 0
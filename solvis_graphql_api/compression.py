@@ -0,0 +1,94 @@
+"""Response compression for the Flask app.
+
+Fault surface GeoJSON responses are several megabytes of highly repetitive JSON, so responses are
+gzip compressed (or brotli, if the optional `brotli` package is installed and accepted by the client).
+
+`compress_response` is registered as an `after_request` handler by `create_app`. Bodies held in the
+`http_cache.ResponseCache` are kept in their compressed encodings too, so a repeated response is
+served without being compressed again.
+"""
+
+import gzip
+import logging
+import os
+from typing import Optional
+
+from flask import Response, request
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html"}
+
+
+def supported_encodings():
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def accepted_encoding() -> Optional[str]:
+    """Return the preferred content encoding accepted by the current request, or None."""
+    accept_encoding = request.accept_encodings
+    for encoding in supported_encodings():
+        if accept_encoding[encoding]:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # a fixed mtime keeps the compressed bytes identical for identical bodies
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError("unsupported content encoding: %s" % encoding)
+
+
+def should_compress(response: Response) -> bool:
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and not response.direct_passthrough
+        and "Content-Encoding" not in response.headers
+        and (response.content_length or 0) >= COMPRESSION_MIN_SIZE
+    )
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Return the ETag of a compressed representation, which differs byte for byte from the identity one."""
+    return "%s-%s" % (etag, encoding)
+
+
+def encoded_response(response: Response, body: bytes, encoding: str) -> Response:
+    """Set an already compressed body on a response, with an encoding-specific ETag if it has one."""
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
+
+
+def compress_response(response: Response) -> Response:
+    """An `after_request` handler compressing responses the client accepts compressed."""
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add("Accept-Encoding")
+    if not should_compress(response):
+        return response
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    body = response.get_data()
+    compressed = compress(body, encoding)
+    log.debug(
+        "compress_response() %s %d -> %d bytes" % (encoding, len(body), len(compressed))
+    )
+    return encoded_response(response, compressed, encoding)
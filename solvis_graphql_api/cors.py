@@ -0,0 +1,31 @@
+"""The CORS configuration shared by the Flask (WSGI) and ASGI apps.
+
+The Flask app passes `CORS_OPTIONS` to `flask_cors.CORS`, the ASGI app computes the same response
+headers with `cors_headers`, so both entry points answer cross-origin requests alike.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from flask_cors.core import DEFAULT_OPTIONS, get_cors_headers, serialize_options
+from werkzeug.datastructures import Headers
+
+# keyword arguments of `flask_cors.CORS`, empty for its defaults (any origin, any header)
+CORS_OPTIONS: Dict[str, Any] = {}
+
+
+def cors_headers(
+    request_headers: Headers, request_method: str
+) -> List[Tuple[str, str]]:
+    """
+    Return the CORS response headers flask_cors sets on a response to the given request.
+
+    Args:
+        request_headers (Headers): the request headers, e.g. `Origin`.
+        request_method (str): the request method, `OPTIONS` for a preflight request.
+
+    Returns:
+        List[Tuple[str, str]]: the header names and values.
+    """
+    options = serialize_options(dict(DEFAULT_OPTIONS, **CORS_OPTIONS))
+    headers = get_cors_headers(options, request_headers, request_method.upper())
+    return [(name, str(value)) for name, value in headers.items(multi=True)]
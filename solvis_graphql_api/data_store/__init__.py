@@ -4,7 +4,9 @@ this **data_store** package  may be merged with **solvis_store** eventually or g
 It provides a hybrid class BinaryLargeObject which uses dynamodb for searching/indexing/identity** features
 and s3 for the blob storage. The blob can be any binary object up to around 1GB.
 
-Much larger file sizes can be supported by S3 but additional (multipart) download options will be needed.
+Blobs are downloaded as concurrent byte range GETs and verified against their stored sha256 checksum,
+see `ranged_download`.
+Members of zip archive blobs can also be read individually with range requests, see `archive`.
 
 Examples:
 
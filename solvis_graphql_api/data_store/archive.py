@@ -0,0 +1,283 @@
+"""
+Range-read access to the members of a zip archive stored in S3.
+
+A CompositeSolution archive holds one `<fault system>_fault_system_solution.zip` member per fault
+system. `RangeReadArchive` reads the zip central directory with HTTP range requests, and then fetches
+only the members that are asked for, so that answering a CRU query never downloads the HIK and PUY
+members.
+
+ZipFile verifies each member read against its CRC-32. The sha256 checksum of the whole archive is
+only verified by a full download, see `BinaryLargeObject.object_blob`.
+
+Members are kept in a local directory (`ARCHIVE_CACHE_PATH`) keyed by the S3 ETag of the archive, so
+that a member is fetched once per container, and a re-uploaded archive is never read from stale files.
+"""
+
+import io
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .config import (
+    ARCHIVE_CACHE_PATH,
+    S3_DOWNLOAD_PART_SIZE,
+    S3_DOWNLOAD_RETRIES,
+    S3_DOWNLOAD_WORKERS,
+)
+from .ranged_download import byte_ranges, download_part
+
+log = logging.getLogger(__name__)
+
+# the end of central directory record, its comment and (for small archives) the central directory
+TAIL_SIZE = 256 * 1024
+
+# read-ahead for the small local file header reads made by ZipFile
+READ_BUFFER_SIZE = 64 * 1024
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    A seekable, read-only file object over an S3 object, each read is an HTTP range request.
+
+    The tail of the object is fetched once and kept in memory, as ZipFile reads it repeatedly. Large
+    reads are split into parts fetched concurrently, see `ranged_download.download_part`.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key: str,
+        size: int,
+        part_size: int = S3_DOWNLOAD_PART_SIZE,
+        workers: int = S3_DOWNLOAD_WORKERS,
+        retries: int = S3_DOWNLOAD_RETRIES,
+    ):
+        self._s3_client = s3_client
+        self._bucket = bucket
+        self._key = key
+        self._size = size
+        self._part_size = part_size
+        self._workers = workers
+        self._retries = retries
+        self._position = 0
+        self._tail_start = max(0, size - TAIL_SIZE)
+        self._tail: Optional[bytearray] = None
+        self.requests = 0
+        self.bytes_read = 0
+
+    def clone(self) -> "S3RangeReader":
+        """Return a reader of the same object with its own position and counters, sharing the tail."""
+        reader = S3RangeReader(
+            self._s3_client,
+            self._bucket,
+            self._key,
+            self._size,
+            self._part_size,
+            self._workers,
+            self._retries,
+        )
+        reader._tail_start = self._tail_start
+        reader._tail = self._tail
+        return reader
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError("invalid whence: %s" % whence)
+        if position < 0:
+            raise OSError("negative seek position %d" % position)
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        first = self._position
+        last = min(first + len(buffer), self._size) - 1
+        if last < first:
+            return 0
+        view = memoryview(buffer).cast("B")
+        if first >= self._tail_start:
+            tail = self._read_tail()
+            view[: last - first + 1] = tail[
+                first - self._tail_start : last - self._tail_start + 1
+            ]
+        else:
+            self._fetch(view, first, last)
+        self._position = last + 1
+        return last - first + 1
+
+    def _read_tail(self) -> bytearray:
+        if self._tail is None:
+            self._tail = bytearray(self._size - self._tail_start)
+            self._fetch(memoryview(self._tail), self._tail_start, self._size - 1)
+        return self._tail
+
+    def _fetch(self, view: memoryview, first: int, last: int) -> None:
+        """Fetch the bytes first..last of the object into view, as concurrent parts if large."""
+        ranges = [
+            (first + part_first, first + part_last)
+            for part_first, part_last in byte_ranges(last - first + 1, self._part_size)
+        ]
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self._workers, len(ranges)))
+        ) as executor:
+            attempts = list(
+                executor.map(
+                    lambda byte_range: download_part(
+                        self._s3_client,
+                        self._bucket,
+                        self._key,
+                        view,
+                        *byte_range,
+                        self._retries,
+                        buffer_offset=first,
+                    ),
+                    ranges,
+                )
+            )
+        self.requests += sum(attempts)
+        self.bytes_read += last - first + 1
+
+
+class RangeReadArchive:
+    """
+    Lazily read individual members of a zip archive in S3.
+
+    Args:
+        s3_client: a boto3 S3 client.
+        bucket (str): the bucket name.
+        key (str): the archive object key.
+        cache_path (str): the local member cache directory, defaults to `ARCHIVE_CACHE_PATH`, empty
+            to disable.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key: str,
+        cache_path: Optional[str] = None,
+    ):
+        self._s3_client = s3_client
+        self._bucket = bucket
+        self._key = key
+        cache_path = ARCHIVE_CACHE_PATH if cache_path is None else cache_path
+        self._cache_path = pathlib.Path(cache_path) if cache_path else None
+        self._lock = threading.Lock()
+        self._reader: Optional[S3RangeReader] = None
+        self._zipfile: Optional[zipfile.ZipFile] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def reader(self) -> S3RangeReader:
+        if self._reader is None:
+            head = self._s3_client.head_object(Bucket=self._bucket, Key=self._key)
+            self._etag = head["ETag"].strip('"')
+            self._reader = S3RangeReader(
+                self._s3_client, self._bucket, self._key, head["ContentLength"]
+            )
+        return self._reader
+
+    @property
+    def etag(self) -> str:
+        """The S3 ETag of the archive, identifying its content."""
+        self.reader
+        return str(self._etag)
+
+    @property
+    def zipfile(self) -> zipfile.ZipFile:
+        if self._zipfile is None:
+            tic0 = time.perf_counter()
+            self._zipfile = zipfile.ZipFile(
+                io.BufferedReader(self.reader, buffer_size=READ_BUFFER_SIZE)
+            )
+            log.info(
+                "RangeReadArchive %s: read central directory in %2.3f seconds"
+                % (self._key, time.perf_counter() - tic0)
+            )
+        return self._zipfile
+
+    def namelist(self) -> List[str]:
+        with self._lock:
+            return self.zipfile.namelist()
+
+    def _member_path(self, name: str) -> Optional[pathlib.Path]:
+        if self._cache_path is None:
+            return None
+        return self._cache_path / self._key / str(self._etag) / name
+
+    def read_member(self, name: str) -> bytes:
+        """
+        Return the content of an archive member, from the local cache if present.
+
+        The lock only guards the shared reader and central directory, each member is downloaded by its
+        own reader and ZipFile, so concurrent reads of different members do not wait for each other.
+
+        Raises:
+            KeyError: if the archive has no such member.
+        """
+        with self._lock:
+            self.reader  # the ETag identifies the cached members
+            path = self._member_path(name)
+        if path is not None and path.exists():
+            log.debug("RangeReadArchive %s: %s from local cache" % (self._key, name))
+            return path.read_bytes()
+
+        with self._lock:
+            info = self.zipfile.getinfo(name)
+            member_reader = self.reader.clone()
+
+        tic0 = time.perf_counter()
+        with zipfile.ZipFile(
+            io.BufferedReader(member_reader, buffer_size=READ_BUFFER_SIZE)
+        ) as member_zipfile:
+            data = member_zipfile.read(info.filename)
+        log.info(
+            "RangeReadArchive %s: read %s (%d bytes) in %2.3f seconds"
+            % (self._key, name, len(data), time.perf_counter() - tic0)
+        )
+
+        with self._lock:
+            self.reader.requests += member_reader.requests
+            self.reader.bytes_read += member_reader.bytes_read
+
+        if path is not None:
+            try:
+                self._cache_member(path, data)
+            except OSError as err:
+                log.warning("RangeReadArchive could not cache %s: %s" % (path, err))
+        return data
+
+    @staticmethod
+    def _cache_member(path: pathlib.Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique temporary file, so concurrent readers of a member never clash
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.name, suffix=".tmp", delete=False
+        ) as tmp_file:
+            try:
+                tmp_file.write(data)
+            except OSError:
+                os.unlink(tmp_file.name)
+                raise
+        os.replace(tmp_file.name, path)
@@ -25,4 +25,37 @@ CW_METRICS_RESOLUTION = os.getenv(
 )  # 1 for high resolution or 60
 S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME", "nzshm22-solvis-graphql-api-local")
 
+# second-tier query result cache: `s3`, `filesystem` or empty to disable
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "").lower()
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "/tmp/solvis_query_cache")
+# the key signing query cache objects, required by the `s3` backend
+QUERY_CACHE_SECRET = os.getenv("QUERY_CACHE_SECRET", "")
+
+# folder for the rupture x section matrix and ruptures frame arrays memory-mapped by every worker
+# process, empty to disable. The rest of each fault system solution is still loaded per process.
+SOLUTION_ARRAYS_PATH = os.getenv("SOLUTION_ARRAYS_PATH", "")
+# comma separated model ids whose solutions are loaded before worker processes are forked
+PRELOAD_MODEL_IDS = [
+    model_id.strip()
+    for model_id in os.getenv("PRELOAD_MODEL_IDS", "").split(",")
+    if model_id.strip()
+]
+
 LOGGING_CFG = os.getenv("LOGGING_CFG", "logging_aws.yaml")
+
+# ranged, concurrent S3 downloads of BinaryLargeObject blobs
+S3_DOWNLOAD_PART_SIZE = int(os.getenv("S3_DOWNLOAD_PART_SIZE", str(16 * 1024 * 1024)))
+S3_DOWNLOAD_WORKERS = int(os.getenv("S3_DOWNLOAD_WORKERS", "8"))
+S3_DOWNLOAD_RETRIES = int(os.getenv("S3_DOWNLOAD_RETRIES", "3"))
+
+# connections kept alive in each shared boto3 client pool
+S3_MAX_POOL_CONNECTIONS = int(
+    os.getenv("S3_MAX_POOL_CONNECTIONS", str(max(10, S3_DOWNLOAD_WORKERS)))
+)
+
+# local copies of the CompositeSolution archive members read by range requests, empty to disable.
+# Off by default in AWS Lambda, where /tmp is small and does not outlive the container.
+ARCHIVE_CACHE_PATH = os.getenv(
+    "ARCHIVE_CACHE_PATH",
+    "" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "/tmp/solvis_archive_cache",
+)
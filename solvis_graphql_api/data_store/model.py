@@ -1,13 +1,24 @@
 import io
 import logging
-from typing import Any, Dict, Optional, Sequence
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 import boto3
 import botocore
+import botocore.config
 from pynamodb.attributes import JSONAttribute, UnicodeAttribute
 from pynamodb.models import Model  # Condition
 
-from .config import DEPLOYMENT_STAGE, IS_OFFLINE, REGION, S3_BUCKET_NAME, TESTING
+from .archive import RangeReadArchive
+from .config import (
+    DEPLOYMENT_STAGE,
+    IS_OFFLINE,
+    REGION,
+    S3_BUCKET_NAME,
+    S3_MAX_POOL_CONNECTIONS,
+    TESTING,
+)
+from .ranged_download import SHA256_METADATA_KEY, download_object, sha256_hexdigest
 
 log = logging.getLogger(__name__)
 
@@ -21,6 +32,54 @@ S3_CLIENT_ARGS = (
     else {}
 )
 
+# boto3 clients and resources are slow to create and hold their own connection pools, so they are
+# shared by every BinaryLargeObject (and QueryCache backend) with the same client arguments.
+_s3_pool: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any] = {}
+_s3_pool_lock = threading.Lock()
+
+
+def s3_client_config() -> botocore.config.Config:
+    return botocore.config.Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries=dict(mode="standard"),
+    )
+
+
+def _pooled(kind: str, client_args: Optional[Dict]) -> Any:
+    client_args = S3_CLIENT_ARGS if client_args is None else client_args
+    key = (kind, tuple(sorted(client_args.items())))
+    with _s3_pool_lock:
+        if key not in _s3_pool:
+            log.debug("create shared s3 %s with %s" % (kind, list(client_args)))
+            # boto3.client() shares the default session, which is not thread-safe
+            session = boto3.session.Session()
+            factory = session.client if kind == "client" else session.resource
+            _s3_pool[key] = factory(
+                "s3", **client_args, region_name=REGION, config=s3_client_config()
+            )
+        return _s3_pool[key]
+
+
+def get_s3_client(client_args: Optional[Dict] = None):
+    """Return the shared, thread-safe S3 client for client_args (default `S3_CLIENT_ARGS`)."""
+    return _pooled("client", client_args)
+
+
+def get_s3_resource(client_args: Optional[Dict] = None):
+    """
+    Return the shared S3 resource for client_args (default `S3_CLIENT_ARGS`).
+
+    Unlike clients, resources are not thread-safe; use them for simple calls only.
+    """
+    return _pooled("resource", client_args)
+
+
+def reset_s3_pool() -> None:
+    """Drop the shared clients and resources, e.g. after credentials or endpoints change."""
+    with _s3_pool_lock:
+        _s3_pool.clear()
+
 
 class BinaryLargeObjectModel(Model):
     class Meta:
@@ -61,9 +120,6 @@ class BinaryLargeObject:
         self._object_blob = object_blob
         self._bucket_name = S3_BUCKET_NAME
         self._aws_client_args = S3_CLIENT_ARGS
-        self._s3_bucket = None
-        self._s3_conn = None
-        self._s3_client = None
 
     def set_s3_client_args(self, client_args: Dict) -> "BinaryLargeObject":
         """
@@ -74,26 +130,15 @@ class BinaryLargeObject:
 
     @property
     def s3_client(self):
-        if not self._s3_client:
-            self._s3_client = boto3.client(
-                "s3", **self._aws_client_args, region_name=REGION
-            )
-        return self._s3_client
+        return get_s3_client(self._aws_client_args)
 
     @property
     def s3_connection(self):
-        if not self._s3_conn:
-            self._s3_conn = boto3.resource("s3")
-            # self._connection = Connection(region=REGION)
-        return self._s3_conn
+        return get_s3_resource(self._aws_client_args)
 
     @property
     def s3_bucket(self):
-        if not self._s3_bucket:
-            self._s3_bucket = self.s3_connection.Bucket(
-                self._bucket_name, client=self.s3_client
-            )
-        return self._s3_bucket
+        return self.s3_connection.Bucket(self._bucket_name, client=self.s3_client)
 
     @property
     def object_id(self):
@@ -107,24 +152,44 @@ class BinaryLargeObject:
     def object_meta(self):
         return self._model_instance.object_meta
 
+    def object_archive(self) -> RangeReadArchive:
+        """Return range-read access to the members of a zip archive blob, without downloading it."""
+        return RangeReadArchive(
+            self.s3_client, self._bucket_name, f"{self.object_type}/{self.object_id}"
+        )
+
     @property
-    def object_blob(self):
+    def object_blob(self) -> Optional[bytes]:
+        """
+        The blob data, downloaded whole and verified against its stored sha256 checksum.
+
+        The API reads archive members with `object_archive()` instead, those are verified by their zip
+        CRC-32, so this checksum is verified by the cli read back.
+
+        Returns:
+            Optional[bytes]: the blob data, or None if the object was saved without a blob.
+
+        Raises:
+            botocore.exceptions.ClientError: if the download fails, other than for a missing object.
+        """
         if self._object_blob:
             return self._object_blob
 
+        key = f"{self.object_type}/{self.object_id}"
         log.info(f"get object_blob from bucket {self}")
         try:
-            file_object = io.BytesIO()
-            self.s3_bucket.download_fileobj(
-                f"{self.object_type}/{self.object_id}", file_object
-            )
-            file_object.seek(0)
-            self._object_blob = file_object.read()
+            self._object_blob = download_object(self.s3_client, self._bucket_name, key)
         except botocore.exceptions.ClientError as err:
-            if "(404)" not in str(err):
-                log.error("object not found")
+            if err.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                log.error(
+                    "get object_blob s3://%s/%s failed: %s"
+                    % (self._bucket_name, key, err)
+                )
                 raise
-            log.debug("object has no blob data")
+            log.info(
+                "object %s has no blob data, s3://%s/%s not found"
+                % (self, self._bucket_name, key)
+            )
         return self._object_blob
 
     def to_json(self):
@@ -151,6 +216,7 @@ class BinaryLargeObject:
             self.s3_bucket.put_object(
                 Key=f"{self.object_type}/{self.object_id}",
                 Body=io.BytesIO(self._object_blob),
+                Metadata={SHA256_METADATA_KEY: sha256_hexdigest(self._object_blob)},
             )
         return self._model_instance.save()
 
@@ -0,0 +1,231 @@
+"""
+A persistent, second-tier cache for query results.
+
+The in-process `lru_cache` on the query functions is lost whenever a Lambda container recycles. This
+module stores the serialised result frames in S3 (or a local filesystem directory for offline use and
+tests) so that popular queries stay fast across containers.
+
+Frames are serialised as gzipped pandas pickles, which round-trip the MultiIndex, nullable dtypes and
+geometry columns exactly. Unpickling can run arbitrary code, so every object is signed with an HMAC of
+its key and content using `QUERY_CACHE_SECRET`, and an object with a bad signature is never unpickled.
+The S3 backend is disabled when no secret is configured.
+
+The versions of the libraries that build and pickle the frames are part of every key, so that an
+upgraded runtime never reads stale pickles. Callers include the identity of the source data (e.g. the
+archive ETag) in the arguments.
+"""
+
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import pathlib
+import pickle
+import secrets
+import tempfile
+from functools import lru_cache
+from typing import Any, Dict, Optional, Protocol
+
+import botocore
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from .config import (
+    QUERY_CACHE_BACKEND,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_SECRET,
+    S3_BUCKET_NAME,
+)
+from .model import S3_CLIENT_ARGS, get_s3_client
+
+log = logging.getLogger(__name__)
+
+QUERY_CACHE_PREFIX = "QueryCache"
+SERIALISATION_VERSION = (
+    f"pandas-{pd.__version__} geopandas-{gpd.__version__} shapely-{shapely.__version__} "
+    f"numpy-{np.__version__}"
+)
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+# backend errors are logged and treated as cache misses
+BACKEND_ERRORS = (
+    botocore.exceptions.BotoCoreError,
+    botocore.exceptions.ClientError,
+    OSError,
+)
+
+# a signed object that cannot be read back is logged and treated as a cache miss
+READ_ERRORS = (
+    OSError,
+    EOFError,
+    ValueError,
+    TypeError,
+    AttributeError,
+    ImportError,
+    pickle.UnpicklingError,
+)
+
+
+def canonical_key(namespace: str, arguments: Dict[str, Any]) -> str:
+    """
+    Return a stable storage key for a query namespace and its arguments.
+
+    Args:
+        namespace (str): The name of the cached query e.g. `matched_rupture_sections`.
+        arguments (Dict[str, Any]): JSON serialisable query arguments.
+
+    Returns:
+        str: A key of the form `QueryCache/<namespace>/<sha256>`.
+    """
+    payload = json.dumps(
+        dict(serialisation=SERIALISATION_VERSION, arguments=arguments),
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f"{QUERY_CACHE_PREFIX}/{namespace}/{digest}"
+
+
+class QueryCacheBackend(Protocol):
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the object stored under key, or None."""
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an object under key."""
+
+
+class FilesystemQueryCacheBackend:
+    """Store cache objects as files below a root directory."""
+
+    def __init__(self, root: str = QUERY_CACHE_PATH):
+        self._root = pathlib.Path(root)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._root / key
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique temporary file, so concurrent writers of a key never clash
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.name, suffix=".tmp", delete=False
+        ) as tmp_file:
+            try:
+                tmp_file.write(data)
+            except OSError:
+                os.unlink(tmp_file.name)
+                raise
+        os.replace(tmp_file.name, path)
+
+
+class S3QueryCacheBackend:
+    """Store cache objects in the service S3 bucket."""
+
+    def __init__(
+        self, bucket_name: str = S3_BUCKET_NAME, client_args: Optional[Dict] = None
+    ):
+        self._bucket_name = bucket_name
+        self._aws_client_args = S3_CLIENT_ARGS if client_args is None else client_args
+
+    @property
+    def s3_client(self):
+        return get_s3_client(self._aws_client_args)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=self._bucket_name, Key=key)
+        except botocore.exceptions.ClientError as err:
+            if err.response.get("Error", {}).get("Code") in ["NoSuchKey", "404"]:
+                return None
+            raise
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3_client.put_object(Bucket=self._bucket_name, Key=key, Body=data)
+
+
+class QueryCache:
+    """
+    Serialise query result frames to/from a QueryCacheBackend.
+
+    Backend failures, and objects that are unsigned, corrupt or cannot be unpickled, are logged and
+    treated as cache misses, the cache must never break a query.
+
+    Args:
+        backend (QueryCacheBackend): where the objects are stored.
+        secret (bytes): the key of the HMAC signing each object.
+    """
+
+    def __init__(self, backend: QueryCacheBackend, secret: bytes):
+        self._backend = backend
+        self._secret = secret
+
+    @property
+    def backend(self) -> QueryCacheBackend:
+        return self._backend
+
+    def get_dataframe(
+        self, namespace: str, arguments: Dict[str, Any]
+    ) -> Optional[pd.DataFrame]:
+        key = canonical_key(namespace, arguments)
+        try:
+            data = self._backend.get(key)
+        except BACKEND_ERRORS as err:
+            log.warning("query cache get failed for %s: %s" % (key, err))
+            return None
+        if data is None:
+            log.debug("query cache miss: %s" % key)
+            return None
+        signature, payload = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self.signature(key, payload)):
+            log.warning("query cache object has a bad signature: %s" % key)
+            return None
+        try:
+            dataframe = pickle.loads(gzip.decompress(payload))
+        except READ_ERRORS as err:
+            log.warning("query cache object could not be read %s: %s" % (key, err))
+            return None
+        log.debug("query cache hit: %s" % key)
+        return dataframe
+
+    def put_dataframe(
+        self, namespace: str, arguments: Dict[str, Any], dataframe: pd.DataFrame
+    ) -> None:
+        key = canonical_key(namespace, arguments)
+        buffer = io.BytesIO()
+        dataframe.to_pickle(buffer, compression="gzip")
+        payload = buffer.getvalue()
+        try:
+            self._backend.put(key, self.signature(key, payload) + payload)
+        except BACKEND_ERRORS as err:
+            log.warning("query cache put failed for %s: %s" % (key, err))
+
+    def signature(self, key: str, payload: bytes) -> bytes:
+        return hmac.new(self._secret, key.encode() + payload, hashlib.sha256).digest()
+
+
+@lru_cache
+def get_query_cache() -> Optional[QueryCache]:
+    """
+    Return the QueryCache configured by `QUERY_CACHE_BACKEND`, or None if the cache is disabled.
+
+    The S3 backend requires `QUERY_CACHE_SECRET`. Without it the filesystem backend signs objects
+    with a random per-process secret, so they are only read back by the same process.
+    """
+    if QUERY_CACHE_BACKEND == "s3":
+        if not QUERY_CACHE_SECRET:
+            log.warning("QUERY_CACHE_SECRET is not set, the s3 query cache is disabled")
+            return None
+        return QueryCache(S3QueryCacheBackend(), QUERY_CACHE_SECRET.encode())
+    if QUERY_CACHE_BACKEND == "filesystem":
+        secret = QUERY_CACHE_SECRET.encode() or secrets.token_bytes(32)
+        return QueryCache(FilesystemQueryCacheBackend(QUERY_CACHE_PATH), secret)
+    if QUERY_CACHE_BACKEND:
+        log.warning("unknown QUERY_CACHE_BACKEND: %s" % QUERY_CACHE_BACKEND)
+    return None
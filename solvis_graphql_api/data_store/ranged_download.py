@@ -0,0 +1,165 @@
+"""
+Ranged, concurrent download of large S3 objects.
+
+A cold start has to fetch the CompositeSolution archive (hundreds of megabytes) before it can answer a
+query. A single streamed GET is limited by per-connection throughput, so the object is fetched as byte
+range parts on a thread pool, straight into a preallocated buffer.
+
+Each part is retried on failure, keeping the parts already downloaded, and the complete buffer is
+verified against the sha256 checksum stored in the object metadata when the blob was saved.
+"""
+
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import botocore
+
+from .config import S3_DOWNLOAD_PART_SIZE, S3_DOWNLOAD_RETRIES, S3_DOWNLOAD_WORKERS
+
+log = logging.getLogger(__name__)
+
+SHA256_METADATA_KEY = "sha256"
+
+# errors worth retrying a part for, e.g. throttling, timeouts and dropped connections
+RETRY_ERRORS = (
+    botocore.exceptions.BotoCoreError,
+    botocore.exceptions.ClientError,
+    IOError,
+)
+
+
+class ChecksumMismatchError(ValueError):
+    """The downloaded object does not match its stored sha256 checksum."""
+
+
+def byte_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """Return the inclusive (first, last) byte ranges of the parts of an object."""
+    return [
+        (first, min(first + part_size, size) - 1) for first in range(0, size, part_size)
+    ]
+
+
+def sha256_hexdigest(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def download_part(
+    s3_client,
+    bucket: str,
+    key: str,
+    buffer: memoryview,
+    first: int,
+    last: int,
+    retries: int,
+    buffer_offset: int = 0,
+) -> int:
+    """
+    Download the byte range first..last of an object into buffer, retrying failed attempts.
+
+    The buffer holds the object from byte `buffer_offset`, i.e. byte `first` is written to
+    `buffer[first - buffer_offset]`.
+
+    Returns:
+        int: the number of attempts taken.
+
+    Raises:
+        the last error, once `retries` retries have failed.
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes={first}-{last}"
+            )
+            data = response["Body"].read()
+            if len(data) != last - first + 1:
+                raise IOError(
+                    "short read of bytes %d-%d: %d bytes" % (first, last, len(data))
+                )
+            buffer[first - buffer_offset : last - buffer_offset + 1] = data
+            return attempt + 1
+        except RETRY_ERRORS as err:
+            if attempt == retries:
+                raise
+            log.warning(
+                "download_part() bytes %d-%d of %s attempt %d failed: %s"
+                % (first, last, key, attempt + 1, err)
+            )
+            time.sleep(0.1 * 2**attempt)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def download_object(
+    s3_client,
+    bucket: str,
+    key: str,
+    part_size: int = S3_DOWNLOAD_PART_SIZE,
+    workers: int = S3_DOWNLOAD_WORKERS,
+    retries: int = S3_DOWNLOAD_RETRIES,
+    sha256: Optional[str] = None,
+) -> bytearray:
+    """
+    Download an S3 object as concurrent byte range GETs into a preallocated buffer.
+
+    Args:
+        s3_client: a boto3 S3 client.
+        bucket (str): the bucket name.
+        key (str): the object key.
+        part_size (int): the size of each ranged GET in bytes.
+        workers (int): the number of concurrent GETs.
+        retries (int): the number of retries of each failed part.
+        sha256 (Optional[str]): the expected checksum, defaults to the `sha256` object metadata.
+
+    Returns:
+        bytearray: the object data.
+
+    Raises:
+        botocore.exceptions.ClientError: if the object does not exist, or a part fails every retry.
+        ChecksumMismatchError: if the data does not match the checksum.
+    """
+    tic0 = time.perf_counter()
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    size = head["ContentLength"]
+    sha256 = sha256 or head.get("Metadata", {}).get(SHA256_METADATA_KEY)
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    ranges = byte_ranges(size, part_size)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ranges)))) as executor:
+        attempts = list(
+            executor.map(
+                lambda byte_range: download_part(
+                    s3_client, bucket, key, view, *byte_range, retries
+                ),
+                ranges,
+            )
+        )
+    view.release()
+    tic1 = time.perf_counter()
+    log.info(
+        "download_object() %s: %d bytes in %d parts (%d retries) in %2.3f seconds, %2.1f MB/s"
+        % (
+            key,
+            size,
+            len(ranges),
+            sum(attempts) - len(attempts),
+            tic1 - tic0,
+            size / 1e6 / max(tic1 - tic0, 1e-9),
+        )
+    )
+
+    if sha256:
+        digest = sha256_hexdigest(buffer)
+        if digest != sha256:
+            raise ChecksumMismatchError(
+                "%s sha256 %s does not match the stored %s" % (key, digest, sha256)
+            )
+        log.info(
+            "download_object() %s: checksum verified in %2.3f seconds"
+            % (key, time.perf_counter() - tic1)
+        )
+    else:
+        log.warning("download_object() %s has no stored sha256 checksum" % key)
+    return buffer
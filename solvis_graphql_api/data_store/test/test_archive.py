@@ -0,0 +1,94 @@
+"""
+Tests for range-read access to archive members in S3
+"""
+
+import pathlib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from solvis_graphql_api.data_store import archive
+from solvis_graphql_api.data_store.archive import RangeReadArchive
+from solvis_graphql_api.data_store.config import REGION, S3_BUCKET_NAME
+
+ARCHIVE_PATH = (
+    pathlib.Path(__file__).parent.parent.parent.parent
+    / "tests/fixtures/TinyCompositeSolution.zip"
+)
+KEY = "CompositeSolution/TINY"
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name=REGION)
+        client.create_bucket(Bucket=S3_BUCKET_NAME)
+        client.put_object(
+            Bucket=S3_BUCKET_NAME, Key=KEY, Body=ARCHIVE_PATH.read_bytes()
+        )
+        yield client
+
+
+def test_read_member_only(s3_client, monkeypatch):
+    monkeypatch.setattr(archive, "TAIL_SIZE", 1024)
+    solution_archive = RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, cache_path="")
+    assert sorted(solution_archive.namelist()) == [
+        "CRU_fault_system_solution.zip",
+        "HIK_fault_system_solution.zip",
+        "PUY_fault_system_solution.zip",
+    ]
+
+    data = solution_archive.read_member("PUY_fault_system_solution.zip")
+    with zipfile.ZipFile(ARCHIVE_PATH) as local_archive:
+        assert data == local_archive.read("PUY_fault_system_solution.zip")
+        member_size = local_archive.getinfo(
+            "PUY_fault_system_solution.zip"
+        ).compress_size
+
+    # the tail, the local header read-ahead and the member
+    assert (
+        solution_archive.reader.bytes_read < member_size + 2 * archive.READ_BUFFER_SIZE
+    )
+    assert solution_archive.reader.bytes_read < ARCHIVE_PATH.stat().st_size / 10
+
+    with pytest.raises(KeyError):
+        solution_archive.read_member("XYZ_fault_system_solution.zip")
+
+
+def test_large_reads_in_parts(s3_client):
+    reader = RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, cache_path="").reader
+    reader._part_size = 100_000
+    reader.seek(1000)
+    data = reader.read(250_000)
+    assert data == ARCHIVE_PATH.read_bytes()[1000:251_000]
+    assert reader.requests == 3
+    assert reader.tell() == 251_000
+
+
+def test_members_cached_locally(s3_client, tmp_path):
+    name = "HIK_fault_system_solution.zip"
+    data = RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, tmp_path).read_member(name)
+
+    cached_archive = RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, tmp_path)
+    assert cached_archive.read_member(name) == data
+    assert cached_archive.reader.bytes_read == 0
+
+    # a re-uploaded archive has a new ETag, so the cached member is not used
+    s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=KEY, Body=b"not a zip archive")
+    with pytest.raises(zipfile.BadZipFile):
+        RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, tmp_path).read_member(name)
+
+
+def test_concurrent_member_reads(s3_client):
+    solution_archive = RangeReadArchive(s3_client, S3_BUCKET_NAME, KEY, cache_path="")
+    names = sorted(solution_archive.namelist()) * 2
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        results = list(executor.map(solution_archive.read_member, names))
+
+    with zipfile.ZipFile(ARCHIVE_PATH) as local_archive:
+        assert results == [local_archive.read(name) for name in names]
+        members_size = sum(local_archive.getinfo(name).compress_size for name in names)
+    assert solution_archive.reader.bytes_read >= members_size
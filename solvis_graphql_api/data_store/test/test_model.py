@@ -2,6 +2,8 @@
 Basic tests for our dyanamodb BinaryLargeObject model
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
 from moto import mock_aws
 
@@ -61,3 +63,29 @@ class TestBinaryLargeObject:
         assert savedBlob.object_blob == myBlob.object_blob
         assert savedBlob.to_json() == myBlob.to_json()
         print(savedBlob.to_json())
+
+
+@mock_aws
+def test_s3_clients_shared():
+    model.reset_s3_pool()
+    blobs = [
+        model.BinaryLargeObject(f"ID{n}", "MyObjectTypename", dict(), None)
+        for n in range(2)
+    ]
+    assert blobs[0].s3_client is blobs[1].s3_client
+    assert blobs[0].s3_connection is blobs[1].s3_connection
+    assert blobs[0].s3_client.meta.config.tcp_keepalive
+
+    offline = dict(aws_access_key_id="S3RVER", aws_secret_access_key="S3RVER")
+    blobs[1].set_s3_client_args(offline)
+    assert blobs[0].s3_client is not blobs[1].s3_client
+    assert blobs[1].s3_client is model.get_s3_client(offline)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = set(executor.map(lambda n: id(model.get_s3_client()), range(32)))
+    assert clients == {id(blobs[0].s3_client)}
+
+    client = model.get_s3_client()
+    model.reset_s3_pool()
+    assert model.get_s3_client() is not client
+    model.reset_s3_pool()
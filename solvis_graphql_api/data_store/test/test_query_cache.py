@@ -0,0 +1,157 @@
+"""
+Tests for the persistent QueryCache and its backends
+"""
+
+import os
+import pathlib
+
+import boto3
+import geopandas as gpd
+import pandas as pd
+import pytest
+import shapely.geometry
+from moto import mock_aws
+
+from solvis_graphql_api.data_store import query_cache
+from solvis_graphql_api.data_store.config import REGION, S3_BUCKET_NAME
+
+SECRET = b"test secret"
+ARGUMENTS = dict(model_id="NSHM_v1.0.4", fault_system="CRU", location_ids=["WLG"])
+
+
+@pytest.fixture
+def dataframe():
+    df = pd.DataFrame(
+        {
+            "fault_system": pd.Categorical(["CRU", "CRU"]),
+            "Rupture Index": pd.array([3, 9], dtype="UInt32"),
+            "Magnitude": pd.array([7.2, None], dtype="Float32"),
+        }
+    )
+    return gpd.GeoDataFrame(
+        df.set_index(["fault_system", "Rupture Index"], drop=False),
+        geometry=[
+            shapely.geometry.Point(174.8, -41.3),
+            shapely.geometry.Point(175, -41),
+        ],
+    )
+
+
+def test_canonical_key_is_order_independent():
+    key0 = query_cache.canonical_key("ns", dict(a=1, b=[1, 2]))
+    key1 = query_cache.canonical_key("ns", dict(b=[1, 2], a=1))
+    assert key0 == key1
+    assert key0.startswith("QueryCache/ns/")
+    assert key0 != query_cache.canonical_key("ns", dict(a=1, b=[2, 1]))
+    assert key0 != query_cache.canonical_key("other", dict(a=1, b=[1, 2]))
+
+
+def test_filesystem_backend_round_trip(tmp_path, dataframe):
+    cache = query_cache.QueryCache(
+        query_cache.FilesystemQueryCacheBackend(tmp_path), SECRET
+    )
+    assert cache.get_dataframe("ns", ARGUMENTS) is None
+
+    cache.put_dataframe("ns", ARGUMENTS, dataframe)
+    result = cache.get_dataframe("ns", ARGUMENTS)
+
+    pd.testing.assert_frame_equal(result, dataframe)
+    assert isinstance(result, gpd.GeoDataFrame)
+
+
+def test_filesystem_backend_error_is_a_miss(tmp_path, dataframe):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("not a directory")
+    cache = query_cache.QueryCache(
+        query_cache.FilesystemQueryCacheBackend(blocker), SECRET
+    )
+
+    cache.put_dataframe("ns", ARGUMENTS, dataframe)  # must not raise
+    assert cache.get_dataframe("ns", ARGUMENTS) is None
+
+
+@mock_aws
+def test_s3_backend_round_trip(dataframe):
+    conn = boto3.resource("s3", region_name=REGION)
+    conn.create_bucket(Bucket=S3_BUCKET_NAME)
+
+    cache = query_cache.QueryCache(
+        query_cache.S3QueryCacheBackend(client_args={}), SECRET
+    )
+    assert cache.get_dataframe("ns", ARGUMENTS) is None
+
+    cache.put_dataframe("ns", ARGUMENTS, dataframe)
+    pd.testing.assert_frame_equal(cache.get_dataframe("ns", ARGUMENTS), dataframe)
+
+
+@mock_aws
+def test_s3_backend_missing_bucket_is_a_miss(dataframe):
+    cache = query_cache.QueryCache(
+        query_cache.S3QueryCacheBackend(client_args={}), SECRET
+    )
+    cache.put_dataframe("ns", ARGUMENTS, dataframe)  # must not raise
+    assert cache.get_dataframe("ns", ARGUMENTS) is None
+
+
+def test_get_query_cache_configuration(monkeypatch, tmp_path):
+    query_cache.get_query_cache.cache_clear()
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_BACKEND", "")
+    assert query_cache.get_query_cache() is None
+
+    query_cache.get_query_cache.cache_clear()
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_BACKEND", "filesystem")
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_PATH", str(tmp_path))
+    assert isinstance(
+        query_cache.get_query_cache().backend, query_cache.FilesystemQueryCacheBackend
+    )
+
+    query_cache.get_query_cache.cache_clear()
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_BACKEND", "s3")
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_SECRET", "")
+    assert query_cache.get_query_cache() is None
+
+    query_cache.get_query_cache.cache_clear()
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_SECRET", "secret")
+    assert isinstance(
+        query_cache.get_query_cache().backend, query_cache.S3QueryCacheBackend
+    )
+    query_cache.get_query_cache.cache_clear()
+
+
+def test_bad_signature_is_a_miss(tmp_path, dataframe):
+    backend = query_cache.FilesystemQueryCacheBackend(tmp_path)
+    query_cache.QueryCache(backend, b"another secret").put_dataframe(
+        "ns", ARGUMENTS, dataframe
+    )
+    assert (
+        query_cache.QueryCache(backend, SECRET).get_dataframe("ns", ARGUMENTS) is None
+    )
+
+
+def test_corrupt_object_is_a_miss(tmp_path, dataframe):
+    cache = query_cache.QueryCache(
+        query_cache.FilesystemQueryCacheBackend(tmp_path), SECRET
+    )
+    key = query_cache.canonical_key("ns", ARGUMENTS)
+    payload = b"not a gzipped pickle"
+    cache.backend.put(key, cache.signature(key, payload) + payload)
+    assert cache.get_dataframe("ns", ARGUMENTS) is None
+
+
+def test_filesystem_backend_unique_temporary_files(tmp_path, monkeypatch):
+    backend = query_cache.FilesystemQueryCacheBackend(tmp_path)
+    replaced = []
+
+    def replace(src, dst):
+        replaced.append(src)
+        os.rename(src, dst)
+
+    monkeypatch.setattr(query_cache.os, "replace", replace)
+    backend.put("QueryCache/ns/key", b"first")
+    backend.put("QueryCache/ns/key", b"second")
+
+    assert len(set(replaced)) == 2
+    assert backend.get("QueryCache/ns/key") == b"second"
+    assert [
+        path.name for path in pathlib.Path(tmp_path, "QueryCache/ns").iterdir()
+    ] == ["key"]
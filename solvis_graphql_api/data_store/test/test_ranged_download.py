@@ -0,0 +1,128 @@
+"""
+Tests for the ranged, concurrent S3 download
+"""
+
+import logging
+import os
+
+import boto3
+import botocore
+import pytest
+from moto import mock_aws
+
+from solvis_graphql_api.data_store import model, ranged_download
+from solvis_graphql_api.data_store.config import REGION, S3_BUCKET_NAME
+from solvis_graphql_api.data_store.ranged_download import (
+    ChecksumMismatchError,
+    byte_ranges,
+    download_object,
+    sha256_hexdigest,
+)
+
+DATA = os.urandom(10_000)
+KEY = "CompositeSolution/TEST"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setattr(ranged_download.time, "sleep", lambda seconds: None)
+    with mock_aws():
+        client = boto3.client("s3", region_name=REGION)
+        client.create_bucket(Bucket=S3_BUCKET_NAME)
+        client.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=KEY,
+            Body=DATA,
+            Metadata={"sha256": sha256_hexdigest(DATA)},
+        )
+        yield client
+
+
+class FlakyClient:
+    """An S3 client failing the first GET of each byte range."""
+
+    def __init__(self, client):
+        self._client = client
+        self.failed = set()
+
+    def head_object(self, **kwargs):
+        return self._client.head_object(**kwargs)
+
+    def get_object(self, **kwargs):
+        if kwargs["Range"] not in self.failed:
+            self.failed.add(kwargs["Range"])
+            raise botocore.exceptions.ClientError(
+                dict(Error=dict(Code="SlowDown")), "GetObject"
+            )
+        return self._client.get_object(**kwargs)
+
+
+def test_byte_ranges():
+    assert byte_ranges(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert byte_ranges(8, 4) == [(0, 3), (4, 7)]
+    assert byte_ranges(0, 4) == []
+
+
+def test_download_object_in_parts(s3_client):
+    data = download_object(s3_client, S3_BUCKET_NAME, KEY, part_size=1024, workers=4)
+    assert data == DATA
+
+
+def test_download_object_retries_parts(s3_client):
+    client = FlakyClient(s3_client)
+    assert download_object(client, S3_BUCKET_NAME, KEY, part_size=4096) == DATA
+    assert len(client.failed) == 3
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        download_object(FlakyClient(s3_client), S3_BUCKET_NAME, KEY, retries=0)
+
+
+def test_download_object_checksum(s3_client):
+    with pytest.raises(ChecksumMismatchError):
+        download_object(s3_client, S3_BUCKET_NAME, KEY, sha256="0" * 64)
+
+
+@mock_aws
+def test_blob_saved_with_checksum():
+    conn = boto3.resource("s3", region_name=REGION)
+    conn.create_bucket(Bucket=S3_BUCKET_NAME)
+    model.BinaryLargeObject.create_table()
+
+    blob = model.BinaryLargeObject(
+        object_id="XYZ",
+        object_type="CompositeSolution",
+        object_meta=dict(filename="xyz.zip"),
+        object_blob=DATA,
+    )
+    blob.save()
+    head = blob.s3_client.head_object(
+        Bucket=S3_BUCKET_NAME, Key=KEY.replace("TEST", "XYZ")
+    )
+    assert head["Metadata"]["sha256"] == sha256_hexdigest(DATA)
+
+    saved = model.BinaryLargeObject.get("CompositeSolution", "XYZ")
+    assert saved.object_blob == DATA
+
+
+@mock_aws
+def test_blob_errors(caplog, monkeypatch):
+    conn = boto3.resource("s3", region_name=REGION)
+    conn.create_bucket(Bucket=S3_BUCKET_NAME)
+    model.BinaryLargeObject.create_table()
+
+    blob = model.BinaryLargeObject("NONE", "CompositeSolution", dict(), None)
+    with caplog.at_level(logging.INFO, logger=model.__name__):
+        assert blob.object_blob is None
+    assert "has no blob data" in caplog.text
+
+    def forbidden(*args, **kwargs):
+        raise botocore.exceptions.ClientError(
+            dict(Error=dict(Code="403", Message="Forbidden")), "HeadObject"
+        )
+
+    monkeypatch.setattr(model, "download_object", forbidden)
+    caplog.clear()
+    with pytest.raises(botocore.exceptions.ClientError):
+        model.BinaryLargeObject("XYZ", "CompositeSolution", dict(), None).object_blob
+    assert "failed" in caplog.text
+    assert "not found" not in caplog.text
@@ -0,0 +1,205 @@
+"""Concurrent resolution of independent, heavy GraphQL fields.
+
+graphql-core resolves the fields of an object one after the other. The heavy fields of
+`CompositeRuptureSections` spend most of their time in numpy, shapely and GEOS calls that release the
+GIL, so when a query selects several of them on the same object they are resolved concurrently in a
+bounded thread pool.
+
+Enable this mode by setting GRAPHQL_EXECUTOR_WORKERS to the pool size (0, the default, disables it).
+
+The root STATIC_FIELDS return the same data for every request, so their completed (JSON ready) values
+are kept by StaticFieldsExecutionContext, keyed by the printed field selection.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Type, Union
+
+from graphql import (
+    ExecutionContext,
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLObjectType,
+    Undefined,
+    VariableNode,
+    print_ast,
+    visit,
+)
+from graphql.language import BREAK, Visitor
+from graphql.pyutils import Path, is_awaitable
+
+log = logging.getLogger(__name__)
+
+GRAPHQL_EXECUTOR_WORKERS = int(os.getenv("GRAPHQL_EXECUTOR_WORKERS", "0"))
+
+# independent, CPU-heavy fields, resolved concurrently with their sibling fields
+HEAVY_FIELDS = {
+    "fault_surfaces",
+    "fault_traces",
+    "mfd_histogram",
+    "nearest_ruptures",
+    "location_radii_summary",
+}
+
+STATIC_FIELDS = {"get_locations", "get_location_lists", "get_radii_sets", "about"}
+STATIC_RESULTS_MAXSIZE = 256
+
+_static_results: Dict[str, Any] = {}
+_static_results_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+
+def get_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Return the shared field resolver thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers or GRAPHQL_EXECUTOR_WORKERS or 4,
+                thread_name_prefix="graphql-field",
+            )
+        return _executor
+
+
+class _SelfContainedVisitor(Visitor):
+    """Finds fragment spreads and variables, which make a selection depend on the rest of the request."""
+
+    def __init__(self):
+        super().__init__()
+        self.self_contained = True
+
+    def enter(self, node, *args):
+        if isinstance(node, (FragmentSpreadNode, VariableNode)):
+            self.self_contained = False
+            return BREAK
+
+
+def static_field_key(field_nodes: List[FieldNode]) -> Optional[str]:
+    """Return the cache key of a static field selection, or None if it cannot be cached."""
+    visitor = _SelfContainedVisitor()
+    for field_node in field_nodes:
+        visit(field_node, visitor)
+    if not visitor.self_contained:
+        return None
+    return "\n".join(print_ast(field_node) for field_node in field_nodes)
+
+
+def clear_static_results() -> None:
+    with _static_results_lock:
+        _static_results.clear()
+
+
+class StaticFieldsExecutionContext(ExecutionContext):
+    """An ExecutionContext that completes each distinct selection of the root STATIC_FIELDS once."""
+
+    static_fields = STATIC_FIELDS
+
+    def error_count(self) -> int:
+        # graphql-core 3.2 patch releases moved `errors` to `collected_errors`
+        errors = getattr(self, "errors", None)
+        if errors is None:
+            errors = self.collected_errors.errors
+        return len(errors)
+
+    def execute_field(
+        self,
+        parent_type: GraphQLObjectType,
+        source: Any,
+        field_nodes: List[FieldNode],
+        path: Path,
+    ) -> Any:
+        key = (
+            static_field_key(field_nodes)
+            if path.prev is None
+            and parent_type is self.schema.query_type
+            and field_nodes[0].name.value in self.static_fields
+            else None
+        )
+        if key is None:
+            return super().execute_field(parent_type, source, field_nodes, path)
+
+        with _static_results_lock:
+            if key in _static_results:
+                return _static_results[key]
+
+        error_count = self.error_count()
+        result = super().execute_field(parent_type, source, field_nodes, path)
+        if not is_awaitable(result) and self.error_count() == error_count:
+            with _static_results_lock:
+                if len(_static_results) < STATIC_RESULTS_MAXSIZE:
+                    _static_results[key] = result
+        return result
+
+
+class ThreadPoolExecutionContext(StaticFieldsExecutionContext):
+    """
+    An ExecutionContext that resolves the HEAVY_FIELDS of an object concurrently.
+
+    The heavy fields are submitted to the shared thread pool while the remaining fields are resolved in
+    the calling thread. Fields resolved inside a pool thread are never resubmitted, so nested
+    selections cannot exhaust the pool.
+    """
+
+    heavy_fields = HEAVY_FIELDS
+
+    def execute_fields(
+        self,
+        parent_type: GraphQLObjectType,
+        source_value: Any,
+        path: Optional[Path],
+        fields: Dict[str, List[FieldNode]],
+    ) -> Any:
+        heavy = [
+            response_name
+            for response_name, field_nodes in fields.items()
+            if field_nodes[0].name.value in self.heavy_fields
+        ]
+        if not heavy or len(fields) == 1 or getattr(_worker_state, "active", False):
+            return super().execute_fields(parent_type, source_value, path, fields)
+
+        def execute_field(response_name: str) -> Any:
+            _worker_state.active = True
+            try:
+                return self.execute_field(
+                    parent_type,
+                    source_value,
+                    fields[response_name],
+                    Path(path, response_name, parent_type.name),
+                )
+            finally:
+                _worker_state.active = False
+
+        executor = get_executor()
+        pending: Dict[str, Union[Future, Any]] = {}
+        for response_name in fields:
+            if response_name in heavy:
+                pending[response_name] = executor.submit(execute_field, response_name)
+            else:
+                pending[response_name] = self.execute_field(
+                    parent_type,
+                    source_value,
+                    fields[response_name],
+                    Path(path, response_name, parent_type.name),
+                )
+
+        results = {}
+        for response_name, result in pending.items():
+            if isinstance(result, Future):
+                result = result.result()
+            if result is not Undefined:
+                results[response_name] = result
+        return results
+
+
+def get_execution_context_class() -> Type[ExecutionContext]:
+    """Return ThreadPoolExecutionContext if GRAPHQL_EXECUTOR_WORKERS is set, else StaticFieldsExecutionContext."""
+    return (
+        ThreadPoolExecutionContext
+        if GRAPHQL_EXECUTOR_WORKERS > 0
+        else StaticFieldsExecutionContext
+    )
@@ -0,0 +1,316 @@
+"""HTTP caching of GraphQL responses for the Flask `/graphql` view.
+
+A response is computed from the model package versions and the stored CompositeSolution archives of
+the models it names, so a query always gives the same response until the API is released again or
+an archive is re-uploaded. `cached_view` wraps the GraphQL view:
+
+ - the ETag is a hash of the normalised query document, the variables, the operation name, the API
+   and model package versions, and the archive version (S3 ETag) of each model named in the query
+   or its variables, see `data_version`.
+ - rendered JSON response bodies are kept in a bounded in-process LRU cache keyed by ETag, together
+   with their compressed encodings, so a repeated response is not compressed again.
+ - GET requests (including persisted queries sent by hash) are given a `Cache-Control` header, so
+   that browsers and the CDN can reuse the response, and a matching `If-None-Match` is answered
+   with 304 Not Modified.
+ - compressed responses have an encoding-specific ETag (e.g. `<etag>-gzip`), as their bytes differ
+   from the identity response, `If-None-Match` matches any of the encodings.
+
+Responses with errors, batch queries and GraphiQL pages are not cached.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+import nzshm_model
+from flask import Response, request
+from graphql import GraphQLError, parse, print_ast
+from graphql_server import HttpQueryError
+
+import solvis_graphql_api
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.compression import (
+    accepted_encoding,
+    compress,
+    encoded_etag,
+    encoded_response,
+    should_compress,
+    supported_encodings,
+)
+from solvis_graphql_api.persisted_queries import document_cache, persisted_query_hash
+
+log = logging.getLogger(__name__)
+
+HTTP_CACHE_MAXSIZE = int(os.getenv("HTTP_CACHE_MAXSIZE", "256"))
+HTTP_CACHE_MAXBYTES = int(os.getenv("HTTP_CACHE_MAXBYTES", str(64 * 1024 * 1024)))
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "3600"))
+
+
+class ResponseCache:
+    """
+    A bounded, thread-safe LRU cache of rendered response bodies keyed by ETag.
+
+    Each entry holds the identity body, and the compressed encodings of it that have been served. The
+    cache is bounded by both the number of entries and their total size in bytes, counting every
+    encoding, a body larger than `maxbytes` is not cached.
+    """
+
+    def __init__(
+        self, maxsize: int = HTTP_CACHE_MAXSIZE, maxbytes: int = HTTP_CACHE_MAXBYTES
+    ):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._bodies: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> Optional[bytes]:
+        with self._lock:
+            encodings = self._bodies.get(etag)
+            if encodings is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._bodies.move_to_end(etag)
+            return encodings["identity"]
+
+    def put(self, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._discard(etag)
+            if len(body) > self.maxbytes:
+                return
+            self._bodies[etag] = dict(identity=body)
+            self.nbytes += len(body)
+            self._evict()
+
+    def get_encoded(self, etag: str, encoding: str) -> Optional[bytes]:
+        with self._lock:
+            return self._bodies.get(etag, {}).get(encoding)
+
+    def put_encoded(self, etag: str, encoding: str, body: bytes) -> None:
+        """Add a compressed encoding to a cached body, if the body is still cached."""
+        with self._lock:
+            encodings = self._bodies.get(etag)
+            if encodings is None:
+                return
+            self.nbytes += len(body) - len(encodings.get(encoding, b""))
+            encodings[encoding] = body
+            self._bodies.move_to_end(etag)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bodies.clear()
+            self.nbytes = 0
+            self.hits = self.misses = 0
+
+    def __contains__(self, etag: str) -> bool:
+        with self._lock:
+            return etag in self._bodies
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._bodies)
+
+    def _entry_size(self, encodings: Dict[str, bytes]) -> int:
+        return sum(map(len, encodings.values()))
+
+    def _discard(self, etag: str) -> None:
+        encodings = self._bodies.pop(etag, None)
+        if encodings is not None:
+            self.nbytes -= self._entry_size(encodings)
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries until the cache is within its bounds."""
+        while self._bodies and (
+            len(self._bodies) > self.maxsize or self.nbytes > self.maxbytes
+        ):
+            _, encodings = self._bodies.popitem(last=False)
+            self.nbytes -= self._entry_size(encodings)
+
+
+response_cache = ResponseCache()
+
+
+def normalise_query(query: str) -> str:
+    """Return the query document printed without comments or insignificant whitespace."""
+    try:
+        return print_ast(parse(query, no_location=True))
+    except GraphQLError:
+        return query
+
+
+def data_version(
+    query: str, variables: Optional[Dict[str, Any]] = None
+) -> Dict[str, str]:
+    """
+    Return the archive version of each model named in a query document or its variables.
+
+    A model is named by its id as a string value, e.g. `model_id: "NSHM_v1.0.4"`.
+
+    Returns:
+        Dict[str, str]: the archive version (S3 ETag) of each named model id.
+    """
+    text = query + json.dumps(variables or {})
+    return {
+        model_id: cached.archive_version(model_id)
+        for model_id in nzshm_model.all_model_versions()
+        if json.dumps(model_id) in text
+    }
+
+
+def response_etag(
+    query: str,
+    variables: Optional[Dict[str, Any]] = None,
+    operation_name: Optional[str] = None,
+    sha256_hash: Optional[str] = None,
+) -> str:
+    """
+    Return the (unquoted) ETag of the response to a query, or to a persisted query's hash.
+
+    The query text is required with a hash too, as the archive versions of the models it names are part
+    of the ETag, see `data_version`.
+    """
+    normalised = normalise_query(query)
+    key = json.dumps(
+        [
+            solvis_graphql_api.__version__,
+            nzshm_model.__version__,
+            sha256_hash or normalised,
+            variables or {},
+            operation_name,
+            data_version(normalised, variables),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def request_params() -> Optional[Dict[str, Any]]:
+    """Return the query, variables and operationName of the current request, or None if unsupported."""
+    if request.method == "GET":
+        data: Any = request.args
+    elif request.mimetype == "application/json":
+        data = request.get_json(silent=True)
+    elif request.mimetype == "application/graphql":
+        data = dict(query=request.get_data(as_text=True))
+    else:
+        data = request.form
+    if not isinstance(data, dict) and not hasattr(data, "get"):
+        return None  # e.g. a batch
+
+    query = data.get("query") or ""
+    variables = data.get("variables")
+    try:
+        sha256_hash = persisted_query_hash(data)
+        if isinstance(variables, str):
+            variables = json.loads(variables)
+    except (ValueError, HttpQueryError):
+        return None
+    if sha256_hash and not query:
+        # the models a persisted query names are known once its document is registered
+        document = document_cache.cached_document(sha256_hash)
+        if document is None:
+            return None
+        query = print_ast(document)
+    if not query:
+        return None
+    return dict(
+        query=query,
+        variables=variables,
+        operation_name=data.get("operationName"),
+        sha256_hash=sha256_hash,
+    )
+
+
+def request_wants_html() -> bool:
+    # as GraphQLView.request_wants_html, GraphiQL pages are not cached
+    best = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return (
+        best == "text/html"
+        and request.accept_mimetypes[best]
+        > request.accept_mimetypes["application/json"]
+    )
+
+
+def matching_etag(etag: str) -> Optional[str]:
+    """Return the ETag of any encoding of the response matched by the request `If-None-Match`, or None."""
+    for candidate in [etag] + [
+        encoded_etag(etag, encoding) for encoding in supported_encodings()
+    ]:
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def cache_headers(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    if request.method == "GET":
+        response.headers["Cache-Control"] = "public, max-age=%d" % HTTP_CACHE_MAX_AGE
+    return response
+
+
+def encode_cached(response: Response, etag: str, cache: ResponseCache) -> Response:
+    """Compress a cached response body, reusing the cached compressed bytes when present."""
+    encoding = accepted_encoding()
+    if encoding is None or not should_compress(response):
+        return response
+    body = cache.get_encoded(etag, encoding)
+    if body is None:
+        body = compress(response.get_data(), encoding)
+        cache.put_encoded(etag, encoding, body)
+    else:
+        log.debug("cached_view() cached %s body for %s" % (encoding, etag))
+    return encoded_response(response, body, encoding)
+
+
+def cached_view(view: Callable, cache: ResponseCache = response_cache) -> Callable:
+    """Wrap a GraphQL view function with ETag, 304 and response body caching."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        params = (
+            request_params()
+            if request.method in ("GET", "POST") and not request_wants_html()
+            else None
+        )
+        if params is None:
+            return view(*args, **kwargs)
+
+        try:
+            etag = response_etag(**params)
+        except Exception as err:
+            # e.g. a model without a stored archive, the view reports the error
+            log.warning("cached_view() no ETag for %s: %s" % (params, err))
+            return view(*args, **kwargs)
+        # the ETag identifies the response, so a match needs no cached body
+        matched = matching_etag(etag) if request.method == "GET" else None
+        if matched is not None:
+            log.debug("cached_view() 304 for %s" % matched)
+            return cache_headers(Response(status=304), matched)
+
+        body = cache.get(etag)
+        if body is not None:
+            log.debug("cached_view() cache hit for %s" % etag)
+            response = Response(body, status=200, mimetype="application/json")
+            return encode_cached(cache_headers(response, etag), etag, cache)
+
+        response = view(*args, **kwargs)
+        if not isinstance(response, Response):
+            return response
+        if response.status_code == 200 and response.mimetype == "application/json":
+            body = response.get_data()
+            if b'"errors"' not in body or "errors" not in json.loads(body):
+                cache.put(etag, body)
+                return encode_cached(cache_headers(response, etag), etag, cache)
+        return response
+
+    return wrapper
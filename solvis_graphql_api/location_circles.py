@@ -0,0 +1,125 @@
+"""Precomputed location circle geometries for the location GeoJSON resolvers.
+
+`solvis.geometry.circle_polygon` builds a pyproj transformer for each circle, which dominates the cost
+of rendering a location list. The same circles (a shapely buffer in the location's spherical azimuthal
+equidistant projection) are computed here for many locations at once with the numpy inverse
+projection, and the circles of the LOCATION_LISTS in PRECOMPUTED_LOCATION_LISTS, at every RADII
+distance, are built at import. Other locations and radii are computed on first use.
+
+The table holds GeoJSON geometry mappings, so a resolver only wraps them in a feature.
+"""
+
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import shapely
+from nzshm_common.location.location import LOCATION_LISTS, location_by_id
+
+log = logging.getLogger(__name__)
+
+RADII = [
+    {"id": 1, "radii": [10e3]},
+    {"id": 2, "radii": [10e3, 20e3]},
+    {"id": 3, "radii": [10e3, 20e3, 30e3]},
+    {"id": 4, "radii": [10e3, 20e3, 30e3, 40e3]},
+    {"id": 5, "radii": [10e3, 20e3, 30e3, 40e3, 50e3]},
+    {"id": 6, "radii": [10e3, 20e3, 30e3, 40e3, 50e3, 100e3]},
+    {"id": 7, "radii": [10e3, 20e3, 30e3, 40e3, 50e3, 100e3, 200e3]},
+]
+
+PRECOMPUTED_LOCATION_LISTS = ["NZ", "NZ2", "SRWG214"]
+LOCATION_CIRCLES_MAXSIZE = 4096
+
+# the sphere radius used by solvis.geometry.circle_polygon
+EARTH_RADIUS_M = 6371000.0
+
+_circles: Dict[Tuple[str, int], Dict] = {}
+_circles_lock = threading.Lock()
+
+
+@lru_cache
+def buffer_offsets(radius_m: float) -> np.ndarray:
+    """The (x, y) vertices of a shapely buffer of radius_m around the origin, as circle_polygon uses."""
+    return shapely.get_coordinates(shapely.Point(0, 0).buffer(radius_m))
+
+
+def circle_coordinates(
+    lats: Sequence[float], lons: Sequence[float], radius_m: float
+) -> np.ndarray:
+    """
+    Return the (lon, lat) vertices of the circle around each location.
+
+    The buffer vertices are inverse projected from each location's spherical azimuthal equidistant
+    projection and negative longitudes are wrapped to (0, 360], as for `circle_polygon`.
+
+    Returns:
+        np.ndarray: the (location, vertex, [lon, lat]) coordinates.
+    """
+    offsets = buffer_offsets(radius_m)
+    x, y = offsets[:, 0][np.newaxis, :], offsets[:, 1][np.newaxis, :]
+    phi0 = np.radians(np.asarray(lats, dtype="float64"))[:, np.newaxis]
+    lambda0 = np.radians(np.asarray(lons, dtype="float64"))[:, np.newaxis]
+
+    rho = np.hypot(x, y)
+    c = rho / EARTH_RADIUS_M
+    phi = np.arcsin(np.cos(c) * np.sin(phi0) + y * np.sin(c) * np.cos(phi0) / rho)
+    lambda_ = lambda0 + np.arctan2(
+        x * np.sin(c), rho * np.cos(phi0) * np.cos(c) - y * np.sin(phi0) * np.sin(c)
+    )
+    lons_out = (np.degrees(lambda_) + 180.0) % 360.0 - 180.0
+    lons_out = np.where(lons_out < 0, lons_out + 360.0, lons_out)
+    return np.stack([lons_out, np.degrees(phi)], axis=-1)
+
+
+def build_location_circles(
+    location_ids: Iterable[str], radii_km: Iterable[int]
+) -> Dict[Tuple[str, int], Dict]:
+    """Return the GeoJSON geometry of each (location_id, radius_km) circle."""
+    locations = [location_by_id(location_id) for location_id in location_ids]
+    lats = [location["latitude"] for location in locations]
+    lons = [location["longitude"] for location in locations]
+
+    circles = {}
+    for radius_km in radii_km:
+        coordinates = circle_coordinates(lats, lons, radius_km * 1e3)
+        for location, ring in zip(locations, coordinates):
+            circles[(location["id"], radius_km)] = dict(
+                type="Polygon", coordinates=(tuple(map(tuple, ring.tolist())),)
+            )
+    return circles
+
+
+def precompute_location_circles(
+    list_ids: List[str] = PRECOMPUTED_LOCATION_LISTS,
+) -> int:
+    """Build the circles of the location lists at every RADII distance, returns the table size."""
+    location_ids = {
+        location_id
+        for list_id in list_ids
+        for location_id in LOCATION_LISTS[list_id]["locations"]
+    }
+    radii_km = {
+        int(radius / 1e3) for radii_set in RADII for radius in radii_set["radii"]
+    }
+    circles = build_location_circles(sorted(location_ids), sorted(radii_km))
+    with _circles_lock:
+        _circles.update(circles)
+        return len(_circles)
+
+
+def location_circle(location_id: str, radius_km: int) -> Dict:
+    """Return the GeoJSON geometry of the circle of radius_km around the location."""
+    key = (location_id, radius_km)
+    circle = _circles.get(key)
+    if circle is None:
+        circle = build_location_circles([location_id], [radius_km])[key]
+        with _circles_lock:
+            if len(_circles) < LOCATION_CIRCLES_MAXSIZE:
+                _circles[key] = circle
+    return circle
+
+
+precompute_location_circles()
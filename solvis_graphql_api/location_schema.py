@@ -4,15 +4,14 @@ import logging
 from typing import List
 
 import graphene
-import shapely
 from graphene import relay
 from nzshm_common.location.location import location_by_id
 
-from solvis_graphql_api.composite_solution import cached
 from solvis_graphql_api.geojson_style import (
     GeojsonAreaStyleArgumentsInput,
     apply_geojson_style,
 )
+from solvis_graphql_api.location_circles import location_circle
 
 log = logging.getLogger(__name__)
 
@@ -53,15 +52,12 @@ class LocationDetail(graphene.ObjectType):
         return root.location_id
 
     def resolve_radius_geojson(root, info, radius_km, style, *args, **kwargs):
-        polygon = cached.get_location_polygon(
-            radius_km, lat=root.latitude, lon=root.longitude
-        )
         features = dict(
             features=[
                 dict(
                     id=root.location_id,
                     type="Feature",
-                    geometry=shapely.geometry.mapping(polygon),
+                    geometry=location_circle(root.location_id, radius_km),
                 )
             ]
         )
@@ -91,7 +87,6 @@ def get_location_detail_list(
         for loc in [location_by_id(location_id) for location_id in location_ids]
     ]
 
-    print(nodes)
     edges = [LocationDetailConnection.Edge(node=node) for idx, node in enumerate(nodes)]
 
     # REF https://stackoverflow.com/questions/46179559/custom-connectionfield-in-graphene
@@ -0,0 +1,245 @@
+"""Automatic persisted queries (APQ) with precompiled documents for the Flask `/graphql` view.
+
+Parsing and validating a large query document costs more than answering it from the query caches. The
+view keeps the parsed and validated `DocumentNode` of each query in a bounded LRU cache keyed by the
+sha256 hash of the query text, so a repeated query is executed directly.
+
+Clients may also follow the Apollo APQ protocol, sending only the hash in
+`extensions.persistedQuery.sha256Hash`. An unknown hash is answered with a `PersistedQueryNotFound`
+error, the client then sends the query text together with its hash to register it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Collection, Dict, List, Optional, Tuple, Type
+
+from flask import Response, request
+from graphql import (
+    ASTValidationRule,
+    DocumentNode,
+    ExecutionResult,
+    GraphQLError,
+    GraphQLSchema,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    validate,
+)
+from graphql_server import HttpQueryError, encode_execution_results, load_json_body
+from graphql_server.flask import GraphQLView
+
+log = logging.getLogger(__name__)
+
+PERSISTED_QUERIES_MAXSIZE = int(os.getenv("PERSISTED_QUERIES_MAXSIZE", "512"))
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def persisted_query_hash(params: Dict[str, Any]) -> Optional[str]:
+    """Return the APQ hash of the request parameters, or None."""
+    extensions = params.get("extensions") or {}
+    if isinstance(extensions, str):
+        extensions = load_json_body(extensions)
+    persisted_query = extensions.get("persistedQuery") or {}
+    return persisted_query.get("sha256Hash")
+
+
+class DocumentCache:
+    """
+    A bounded, thread-safe LRU cache of parsed and validated query documents, keyed by query hash.
+
+    The time taken to parse and validate each document is kept, so the time saved by each hit is known.
+    """
+
+    def __init__(self, maxsize: int = PERSISTED_QUERIES_MAXSIZE):
+        self.maxsize = maxsize
+        self._documents: "OrderedDict[str, Tuple[DocumentNode, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def get_document(
+        self,
+        schema: GraphQLSchema,
+        query: Optional[str],
+        sha256_hash: Optional[str] = None,
+        rules: Optional[Collection[Type[ASTValidationRule]]] = None,
+    ) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        """
+        Return the validated document of a query, parsing and validating it on a cache miss.
+
+        Args:
+            schema: the schema to validate the document against.
+            query: the query text, may be omitted for a persisted query.
+            sha256_hash: the APQ hash of the query, if sent.
+            rules: the validation rules, defaults to the graphql-core `specified_rules`.
+
+        Returns:
+            the document, or None and the errors if the query is unknown or not valid.
+
+        Raises:
+            HttpQueryError: if there is no query, or if it does not match sha256_hash.
+        """
+        if query and sha256_hash and query_hash(query) != sha256_hash:
+            raise HttpQueryError(400, "provided sha does not match query")
+        if not (query or sha256_hash):
+            raise HttpQueryError(400, "Must provide query string.")
+        key = sha256_hash or query_hash(query)  # type: ignore
+
+        with self._lock:
+            if key in self._documents:
+                document, seconds = self._documents[key]
+                self._documents.move_to_end(key)
+                self.hits += 1
+                self.seconds_saved += seconds
+                return document, []
+            self.misses += 1
+
+        if not query:
+            return None, [
+                GraphQLError(
+                    PERSISTED_QUERY_NOT_FOUND,
+                    extensions=dict(code="PERSISTED_QUERY_NOT_FOUND"),
+                )
+            ]
+
+        tic = time.perf_counter()
+        try:
+            document = parse(query)
+        except GraphQLError as err:
+            return None, [err]
+        errors = validate(schema, document, rules=rules)
+        if errors:
+            return None, errors
+        seconds = time.perf_counter() - tic
+        log.debug("DocumentCache parse & validate %s in %2.4f seconds" % (key, seconds))
+
+        with self._lock:
+            self._documents[key] = (document, seconds)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document, []
+
+    def cached_document(self, sha256_hash: str) -> Optional[DocumentNode]:
+        """Return the cached document of a query hash, or None, without counting a lookup."""
+        with self._lock:
+            entry = self._documents.get(sha256_hash)
+        return entry[0] if entry else None
+
+    def info(self) -> Dict[str, Any]:
+        """Return hit/miss metrics, including the parse and validate time saved by hits."""
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            currsize=len(self._documents),
+            hit_ratio=self.hits / lookups if lookups else 0.0,
+            seconds_saved=self.seconds_saved,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+            self.hits = self.misses = 0
+            self.seconds_saved = 0.0
+
+
+document_cache = DocumentCache()
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    A GraphQLView executing single queries from the DocumentCache.
+
+    GraphiQL pages and batches are handled by GraphQLView.
+    """
+
+    document_cache = document_cache
+
+    def dispatch_request(self):
+        request_method = request.method.lower()
+        if request_method not in ("get", "post") or (
+            request_method == "get" and self.should_display_graphiql()
+        ):
+            return super().dispatch_request()
+
+        try:
+            data = self.parse_body()
+            if isinstance(data, list):
+                return super().dispatch_request()
+            params = {**request.args.to_dict(), **data}
+
+            document, errors = self.document_cache.get_document(
+                self.schema,
+                params.get("query"),
+                persisted_query_hash(params),
+                rules=self.get_validation_rules(),
+            )
+            if document is None:
+                result = ExecutionResult(data=None, errors=errors)
+            else:
+                result = self.execute_document(request_method, document, params)
+            log.debug("PersistedQueryGraphQLView %s" % self.document_cache.info())
+
+            body, status_code = encode_execution_results(
+                [result],
+                is_batch=False,
+                format_error=self.format_error,
+                encode=partial(
+                    self.encode, pretty=self.pretty or request.args.get("pretty")
+                ),
+            )
+            return Response(body, status=status_code, content_type="application/json")
+
+        except HttpQueryError as e:
+            parsed_error = GraphQLError(e.message)
+            return Response(
+                self.encode(dict(errors=[self.format_error(parsed_error)])),
+                status=e.status_code,
+                headers=e.headers,
+                content_type="application/json",
+            )
+
+    def execute_document(
+        self, request_method: str, document: DocumentNode, params: Dict[str, Any]
+    ) -> ExecutionResult:
+        operation_name = params.get("operationName")
+        if request_method == "get":
+            operation_ast = get_operation_ast(document, operation_name)
+            if operation_ast and operation_ast.operation != OperationType.QUERY:
+                raise HttpQueryError(
+                    405,
+                    f"Can only perform a {operation_ast.operation.value} operation"
+                    " from a POST request.",
+                    headers={"Allow": "POST"},
+                )
+
+        variables = params.get("variables")
+        if isinstance(variables, str):
+            try:
+                variables = json.loads(variables)
+            except ValueError:
+                raise HttpQueryError(400, "Variables are invalid JSON.")
+
+        return execute(
+            self.schema,
+            document,
+            root_value=self.get_root_value(),
+            context_value=self.get_context(),
+            variable_values=variables,
+            operation_name=operation_name,
+            middleware=self.get_middleware(),
+            execution_context_class=self.get_execution_context_class(),
+        )
@@ -1,6 +1,8 @@
 """The main API schema."""
 
 import logging
+from types import MappingProxyType
+from typing import Mapping
 
 import graphene
 from graphene import relay
@@ -16,12 +18,22 @@ from .composite_solution import (
     CompositeSolution,
     FilterRupturesArgs,
     FilterRupturesArgsInput,
+    LocationRadiiSummary,
+    LocationRadiiSummaryArgsInput,
+    MagFreqDistHistograms,
+    NearestRuptureConnection,
+    NearestRupturesArgsInput,
     RuptureDetailConnection,
     SimpleSortRupturesArgs,
     cached,
+    get_composite_rupture_sections_list,
+    get_location_radii_summary,
+    get_mfd_histograms,
     paginated_filtered_ruptures,
+    paginated_nearest_ruptures,
 )
-from .composite_solution.cached import get_composite_solution, parent_fault_names
+from .execution import get_execution_context_class
+from .location_circles import RADII
 from .location_schema import LocationDetailConnection, get_location_detail_list
 
 # from .solution_schema import (
@@ -54,40 +66,42 @@ class LocationList(graphene.ObjectType):
     locations = graphene.List(Location, description="the locations in this list.")
 
     def resolve_locations(root, info, **args):
-        for loc_id in root.location_ids:
-            loc = location_by_id(loc_id)
-            yield Location(loc["id"], loc["name"], loc["latitude"], loc["longitude"])
+        return [LOCATIONS_BY_ID[loc_id] for loc_id in root.location_ids]
 
 
-RADII = [
-    {"id": 1, "radii": [10e3]},
-    {"id": 2, "radii": [10e3, 20e3]},
-    {"id": 3, "radii": [10e3, 20e3, 30e3]},
-    {"id": 4, "radii": [10e3, 20e3, 30e3, 40e3]},
-    {"id": 5, "radii": [10e3, 20e3, 30e3, 40e3, 50e3]},
-    {"id": 6, "radii": [10e3, 20e3, 30e3, 40e3, 50e3, 100e3]},
-    {"id": 7, "radii": [10e3, 20e3, 30e3, 40e3, 50e3, 100e3, 200e3]},
-]
+# the locations, location lists and radii sets are static, so their objects are built once
+LOCATIONS_BY_ID: Mapping[str, Location] = MappingProxyType(
+    {
+        loc["id"]: Location(loc["id"], loc["name"], loc["latitude"], loc["longitude"])
+        for loc in LOCATIONS
+    }
+)
+LOCATION_LISTS_BY_ID: Mapping[str, LocationList] = MappingProxyType(
+    {
+        key: LocationList(key, tuple(ll["locations"]))
+        for key, ll in LOCATION_LISTS.items()
+    }
+)
+RADII_SETS_BY_ID: Mapping[int, RadiiSet] = MappingProxyType(
+    {rad["id"]: RadiiSet(rad["id"], tuple(rad["radii"])) for rad in RADII}
+)
 
 
 def get_one_location(location_id):
-    for loc in LOCATIONS:
-        if loc["id"] == location_id:
-            return Location(loc["id"], loc["name"], loc["latitude"], loc["longitude"])
+    if location_id in LOCATIONS_BY_ID:
+        return LOCATIONS_BY_ID[location_id]
     raise IndexError("Location with id %s was not found." % location_id)
 
 
 def get_one_location_list(location_list_id):
-    ll = LOCATION_LISTS.get(location_list_id)
-    if ll:
-        return LocationList(location_list_id, ll["locations"])
+    if location_list_id in LOCATION_LISTS_BY_ID:
+        return LOCATION_LISTS_BY_ID[location_list_id]
     raise IndexError("LocationList with id %s was not found." % location_list_id)
 
 
 def get_one_radii_set(radii_set_id):
-    for rad in RADII:
-        if rad["id"] == radii_set_id:
-            return RadiiSet(radii_set_id, rad["radii"])
+    if radii_set_id in RADII_SETS_BY_ID:
+        return RADII_SETS_BY_ID[radii_set_id]
     raise IndexError("Radii set with id %s was not found." % radii_set_id)
 
 
@@ -151,9 +165,8 @@ class QueryRoot(graphene.ObjectType):
 
     def resolve_composite_solution(root, info, model_id, **args):
         log.info("resolve_composite_solution model_id: %s" % (model_id))
-        solution = cached.get_composite_solution(model_id)
         return CompositeSolution(
-            model_id=model_id, fault_systems=solution._solutions.keys()
+            model_id=model_id, fault_systems=cached.get_fault_systems(model_id)
         )
 
     composite_rupture_detail = graphene.Field(
@@ -186,6 +199,32 @@ class QueryRoot(graphene.ObjectType):
         )
         return paginated_filtered_ruptures(filter, sortby, **kwargs)
 
+    nearest_ruptures = graphene.ConnectionField(
+        NearestRuptureConnection,
+        site=graphene.Argument(NearestRupturesArgsInput, required=True),
+        description="ruptures ordered by minimum distance to a site (then by descending rate).",
+    )
+
+    def resolve_nearest_ruptures(root, info, site, **kwargs):
+        log.debug(f"resolve_nearest_ruptures() site: {site}, kwargs: {kwargs}")
+        return paginated_nearest_ruptures(site, **kwargs)
+
+    location_radii_summary = graphene.Field(
+        LocationRadiiSummary,
+        site=graphene.Argument(LocationRadiiSummaryArgsInput, required=True),
+        radii_set_id=graphene.Argument(
+            graphene.Int, required=True, description="the id of a radii set."
+        ),
+        description="rupture counts, rates and MFDs within each radius of a radii set around a site.",
+    )
+
+    def resolve_location_radii_summary(root, info, site, radii_set_id, **kwargs):
+        log.debug(
+            f"resolve_location_radii_summary() site: {site}, radii_set_id: {radii_set_id}"
+        )
+        radii_set = get_one_radii_set(radii_set_id)
+        return get_location_radii_summary(site, radii_set_id, radii_set.radii)
+
     filter_rupture_sections = graphene.Field(
         CompositeRuptureSections,
         filter=graphene.Argument(FilterRupturesArgsInput, required=True),
@@ -200,6 +239,35 @@ class QueryRoot(graphene.ObjectType):
             filter_arguments=FilterRupturesArgs(**filter),
         )
 
+    filter_rupture_sections_list = graphene.Field(
+        graphene.List(CompositeRuptureSections),
+        filters=graphene.Argument(
+            graphene.List(graphene.NonNull(FilterRupturesArgsInput)),
+            required=True,
+        ),
+        description="filter_rupture_sections for several filters in one request, computed in parallel.",
+    )
+
+    def resolve_filter_rupture_sections_list(root, info, filters, **kwargs):
+        log.debug(
+            f"resolve_filter_rupture_sections_list() filters: {filters}, kwargs: {kwargs}"
+        )
+        return get_composite_rupture_sections_list(filters, info)
+
+    mfd_histograms = graphene.Field(
+        MagFreqDistHistograms,
+        filters=graphene.Argument(
+            graphene.List(graphene.NonNull(FilterRupturesArgsInput)),
+            required=True,
+            description="the filters to compare, e.g. several fault systems or model versions.",
+        ),
+        description="magnitude frequency distributions of several filters, with aligned bins.",
+    )
+
+    def resolve_mfd_histograms(root, info, filters, **kwargs):
+        log.debug(f"resolve_mfd_histograms() filters: {filters}, kwargs: {kwargs}")
+        return get_mfd_histograms(filters)
+
     # solution_fault_names
     get_parent_fault_names = graphene.Field(
         graphene.List(graphene.String),
@@ -215,9 +283,7 @@ class QueryRoot(graphene.ObjectType):
 
     def resolve_get_parent_fault_names(root, info, model_id, fault_system, **args):
         log.info("resolve_get_parent_fault_names filter:%s" % model_id)
-        composite_solution = get_composite_solution(model_id)
-        fss = composite_solution._solutions[fault_system]
-        return parent_fault_names(fss)
+        return cached.get_parent_fault_names(model_id, fault_system)
 
     # radii fields
     get_radii_set = graphene.Field(
@@ -268,10 +334,7 @@ class QueryRoot(graphene.ObjectType):
 
     def resolve_get_locations(root, info, **args):
         log.info("resolve_get_locations args: %s" % args)
-        return [
-            Location(loc["id"], loc["name"], loc["latitude"], loc["longitude"])
-            for loc in LOCATIONS
-        ]
+        return LOCATIONS_BY_ID.values()
 
     def resolve_get_location_list(root, info, list_id, **args):
         log.info("resolve_get_location args: %s list_id:%s" % (args, list_id))
@@ -279,9 +342,7 @@ class QueryRoot(graphene.ObjectType):
 
     def resolve_get_location_lists(root, info, **args):
         log.info("resolve_get_location_lists args: %s" % args)
-        return [
-            LocationList(key, ll["locations"]) for key, ll in LOCATION_LISTS.items()
-        ]
+        return LOCATION_LISTS_BY_ID.values()
 
     def resolve_get_radii_set(root, info, radii_set_id, **args):
         log.info(
@@ -291,7 +352,10 @@ class QueryRoot(graphene.ObjectType):
 
     def resolve_get_radii_sets(root, info, **args):
         log.info("resolve_get_radii_sets args: %s" % args)
-        return [RadiiSet(rad["id"], rad["radii"]) for rad in RADII]
+        return RADII_SETS_BY_ID.values()
 
 
 schema_root = graphene.Schema(query=QueryRoot, mutation=None, auto_camelcase=False)
+
+# pass this to the GraphQL view to resolve heavy fields concurrently (see execution.py)
+execution_context_class = get_execution_context_class()
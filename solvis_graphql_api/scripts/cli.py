@@ -37,12 +37,21 @@ import boto3
 import botocore
 
 import solvis_graphql_api.data_store.model
+from solvis_graphql_api.composite_solution import cached
 from solvis_graphql_api.data_store.config import (
     IS_OFFLINE,
+    QUERY_CACHE_SECRET,
     REGION,
     S3_BUCKET_NAME,
     TESTING,
 )
+from solvis_graphql_api.data_store.query_cache import (
+    SERIALISATION_VERSION,
+    QueryCache,
+    S3QueryCacheBackend,
+    canonical_key,
+    get_query_cache,
+)
 
 credentials = boto3.Session().get_credentials() if not IS_OFFLINE else None
 s3_client_args = (
@@ -77,7 +86,14 @@ s3_client_args = (
     default=False,
     help="read back and verify the stored object",
 )
-def cli(archive, model_id, ensure_table, read_back):
+@click.option(
+    "--skip_artefacts",
+    "-S",
+    is_flag=True,
+    default=False,
+    help="skip computing and uploading the default view artefacts",
+)
+def cli(archive, model_id, ensure_table, read_back, skip_artefacts):
     """
     Upload solvis composite solutions to service datastore.
 
@@ -89,7 +105,17 @@ def cli(archive, model_id, ensure_table, read_back):
         REGION e.g. `ap-southeast-2`
         DEPLOYMENT_STAGE e.g `dev`
         S3_BUCKET_NAME e.g. `nzshm22-solvis-graphql-api-dev`
+        QUERY_CACHE_BACKEND e.g. `s3` (the default here) or `filesystem`
+        QUERY_CACHE_SECRET the query cache signing key, as deployed with the API
+
+    The default view artefacts (unfiltered section aggregates, fault traces, MFD and parent fault names
+    of each fault system) are computed and uploaded to the query cache, so that the API can serve them
+    without loading the composite solution.
 
+    The artefact keys include the archive version (its S3 ETag), so re-uploading an archive makes every
+    query result persisted for the previous upload unreachable. They also include the serialisation
+    version (pandas, geopandas, shapely and numpy), which must match the deployed API, or the API will
+    not find the artefacts.
     """
     click.echo(f"archive: {archive}")
     click.echo(f"model : {model_id}")
@@ -135,6 +161,28 @@ def cli(archive, model_id, ensure_table, read_back):
 
     click.echo(f"solvis_graphql_api cli uploaded solvis composite solution {newBlob} ")
 
+    if not skip_artefacts:
+        query_cache = get_query_cache()
+        if query_cache is None:
+            if not QUERY_CACHE_SECRET:
+                raise click.UsageError(
+                    "QUERY_CACHE_SECRET is required to upload the default view artefacts"
+                )
+            query_cache = QueryCache(
+                S3QueryCacheBackend(client_args=s3_client_args),
+                QUERY_CACHE_SECRET.encode(),
+            )
+        click.echo(f"archive version: {cached.archive_version(model_id)}")
+        click.echo(
+            f"serialisation version: {SERIALISATION_VERSION} "
+            "(must match the deployed API)"
+        )
+        stored = cached.precompute_default_artefacts(model_id, query_cache)
+        for namespace, arguments in stored:
+            key = canonical_key(namespace, cached.query_arguments(arguments))
+            click.echo(f"uploaded {namespace} {arguments} to {key}")
+        click.echo(f"uploaded {len(stored)} default view artefacts for {model_id}")
+
 
 if __name__ == "__main__":
     cli()  # pragma: no cover
@@ -10,9 +10,12 @@ except ImportError:
 import yaml
 from flask import Flask
 from flask_cors import CORS
-from graphql_server.flask import GraphQLView
 
-from solvis_graphql_api.schema import schema_root
+from solvis_graphql_api.compression import compress_response
+from solvis_graphql_api.cors import CORS_OPTIONS
+from solvis_graphql_api.http_cache import cached_view
+from solvis_graphql_api.persisted_queries import PersistedQueryGraphQLView
+from solvis_graphql_api.schema import execution_context_class, schema_root
 
 LOGGING_CFG = os.getenv("LOGGING_CFG", "solvis_graphql_api/logging_aws.yaml")
 logger = logging.getLogger(__name__)
@@ -42,16 +45,20 @@ def create_app():
     # logger.error('ERROR logging enabled')
 
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, **CORS_OPTIONS)
+    app.after_request(compress_response)
 
     # app.before_first_request(migrate)
 
     app.add_url_rule(
         "/graphql",
-        view_func=GraphQLView.as_view(
-            "graphql",
-            schema=schema_root,
-            graphiql=True,
+        view_func=cached_view(
+            PersistedQueryGraphQLView.as_view(
+                "graphql",
+                schema=schema_root,
+                graphiql=True,
+                execution_context_class=execution_context_class,
+            )
         ),
     )
 
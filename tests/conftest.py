@@ -44,9 +44,16 @@ def archive_fixture(monkeypatch, full_composite_solution):
         full_composite_solution,
     )
     monkeypatch.setattr(
-        "solvis_graphql_api.composite_solution.composite_rupture_detail.get_composite_solution",
-        full_composite_solution,
+        "solvis_graphql_api.composite_solution.cached.archive_version",
+        lambda model_id: "full",
     )
+    for module in ["cached", "composite_rupture_detail"]:
+        monkeypatch.setattr(
+            f"solvis_graphql_api.composite_solution.{module}.get_fault_system_solution",
+            lambda model_id, fault_system: full_composite_solution(model_id)._solutions[
+                fault_system
+            ],
+        )
 
 
 @pytest.fixture
@@ -56,9 +63,13 @@ def archive_fixture_tiny(monkeypatch, tiny_composite_solution):
         tiny_composite_solution,
     )
     monkeypatch.setattr(
-        "solvis_graphql_api.composite_solution.composite_rupture_detail.get_composite_solution",
-        tiny_composite_solution,
-    )
-    monkeypatch.setattr(
-        "solvis_graphql_api.schema.get_composite_solution", tiny_composite_solution
+        "solvis_graphql_api.composite_solution.cached.archive_version",
+        lambda model_id: "tiny",
     )
+    for module in ["cached", "composite_rupture_detail"]:
+        monkeypatch.setattr(
+            f"solvis_graphql_api.composite_solution.{module}.get_fault_system_solution",
+            lambda model_id, fault_system: tiny_composite_solution(model_id)._solutions[
+                fault_system
+            ],
+        )
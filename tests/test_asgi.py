@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+from solvis_graphql_api import asgi
+from solvis_graphql_api.composite_solution import composite_rupture_sections
+from solvis_graphql_api.schema import schema_root
+from solvis_graphql_api.solvis_graphql_api import create_app
+
+QUERY = """
+query {
+  about
+  filter_rupture_sections(
+    filter:{
+      model_id: "NSHM_v1.0.4"
+      location_ids: ["AKL"]
+      fault_system: "CRU",
+      radius_km: 100
+    }
+  )
+  {
+    section_count
+    mfd_histogram { bin_center rate cumulative_rate }
+  }
+}
+"""
+
+
+def call_app(method="POST", path="/graphql", body=b"", query_string=b"", headers=None):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = dict(
+        type="http",
+        method=method,
+        path=path,
+        query_string=query_string,
+        headers=(
+            headers if headers is not None else [(b"content-type", b"application/json")]
+        ),
+    )
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+
+def test_post_query(archive_fixture_tiny, monkeypatch):
+    threads = []
+    mfd_histogram = composite_rupture_sections.mfd_histogram
+
+    def recording_mfd_histogram(filter_key):
+        threads.append(threading.current_thread().name)
+        return mfd_histogram(filter_key)
+
+    monkeypatch.setattr(
+        composite_rupture_sections, "mfd_histogram", recording_mfd_histogram
+    )
+
+    status, headers, body = call_app(body=json.dumps(dict(query=QUERY)).encode())
+
+    assert status == 200
+    assert headers[b"access-control-allow-origin"] == b"*"
+    assert json.loads(body)["data"] == schema_root.execute(QUERY).data
+    # the heavy resolver was offloaded from the event loop thread
+    assert threads[0].startswith("graphql-field")
+
+
+def test_get_query():
+    status, _, body = call_app(
+        method="GET", query_string=b"query=%7Babout%7D", headers=[]
+    )
+    assert status == 200
+    assert json.loads(body)["data"]["about"].startswith("Hello World")
+
+
+def test_mutation_over_get_not_allowed():
+    status, headers, body = call_app(
+        method="GET", query_string=b"query=mutation%7Babout%7D", headers=[]
+    )
+    assert status == 405
+    assert headers[b"allow"] == b"POST"
+    assert "errors" in json.loads(body)
+
+
+def test_not_found():
+    status, _, _ = call_app(path="/other")
+    assert status == 404
+
+
+def test_cors_matches_flask_app():
+    headers = [
+        (b"origin", b"https://example.com"),
+        (b"access-control-request-method", b"POST"),
+        (b"access-control-request-headers", b"content-type"),
+    ]
+    status, asgi_headers, _ = call_app(method="OPTIONS", headers=headers)
+    assert status == 204
+
+    flask_response = (
+        create_app()
+        .test_client()
+        .options(
+            "/graphql",
+            headers={name.decode(): value.decode() for name, value in headers},
+        )
+    )
+    flask_cors_headers = {
+        name.lower(): value
+        for name, value in flask_response.headers.items()
+        if name.lower().startswith("access-control-")
+    }
+    assert flask_cors_headers["access-control-allow-origin"] == "https://example.com"
+    assert {
+        name.decode(): value.decode()
+        for name, value in asgi_headers.items()
+        if name.startswith(b"access-control-")
+    } == flask_cors_headers
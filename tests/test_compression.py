@@ -0,0 +1,126 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from solvis_graphql_api import compression, http_cache
+from solvis_graphql_api.http_cache import response_etag
+from solvis_graphql_api.solvis_graphql_api import create_app
+
+QUERY = """
+query {
+  filter_rupture_sections(
+    filter: {model_id: "NSHM_v1.0.4", fault_system: "CRU", location_ids: [], radius_km: 10}
+  ) {
+    section_count
+    fault_surfaces
+  }
+}
+"""
+
+SMALL_QUERY = "query { get_radii_set(radii_set_id: 2) { radii } }"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    http_cache.response_cache.clear()
+    app = create_app()
+    app.testing = True
+    yield app.test_client()
+    http_cache.response_cache.clear()
+
+
+def test_gzip_response(client, archive_fixture_tiny):
+    response = client.post(
+        "/graphql", json=dict(query=QUERY), headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    data = json.loads(gzip.decompress(response.data))["data"]
+    assert data["filter_rupture_sections"]["section_count"] > 0
+
+    identity = client.post("/graphql", json=dict(query=QUERY))
+    assert "Content-Encoding" not in identity.headers
+    assert json.loads(identity.data)["data"] == data
+    assert len(response.data) < len(identity.data) / 5
+
+
+def test_cached_compressed_bodies(client, archive_fixture_tiny, monkeypatch):
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.post("/graphql", json=dict(query=QUERY), headers=headers)
+    etag = response_etag(QUERY)
+    assert http_cache.response_cache.get_encoded(etag, "gzip") == response.data
+
+    def fail(*args, **kwargs):
+        raise AssertionError("compressed again")
+
+    monkeypatch.setattr(http_cache, "compress", fail)
+    cached = client.post("/graphql", json=dict(query=QUERY), headers=headers)
+    assert cached.data == response.data
+    assert cached.headers["Content-Encoding"] == "gzip"
+    assert http_cache.response_cache.hits == 1
+
+
+def test_encoding_specific_etags(client, archive_fixture_tiny):
+    params = dict(query=QUERY)
+    identity = client.get("/graphql", query_string=params)
+    compressed = client.get(
+        "/graphql", query_string=params, headers={"Accept-Encoding": "gzip"}
+    )
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert identity.headers["ETag"] == '"%s"' % response_etag(QUERY)
+    assert compressed.headers["ETag"] == '"%s-gzip"' % response_etag(QUERY)
+
+    # If-None-Match matches either representation
+    for etag in [identity.headers["ETag"], compressed.headers["ETag"]]:
+        not_modified = client.get(
+            "/graphql",
+            query_string=params,
+            headers={"If-None-Match": etag, "Accept-Encoding": "gzip"},
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.headers["ETag"] == etag
+
+
+def test_small_responses_not_compressed(client):
+    response = client.get(
+        "/graphql",
+        query_string=dict(query=SMALL_QUERY),
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data)["data"]["get_radii_set"]["radii"]
+
+
+def test_brotli_preferred(monkeypatch):
+    brotli = pytest.importorskip("brotli")
+    monkeypatch.setattr(compression, "brotli", brotli)
+    app = create_app()
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        assert compression.accepted_encoding() == "br"
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        assert compression.accepted_encoding() == "gzip"
+
+
+@pytest.mark.slow
+def test_compression_benchmark(client, archive_fixture_tiny):
+    client.post("/graphql", json=dict(query=QUERY))  # load the solution
+
+    timings = []
+    for encoding in ["identity", "gzip", "gzip (cached)"]:
+        if "cached" not in encoding:
+            http_cache.response_cache.clear()
+        tic0 = time.perf_counter()
+        response = client.post(
+            "/graphql",
+            json=dict(query=QUERY),
+            headers={"Accept-Encoding": encoding.split()[0]},
+        )
+        timings.append(
+            f"{encoding}: {len(response.data)} bytes {time.perf_counter() - tic0:2.4f}s"
+        )
+    print("CRU fault_surfaces " + ", ".join(timings))
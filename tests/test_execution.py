@@ -0,0 +1,167 @@
+import threading
+
+import pytest
+from graphql import parse
+
+from solvis_graphql_api import execution
+from solvis_graphql_api.composite_solution import composite_rupture_sections
+from solvis_graphql_api.composite_solution.cached import fault_section_aggregates
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.execution import (
+    StaticFieldsExecutionContext,
+    ThreadPoolExecutionContext,
+    static_field_key,
+)
+from solvis_graphql_api.schema import (
+    LOCATIONS_BY_ID,
+    get_one_location,
+    get_one_radii_set,
+    schema_root,
+)
+
+QUERY = """
+query {
+  filter_rupture_sections(
+    filter:{
+      model_id: "NSHM_v1.0.4"
+      location_ids: ["AKL"]
+      fault_system: "CRU",
+      radius_km: 100
+    }
+  )
+  {
+    model_id
+    section_count
+    fault_surfaces
+    fault_traces
+    mfd_histogram { bin_center rate cumulative_rate }
+  }
+}
+"""
+
+
+def test_heavy_fields_resolved_in_thread_pool(archive_fixture_tiny, monkeypatch):
+    threads = []
+    mfd_histogram = composite_rupture_sections.mfd_histogram
+
+    def recording_mfd_histogram(filter_key):
+        threads.append(threading.current_thread().name)
+        return mfd_histogram(filter_key)
+
+    monkeypatch.setattr(
+        composite_rupture_sections, "mfd_histogram", recording_mfd_histogram
+    )
+
+    serial = schema_root.execute(QUERY)
+    concurrent = schema_root.execute(
+        QUERY, execution_context_class=ThreadPoolExecutionContext
+    )
+
+    assert serial.errors is None
+    assert concurrent.errors is None
+    assert concurrent.data == serial.data
+    assert list(concurrent.data["filter_rupture_sections"].keys()) == [
+        "model_id",
+        "section_count",
+        "fault_surfaces",
+        "fault_traces",
+        "mfd_histogram",
+    ]
+    assert threads[0] == threading.current_thread().name
+    assert threads[1].startswith("graphql-field")
+
+
+STYLED_QUERY = """
+query {
+  filter_rupture_sections(
+    filter:{
+      model_id: "NSHM_v1.0.4"
+      location_ids: ["AKL"]
+      fault_system: "CRU",
+      radius_km: 100
+    }
+  )
+  {
+    fault_surfaces(style: {fill_color: "red", stroke_color: "blue"})
+    fault_traces(color_scale: {name: "inferno"})
+  }
+}
+"""
+
+
+def test_styling_does_not_modify_cached_aggregates(archive_fixture_tiny):
+    fault_section_aggregates.cache_clear()
+    executed = schema_root.execute(
+        STYLED_QUERY, execution_context_class=ThreadPoolExecutionContext
+    )
+    assert executed.errors is None
+
+    for trace_only in [False, True]:
+        gdf = fault_section_aggregates(
+            FilterKey.create("NSHM_v1.0.4", "CRU", location_ids=["AKL"], radius_km=100),
+            trace_only=trace_only,
+        )
+        assert not {"fill", "stroke", "stroke-width"} & set(gdf.columns)
+        assert "rate_weighted_mean.max" in gdf.columns
+    fault_section_aggregates.cache_clear()
+
+
+def test_errors_in_pool_threads_are_reported(archive_fixture_tiny):
+    executed = schema_root.execute(
+        QUERY.replace("radius_km: 100", "radius_km: 100 minimum_mag: 9.5"),
+        execution_context_class=ThreadPoolExecutionContext,
+    )
+    assert executed.data["filter_rupture_sections"]["fault_surfaces"] is None
+    assert executed.data["filter_rupture_sections"]["fault_traces"] is None
+    assert {tuple(error.path) for error in executed.errors} >= {
+        ("filter_rupture_sections", "fault_surfaces"),
+        ("filter_rupture_sections", "fault_traces"),
+    }
+
+
+STATIC_QUERY = """
+query ($list_id: String!) {
+  get_location_lists { list_id location_ids }
+  get_radii_sets { radii_set_id radii }
+  get_location_list(list_id: $list_id) { locations { location_id name } }
+}
+"""
+
+
+def test_static_fields_completed_once():
+    execution.clear_static_results()
+    expected = schema_root.execute(STATIC_QUERY, variable_values=dict(list_id="NZ"))
+    assert expected.errors is None
+
+    results = [
+        schema_root.execute(
+            STATIC_QUERY,
+            variable_values=dict(list_id=list_id),
+            execution_context_class=StaticFieldsExecutionContext,
+        )
+        for list_id in ["NZ", "NZ", "NZ2"]
+    ]
+    assert results[0].data == results[1].data == expected.data
+    assert results[2].data["get_location_list"] != expected.data["get_location_list"]
+
+    # only the static fields are kept, not the field depending on a variable
+    assert len(execution._static_results) == 2
+    cached = execution._static_results[
+        "get_location_lists {\n  list_id\n  location_ids\n}"
+    ]
+    assert results[1].data["get_location_lists"] is cached
+
+
+def test_static_field_key():
+
+    operation = parse("{ get_locations { ...loc } about }").definitions[0]
+    get_locations, about = operation.selection_set.selections
+    assert static_field_key([get_locations]) is None
+    assert static_field_key([about]) == "about"
+
+
+def test_location_indexes():
+    assert get_one_location("WLG") is LOCATIONS_BY_ID["WLG"]
+    assert get_one_radii_set(7).radii == (10e3, 20e3, 30e3, 40e3, 50e3, 100e3, 200e3)
+    with pytest.raises(IndexError):
+        get_one_location("NOWHERE")
@@ -0,0 +1,72 @@
+"""
+Check a fault system solution is loaded from its own member of the stored archive.
+"""
+
+import pathlib
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.data_store import model
+from solvis_graphql_api.data_store.config import REGION, S3_BUCKET_NAME
+
+MODEL_ID = "NSHM_v1.0.4"
+ARCHIVE_PATH = pathlib.Path(__file__).parent / "fixtures/TinyCompositeSolution.zip"
+
+
+def clear_solution_caches():
+    for function in [
+        cached.get_solution_archive,
+        cached.get_fault_system_solution,
+        cached.get_composite_solution,
+    ]:
+        function.cache_clear()
+
+
+@pytest.fixture
+def stored_archive(monkeypatch, tmp_path):
+    with mock_aws():
+        model.reset_s3_pool()
+        boto3.resource("s3", region_name=REGION).create_bucket(Bucket=S3_BUCKET_NAME)
+        model.BinaryLargeObject.create_table()
+        model.BinaryLargeObject(
+            object_id=MODEL_ID,
+            object_type="CompositeSolution",
+            object_meta=dict(filename=ARCHIVE_PATH.name),
+            object_blob=ARCHIVE_PATH.read_bytes(),
+        ).save()
+        monkeypatch.setattr(
+            "solvis_graphql_api.data_store.archive.ARCHIVE_CACHE_PATH", ""
+        )
+        clear_solution_caches()
+        yield
+        clear_solution_caches()
+        model.reset_s3_pool()
+
+
+def test_fault_system_solution_reads_one_member(stored_archive):
+    fss = cached.get_fault_system_solution(MODEL_ID, "PUY")
+    assert len(fss.model.ruptures_with_rupture_rates)
+
+    reader = cached.get_solution_archive(MODEL_ID).reader
+    assert reader.bytes_read < ARCHIVE_PATH.stat().st_size / 4
+
+    composite_solution = cached.get_composite_solution(MODEL_ID)
+    assert composite_solution._solutions["PUY"] is fss
+    assert sorted(composite_solution._solutions) == ["CRU", "HIK", "PUY"]
+
+
+@pytest.mark.parametrize("model_version", [None, "raise"])
+def test_unknown_model_id(stored_archive, monkeypatch, model_version):
+    def get_model_version(model_id):
+        if model_version == "raise":
+            raise ValueError("%s is not a valid model version." % model_id)
+        return model_version
+
+    monkeypatch.setattr(cached.nzshm_model, "get_model_version", get_model_version)
+    with pytest.raises(ValueError, match="XYZ"):
+        cached.get_composite_solution("XYZ")
+    with pytest.raises(ValueError, match="XYZ"):
+        cached.fault_system_codes("XYZ")
@@ -0,0 +1,179 @@
+import pytest
+from graphene.test import Client
+from solvis.filter import FilterRuptureIds
+from solvis.solution.typing import SetOperationEnum
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import DEFAULT_MIN_RATE, FilterKey
+from solvis_graphql_api.composite_solution.filtered_ruptures_args import (
+    FilterRupturesArgs,
+)
+from solvis_graphql_api.schema import schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+
+
+def test_location_ids_are_sorted():
+    key0 = FilterKey.create(MODEL_ID, "CRU", location_ids=["WLG", "AKL"], radius_km=10)
+    key1 = FilterKey.create(
+        MODEL_ID, "CRU", location_ids=("AKL", "WLG", "AKL"), radius_km=10
+    )
+    assert key0 == key1
+    assert hash(key0) == hash(key1)
+    assert key0.location_ids == ("AKL", "WLG")
+
+
+def test_difference_keeps_order():
+    options = dict(multiple_locations=SetOperationEnum.DIFFERENCE.value)
+    key0 = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        location_ids=["WLG", "AKL"],
+        radius_km=10,
+        filter_set_options=options,
+    )
+    key1 = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        location_ids=["AKL", "WLG"],
+        radius_km=10,
+        filter_set_options=options,
+    )
+    assert key0.location_ids == ("WLG", "AKL")
+    assert key0 != key1
+
+    key = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        corupture_fault_names=["Wairau", "Alpine Jacksons to Kaniere"],
+        filter_set_options=dict(multiple_faults=SetOperationEnum.DIFFERENCE.value),
+    )
+    assert key.corupture_fault_names == ("Wairau", "Alpine Jacksons to Kaniere")
+
+
+@pytest.mark.parametrize("location_ids", [["IVC", "DUD"], ["DUD", "IVC"]])
+def test_difference_matches_solvis(archive_fixture_tiny, location_ids):
+    fss = cached.get_fault_system_solution(MODEL_ID, "PUY")
+    expected = FilterRuptureIds(fss).for_polygons(
+        list(cached.get_polygons(location_ids, 200)),
+        join_type=SetOperationEnum.DIFFERENCE,
+    )
+
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+    key = FilterKey.create(
+        MODEL_ID,
+        "PUY",
+        location_ids=location_ids,
+        radius_km=200,
+        filter_set_options=dict(multiple_locations=SetOperationEnum.DIFFERENCE.value),
+    )
+    ruptures = cached.matched_rupture_sections(key)
+    cached.matched_rupture_sections.cache_clear()
+
+    assert set(ruptures["Rupture Index"]) == set(expected)
+
+
+def test_min_rate_default():
+    key0 = FilterKey.create(MODEL_ID, "CRU", min_rate=None)
+    key1 = FilterKey.create(MODEL_ID, "CRU", min_rate=DEFAULT_MIN_RATE)
+    assert key0 == key1
+    assert key0.min_rate == 1e-20
+
+
+def test_radius_dropped_without_locations():
+    assert FilterKey.create(MODEL_ID, "CRU", radius_km=10) == FilterKey.create(
+        MODEL_ID, "CRU", radius_km=100
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        None,
+        dict(multiple_locations=1),
+        frozenset(dict(multiple_locations=2, multiple_faults=1).items()),
+        (("multiple_locations", 1), ("locations_and_faults", 1)),
+    ],
+)
+def test_irrelevant_filter_set_options_dropped(options):
+    key = FilterKey.create(
+        MODEL_ID, "CRU", location_ids=["WLG"], radius_km=10, filter_set_options=options
+    )
+    assert key == FilterKey.create(MODEL_ID, "CRU", location_ids=["WLG"], radius_km=10)
+    assert key.filter_set_options == tuple()
+
+
+def test_relevant_filter_set_options_kept():
+    key = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        location_ids=["WLG", "AKL"],
+        radius_km=10,
+        filter_set_options=dict(multiple_locations=1),
+    )
+    assert key.filter_set_options == (("multiple_locations", 1),)
+    assert key.join_type("multiple_locations").name == "UNION"
+    assert key.join_type("multiple_faults").name == "UNION"
+    assert key.join_type("locations_and_faults").name == "INTERSECTION"
+
+
+def test_from_filter_args():
+    filter_args = FilterRupturesArgs(
+        model_id=MODEL_ID,
+        fault_system="CRU",
+        location_ids=["WLG"],
+        radius_km=10,
+        corupture_fault_names=[],
+        minimum_mag=7.0,
+        filter_set_options=dict(
+            multiple_locations=2, multiple_faults=1, locations_and_faults=2
+        ),
+    )
+    assert FilterKey.from_filter_args(filter_args) == FilterKey.create(
+        MODEL_ID, "CRU", location_ids=("WLG",), radius_km=10, min_mag=7
+    )
+
+
+QUERY = """
+query {
+  filter_rupture_sections(
+    filter:{
+      model_id: "NSHM_v1.0.4"
+      location_ids: %s
+      fault_system: "CRU",
+      radius_km: 100
+      %s
+    }
+  )
+  {
+    section_count
+  }
+}
+"""
+
+
+def test_equivalent_queries_hit_the_cache(archive_fixture_tiny):
+    client = Client(schema_root)
+    cached.fault_section_aggregates.cache_clear()
+
+    for location_ids, extra in [
+        ('["AKL", "WLG"]', "filter_set_options: {multiple_locations: UNION}"),
+        ('["WLG", "AKL"]', "filter_set_options: {multiple_locations: UNION}"),
+        (
+            '["WLG", "AKL", "WLG"]',
+            "minimum_rate: 1.0e-20 filter_set_options: {multiple_locations: UNION}",
+        ),
+        (
+            '["WLG", "AKL"]',
+            "filter_set_options: {multiple_locations: UNION multiple_faults: INTERSECTION}",
+        ),
+    ]:
+        executed = client.execute(QUERY % (location_ids, extra))
+        assert executed["data"]["filter_rupture_sections"]["section_count"] > 0
+
+    metrics = cached.query_cache_info()["fault_section_aggregates"]
+    assert metrics["misses"] == 1
+    assert metrics["hits"] == 3
+    assert metrics["hit_ratio"] == 0.75
+    cached.fault_section_aggregates.cache_clear()
@@ -0,0 +1,107 @@
+import logging
+
+import pytest
+from graphene.test import Client
+
+from solvis_graphql_api.composite_solution import cached, composite_rupture_sections
+from solvis_graphql_api.schema import schema_root
+
+FILTER = """{
+    model_id: "NSHM_v1.0.4"
+    fault_system: "%s"
+    location_ids: %s
+    radius_km: 100
+    filter_set_options: {multiple_locations: UNION}
+    minimum_mag: %s
+}"""
+
+FIELDS = """
+    model_id
+    filter_arguments { fault_system location_ids minimum_mag }
+    section_count
+    max_magnitude
+    mfd_histogram { bin_center rate cumulative_rate }
+"""
+
+FILTERS = [
+    ("CRU", '["AKL"]', 0),
+    ("CRU", '["AKL", "WLG"]', 0),
+    ("PUY", "[]", 7.0),
+    ("PUY", "[]", 7.5),
+    ("CRU", '["WLG", "AKL"]', 0),
+]
+
+
+@pytest.fixture
+def client():
+    return Client(schema_root)
+
+
+@pytest.fixture
+def clear_caches():
+    cached.fault_section_aggregates.cache_clear()
+    cached.matched_rupture_sections.cache_clear()
+    cached.mfd_histogram.cache_clear()
+    cached.superset_results.clear()
+    yield
+    cached.fault_section_aggregates.cache_clear()
+    cached.matched_rupture_sections.cache_clear()
+    cached.mfd_histogram.cache_clear()
+    cached.superset_results.clear()
+
+
+def test_filter_rupture_sections_list(client, archive_fixture_tiny, clear_caches):
+    query = "query { filter_rupture_sections_list(filters: [%s]) { %s } }" % (
+        "\n".join(FILTER % f for f in FILTERS),
+        FIELDS,
+    )
+    executed = client.execute(query)
+    results = executed["data"]["filter_rupture_sections_list"]
+    assert len(results) == len(FILTERS)
+    assert [r["filter_arguments"]["fault_system"] for r in results] == [
+        f[0] for f in FILTERS
+    ]
+    assert results[1] == {
+        **results[4],
+        "filter_arguments": results[1]["filter_arguments"],
+    }
+
+    # four distinct filters were computed once each, by the thread pool
+    metrics = cached.query_cache_info()["fault_section_aggregates"]
+    assert metrics["misses"] == 4
+
+    # and the results match individual filter_rupture_sections queries
+    for filter, result in zip(FILTERS, results):
+        single = client.execute(
+            "query { filter_rupture_sections(filter: %s) { %s } }"
+            % (FILTER % filter, FIELDS)
+        )
+        assert single["data"]["filter_rupture_sections"] == result
+
+
+def test_filter_rupture_sections_list_error(client, archive_fixture_tiny, clear_caches):
+    query = (
+        "query { filter_rupture_sections_list(filters: [%s]) { section_count } }"
+        % ("\n".join(FILTER % f for f in [("PUY", "[]", 7.0), ("PUY", "[]", 9.5)]))
+    )
+    executed = client.execute(query)
+    results = executed["data"]["filter_rupture_sections_list"]
+    assert results[0]["section_count"] > 0
+    assert results[1]["section_count"] is None
+    assert "No fault sections satisfy the filter." in executed["errors"][0]["message"]
+
+
+def test_warm_failures_logged_and_executor_shared(
+    client, archive_fixture_tiny, clear_caches, caplog
+):
+    query = (
+        "query { filter_rupture_sections_list(filters: [%s]) { section_count } }"
+        % ("\n".join(FILTER % f for f in [("PUY", "[]", 7.0), ("PUY", "[]", 9.5)]))
+    )
+    with caplog.at_level(logging.WARNING, logger=composite_rupture_sections.__name__):
+        client.execute(query)
+    assert "warm_filter_caches()" in caplog.text
+
+    executor = composite_rupture_sections.get_batch_executor()
+    client.execute(query)
+    assert composite_rupture_sections.get_batch_executor() is executor
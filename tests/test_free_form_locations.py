@@ -0,0 +1,186 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from graphene.test import Client
+from nzshm_common.location.location import location_by_id
+from solvis.filter import FilterRuptureIds
+from solvis.solution.typing import SetOperationEnum
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import (
+    FilterKey,
+    canonical_polygon,
+)
+from solvis_graphql_api.composite_solution.location_filter import geometry_hash
+from solvis_graphql_api.schema import schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+
+AKL = location_by_id("AKL")
+WLG = location_by_id("WLG")
+
+
+def circle_geojson(location, radius_km):
+    polygon = cached.get_location_polygon(
+        radius_km, lat=location["latitude"], lon=location["longitude"]
+    )
+    return shapely.geometry.mapping(polygon)
+
+
+def test_filter_key_points_and_polygon():
+    polygon = circle_geojson(AKL, 100)
+    key = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        points=[
+            dict(latitude=-41.3, longitude=174.78),
+            (-36.87, 174.77),
+            dict(latitude=-41.3, longitude=174.78),
+        ],
+        radius_km=50,
+        polygon=json.dumps(dict(type="Feature", geometry=polygon, properties={})),
+    )
+    assert key.points == ((-41.3, 174.78), (-36.87, 174.77))
+    assert key.radius_km == 50
+    assert key.polygon == canonical_polygon(polygon)
+    assert key.filter_set_options == (
+        ("multiple_locations", SetOperationEnum.INTERSECTION.value),
+    )
+    assert key.has_locations
+
+    # without points or location_ids the radius cannot affect the result
+    key = FilterKey.create(MODEL_ID, "CRU", polygon=polygon, radius_km=50)
+    assert key.radius_km is None
+    assert key.filter_set_options == ()
+
+
+def test_canonical_polygon_rejects_other_geometries():
+    with pytest.raises(ValueError):
+        canonical_polygon(dict(type="Point", coordinates=[174.77, -36.87]))
+    assert canonical_polygon(None) is None
+
+
+def test_geometry_hash_ignores_vertex_order():
+    polygon = shapely.geometry.Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+    reordered = shapely.geometry.Polygon([(1, 1), (0, 1), (0, 0), (1, 0)])
+    assert geometry_hash(polygon) == geometry_hash(reordered)
+    assert geometry_hash(polygon) != geometry_hash(shapely.box(0, 0, 2, 2))
+
+
+@pytest.mark.parametrize("engine", ["solvis", "strtree", "distance"])
+def test_points_and_polygon_match_location_ids(
+    archive_fixture_tiny, monkeypatch, engine
+):
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", engine)
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+    options = dict(multiple_locations=SetOperationEnum.UNION.value)
+
+    expected = cached._matched_rupture_sections(
+        FilterKey.create(
+            MODEL_ID,
+            "CRU",
+            location_ids=["AKL", "WLG"],
+            radius_km=300,
+            filter_set_options=options,
+        )
+    )
+    assert len(expected)
+
+    free_form = cached._matched_rupture_sections(
+        FilterKey.create(
+            MODEL_ID,
+            "CRU",
+            points=[(AKL["latitude"], AKL["longitude"])],
+            radius_km=300,
+            polygon=circle_geojson(WLG, 300),
+            filter_set_options=options,
+        )
+    )
+    pd.testing.assert_frame_equal(free_form, expected)
+
+
+@pytest.mark.parametrize("engine", ["solvis", "strtree", "distance"])
+@pytest.mark.parametrize(
+    "location_ids, point_ids",
+    [([], ["IVC", "DUD"]), ([], ["DUD", "IVC"]), (["DUD"], ["IVC"])],
+)
+def test_points_difference_keeps_order(
+    archive_fixture_tiny, monkeypatch, engine, location_ids, point_ids
+):
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", engine)
+    fss = cached.get_fault_system_solution(MODEL_ID, "PUY")
+    expected = FilterRuptureIds(fss).for_polygons(
+        list(cached.get_polygons(location_ids + point_ids, 200)),
+        join_type=SetOperationEnum.DIFFERENCE,
+    )
+
+    key = FilterKey.create(
+        MODEL_ID,
+        "PUY",
+        location_ids=location_ids,
+        points=cached.get_location_points(point_ids),
+        radius_km=200,
+        filter_set_options=dict(multiple_locations=SetOperationEnum.DIFFERENCE.value),
+    )
+    assert key.points == tuple(cached.get_location_points(point_ids))
+    ruptures = cached._matched_rupture_sections(key)
+    assert set(ruptures["Rupture Index"]) == set(expected)
+
+
+def test_polygon_rupture_ids_cached_by_hash(archive_fixture_tiny, monkeypatch):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["PUY"]
+    location_filter = cached.get_section_location_filter(MODEL_ID, "PUY", fss)
+    polygon = shapely.from_wkt(canonical_polygon(circle_geojson(WLG, 200)))
+    expected = location_filter.rupture_ids_for_polygons([polygon])
+
+    def fail(polygons):
+        raise AssertionError("polygon was intersected again")
+
+    monkeypatch.setattr(location_filter, "section_ids_for_polygons_strtree", fail)
+    np.testing.assert_array_equal(
+        location_filter.rupture_ids_for_polygons([shapely.normalize(polygon)]),
+        expected,
+    )
+
+
+def test_query_with_points_and_polygon(archive_fixture_tiny):
+    QUERY = """
+    query ($points: [LatLonInput!], $polygon: JSONString) {
+        filter_rupture_sections(
+            filter:{
+                model_id: "NSHM_v1.0.4"
+                fault_system: "CRU"
+                location_ids: []
+                points: $points
+                polygon: $polygon
+                radius_km: 100
+                filter_set_options: {multiple_locations: UNION}
+            }
+        )
+        {
+            model_id
+            section_count
+        }
+    }
+    """
+    executed = Client(schema_root).execute(
+        QUERY,
+        variable_values=dict(
+            points=[dict(latitude=AKL["latitude"], longitude=AKL["longitude"])],
+            polygon=json.dumps(circle_geojson(WLG, 100)),
+        ),
+    )
+    assert "errors" not in executed, executed
+    section_count = executed["data"]["filter_rupture_sections"]["section_count"]
+
+    executed = Client(schema_root).execute(
+        QUERY.replace("location_ids: []", 'location_ids: ["AKL", "WLG"]')
+        .replace("points: $points", "")
+        .replace("polygon: $polygon", "")
+        .replace("($points: [LatLonInput!], $polygon: JSONString)", "")
+    )
+    assert executed["data"]["filter_rupture_sections"]["section_count"] == section_count
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+from solvis_graphql_api import http_cache
+from solvis_graphql_api.http_cache import normalise_query, response_etag
+from solvis_graphql_api.solvis_graphql_api import create_app
+
+QUERY = "query { get_radii_set(radii_set_id: 2) { radii } }"
+
+
+@pytest.fixture
+def client():
+    http_cache.response_cache.clear()
+    app = create_app()
+    app.testing = True
+    yield app.test_client()
+    http_cache.response_cache.clear()
+
+
+def test_etag_normalises_query():
+    spaced = """
+    # a comment
+    query {
+        get_radii_set(radii_set_id: 2)   { radii }
+    }
+    """
+    assert normalise_query(spaced) == normalise_query(QUERY)
+    assert response_etag(spaced) == response_etag(QUERY)
+    assert response_etag(QUERY) != response_etag(QUERY, variables=dict(a=1))
+    assert response_etag(QUERY) != response_etag(QUERY, operation_name="other")
+
+
+def test_get_cache_control_and_304(client):
+    response = client.get("/graphql", query_string=dict(query=QUERY))
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+    etag = response.headers["ETag"]
+    assert etag == '"%s"' % response_etag(QUERY)
+    assert json.loads(response.data)["data"]["get_radii_set"]["radii"] == [
+        10000,
+        20000,
+    ]
+
+    not_modified = client.get(
+        "/graphql", query_string=dict(query=QUERY), headers={"If-None-Match": etag}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == etag
+
+
+def test_post_served_from_cache(client):
+    body = dict(query=QUERY)
+    response = client.post("/graphql", json=body)
+    assert response.status_code == 200
+    assert "Cache-Control" not in response.headers
+    assert len(http_cache.response_cache) == 1
+
+    cached = client.post("/graphql", json=body)
+    assert cached.data == response.data
+    assert cached.headers["ETag"] == response.headers["ETag"]
+    assert http_cache.response_cache.hits == 1
+
+
+def test_errors_not_cached(client):
+    response = client.post(
+        "/graphql",
+        json=dict(query="query { get_radii_set(radii_set_id: 99) { radii } }"),
+    )
+    assert "errors" in json.loads(response.data)
+    assert "ETag" not in response.headers
+    assert len(http_cache.response_cache) == 0
+
+
+def test_response_cache_bounded():
+    cache = http_cache.ResponseCache(maxsize=2)
+    for etag in ["a", "b", "c"]:
+        cache.put(etag, etag.encode())
+    assert cache.get("a") is None
+    assert cache.get("b") == b"b"
+    cache.put("d", b"d")
+    assert "c" not in cache
+    assert "b" in cache
+
+
+def test_response_cache_bounded_by_bytes():
+    cache = http_cache.ResponseCache(maxsize=10, maxbytes=10)
+    for etag in ["a", "b", "c"]:
+        cache.put(etag, etag.encode() * 4)
+    assert "a" not in cache
+    assert len(cache) == 2
+    assert cache.nbytes == 8
+
+    cache.put("b", b"b")
+    assert cache.nbytes == 5
+
+    # a body larger than the cache is not kept
+    cache.put("d", b"d" * 11)
+    assert "d" not in cache
+    assert cache.nbytes == 5
+
+
+def test_response_cache_counts_encodings():
+    cache = http_cache.ResponseCache(maxsize=10, maxbytes=10)
+    cache.put("a", b"a" * 4)
+    cache.put("b", b"b" * 4)
+    cache.put_encoded("b", "gzip", b"z")
+    assert cache.nbytes == 9
+
+    # the compressed copy counts towards the limit, and marks its entry as recently used
+    cache.put_encoded("a", "gzip", b"zz")
+    assert "b" not in cache
+    assert cache.nbytes == 6
+    assert cache.get_encoded("a", "gzip") == b"zz"
+
+
+def test_etag_includes_archive_version(monkeypatch):
+    model_query = (
+        'query { get_parent_fault_names(model_id: "NSHM_v1.0.4", fault_system: "CRU") }'
+    )
+    versions = dict(value="first")
+    looked_up = []
+
+    def archive_version(model_id):
+        looked_up.append(model_id)
+        return versions["value"]
+
+    monkeypatch.setattr(http_cache.cached, "archive_version", archive_version)
+
+    first = response_etag(model_query)
+    assert looked_up == ["NSHM_v1.0.4"]
+    versions["value"] = "re-uploaded"
+    assert response_etag(model_query) != first
+
+    # a model named in the variables
+    variables = dict(model_id="NSHM_v1.0.4")
+    assert response_etag(QUERY, variables=variables) != response_etag(
+        QUERY, variables=dict(model_id="other")
+    )
+
+    # queries naming no model need no lookup
+    looked_up.clear()
+    response_etag(QUERY)
+    assert looked_up == []
+
+
+def test_unregistered_persisted_query_not_cached(client):
+    extensions = json.dumps(dict(persistedQuery=dict(version=1, sha256Hash="0" * 64)))
+    response = client.get("/graphql", query_string=dict(extensions=extensions))
+    assert "PersistedQueryNotFound" in response.data.decode()
+    assert "ETag" not in response.headers
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import solvis.geometry
+from nzshm_common.location.location import LOCATION_LISTS, location_by_id
+
+from solvis_graphql_api import location_circles
+from solvis_graphql_api.location_circles import (
+    build_location_circles,
+    circle_coordinates,
+    location_circle,
+)
+
+
+@pytest.mark.parametrize("radius_km", [10, 50, 200])
+def test_circles_match_solvis(radius_km):
+    location_ids = ["WLG", "AKL", "ZQN", "GIS", "CHC"]
+    locations = [location_by_id(location_id) for location_id in location_ids]
+    coordinates = circle_coordinates(
+        [location["latitude"] for location in locations],
+        [location["longitude"] for location in locations],
+        radius_km * 1e3,
+    )
+    for location, ring in zip(locations, coordinates):
+        polygon = solvis.geometry.circle_polygon(
+            radius_km * 1e3, lat=location["latitude"], lon=location["longitude"]
+        )
+        np.testing.assert_allclose(ring, np.array(polygon.exterior.coords), atol=1e-9)
+
+
+def test_location_lists_precomputed():
+    for location_id in LOCATION_LISTS["NZ"]["locations"]:
+        for radius_km in [10, 20, 30, 40, 50, 100, 200]:
+            assert (location_id, radius_km) in location_circles._circles
+
+    circle = location_circle("WLG", 100)
+    assert location_circle("WLG", 100) is circle
+    assert circle["type"] == "Polygon"
+    assert len(circle["coordinates"][0]) == 65
+
+
+def test_location_circle_on_demand(monkeypatch):
+    monkeypatch.setattr(location_circles, "_circles", {})
+    circle = location_circle("WLG", 15)
+    assert location_circles._circles[("WLG", 15)] is circle
+    assert circle == build_location_circles(["WLG"], [15])[("WLG", 15)]
+
+    monkeypatch.setattr(location_circles, "LOCATION_CIRCLES_MAXSIZE", 1)
+    location_circle("AKL", 15)
+    assert list(location_circles._circles) == [("WLG", 15)]
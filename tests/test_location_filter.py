@@ -0,0 +1,229 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from nzshm_common.location.location import LOCATION_LISTS, location_by_id
+from solvis.filter import FilterRuptureIds
+from solvis.solution.typing import SetOperationEnum
+
+from solvis_graphql_api.composite_solution import (
+    cached,
+)
+from solvis_graphql_api.composite_solution import (
+    location_filter as location_filter_module,
+)
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.composite_solution.location_filter import SectionLocationFilter
+
+MODEL_ID = "NSHM_v1.0.4"
+
+LOCATION_SETS = [
+    ["AKL"],
+    ["AKL", "WLG"],
+    ["WLG", "AKL", "CHC"],
+    ["ZQN"],
+]
+
+
+def solvis_rupture_ids(fss, polygons, join_type):
+    rupture_ids = FilterRuptureIds(fss).for_polygons(polygons, join_type=join_type)
+    return np.array(sorted(rupture_ids))
+
+
+def non_zero_rate(fss, rupture_ids):
+    """The solvis filter drops ruptures with zero rate."""
+    ruptures = fss.model.ruptures_with_rupture_rates
+    rated = ruptures[ruptures.rate_weighted_mean > 0]["Rupture Index"]
+    return np.intersect1d(rupture_ids, rated)
+
+
+def test_rupture_ids_for_sections(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["CRU"]
+    matrix = cached.get_rupture_section_matrix(MODEL_ID, "CRU", fss)
+    fsr = fss.model.fault_sections_with_rupture_rates
+
+    sections = fsr.section.unique()[::5]
+    expected = np.sort(fsr[fsr.section.isin(sections)]["Rupture Index"].unique())
+    np.testing.assert_array_equal(matrix.rupture_ids_for_sections(sections), expected)
+    assert len(matrix.rupture_ids_for_sections([-1.0])) == 0
+
+
+@pytest.mark.parametrize("engine", ["strtree", "process_pool"])
+@pytest.mark.parametrize("fault_system", ["CRU", "PUY"])
+@pytest.mark.parametrize("location_ids", LOCATION_SETS)
+@pytest.mark.parametrize(
+    "join_type",
+    [
+        SetOperationEnum.UNION,
+        SetOperationEnum.INTERSECTION,
+        SetOperationEnum.DIFFERENCE,
+    ],
+)
+def test_engine_agrees_with_solvis(
+    archive_fixture_tiny, engine, fault_system, location_ids, join_type
+):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions[fault_system]
+    location_filter = cached.get_section_location_filter(MODEL_ID, fault_system, fss)
+    polygons = list(cached.get_polygons(location_ids, 300))
+
+    rupture_ids = location_filter.rupture_ids_for_polygons(
+        polygons, join_type=join_type, engine=engine
+    )
+    np.testing.assert_array_equal(
+        non_zero_rate(fss, rupture_ids), solvis_rupture_ids(fss, polygons, join_type)
+    )
+
+
+def test_strtree_built_at_load_time(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["PUY"]
+    location_filter = cached.get_section_location_filter(MODEL_ID, "PUY", fss)
+    assert location_filter.tree is location_filter.tree
+    assert len(location_filter.tree) == len(fss.solution_file.fault_sections)
+
+
+def test_process_pool_chunks(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["CRU"]
+    location_filter = cached.get_section_location_filter(MODEL_ID, "CRU", fss)
+    polygons = list(cached.get_polygons(["AKL", "WLG"], 300))
+
+    chunked = location_filter.section_ids_for_polygons_process_pool(
+        polygons, chunk_size=7
+    )
+    for polygon, section_ids in zip(polygons, chunked):
+        sections = fss.solution_file.fault_sections
+        expected = sections[sections.geometry.intersects(polygon)].index
+        np.testing.assert_array_equal(section_ids, expected.to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize("fault_system", ["CRU", "PUY", "HIK"])
+@pytest.mark.parametrize("radius_km", [10, 50, 100, 200, 300])
+def test_distance_table_agrees_with_polygons(
+    archive_fixture_tiny, fault_system, radius_km
+):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions[fault_system]
+    location_filter = cached.get_section_location_filter(MODEL_ID, fault_system, fss)
+
+    for location_id in LOCATION_LISTS["NZ"]["locations"]:
+        location = location_by_id(location_id)
+        lat, lon = location["latitude"], location["longitude"]
+        polygon = cached.get_location_polygon(radius_km, lon=lon, lat=lat)
+        distances = location_filter.section_distances(lat, lon)
+
+        intersecting = location_filter.section_ids_for_polygons_strtree([polygon])[0]
+        within = location_filter.section_ids_within(lat, lon, radius_km)
+
+        # circle_polygon is a 64-gon, so sections near the circle may be classified differently
+        disagree = np.isin(
+            location_filter.section_ids, np.setxor1d(intersecting, within)
+        )
+        assert (np.abs(distances[disagree] - radius_km) < radius_km * 0.005).all()
+
+
+def test_distance_table_any_radius(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["CRU"]
+    location_filter = cached.get_section_location_filter(MODEL_ID, "CRU", fss)
+    location = location_by_id("WLG")
+    lat, lon = location["latitude"], location["longitude"]
+
+    distances = location_filter.section_distances(lat, lon)
+    assert location_filter.section_distances(lat, lon) is distances
+
+    previous = np.empty(0)
+    for radius_km in [0.5, 12.25, 77.7, 333.3, 5000]:
+        section_ids = location_filter.section_ids_within(lat, lon, radius_km)
+        assert np.isin(previous, section_ids).all()
+        previous = section_ids
+    assert len(previous) == len(location_filter.section_ids)
+
+
+@pytest.mark.parametrize("engine", ["strtree", "process_pool", "distance"])
+def test_matched_rupture_sections_engine(archive_fixture_tiny, monkeypatch, engine):
+    filter_key = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        location_ids=["AKL", "WLG"],
+        radius_km=300,
+        filter_set_options=dict(multiple_locations=SetOperationEnum.UNION.value),
+    )
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", "solvis")
+    expected = cached._matched_rupture_sections(filter_key)
+    assert len(expected)
+
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", engine)
+    pd.testing.assert_frame_equal(
+        cached._matched_rupture_sections(filter_key), expected
+    )
+
+
+@pytest.mark.slow
+def test_location_filter_benchmark(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["CRU"]
+    location_filter = cached.get_section_location_filter(MODEL_ID, "CRU", fss)
+    polygons = list(cached.get_polygons(LOCATION_LISTS["NZ"]["locations"], 100))
+    location_filter.rupture_ids_for_polygons(polygons[:1], engine="process_pool")
+
+    tic0 = time.perf_counter()
+    expected = solvis_rupture_ids(fss, polygons, SetOperationEnum.UNION)
+    timings = [f"solvis: {time.perf_counter() - tic0:2.4f}s"]
+
+    for engine in ["strtree", "process_pool"]:
+        tic0 = time.perf_counter()
+        rupture_ids = location_filter.rupture_ids_for_polygons(polygons, engine=engine)
+        timings.append(f"{engine}: {time.perf_counter() - tic0:2.4f}s")
+        np.testing.assert_array_equal(non_zero_rate(fss, rupture_ids), expected)
+
+    for label in ["distance (first use)", "distance (table)"]:
+        tic0 = time.perf_counter()
+        rupture_ids = location_filter.rupture_ids_for_locations(
+            cached.get_location_points(LOCATION_LISTS["NZ"]["locations"]), 100
+        )
+        timings.append(f"{label}: {time.perf_counter() - tic0:2.4f}s")
+        np.testing.assert_array_equal(non_zero_rate(fss, rupture_ids), expected)
+
+    print(f"{len(polygons)} locations " + ", ".join(timings))
+
+
+def test_process_pool_geometries_saved_once(
+    archive_fixture_tiny, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        location_filter_module, "LOCATION_FILTER_GEOMETRIES_PATH", str(tmp_path)
+    )
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["CRU"]
+    location_filter = SectionLocationFilter.from_solution(
+        fss, cached.get_rupture_section_matrix(MODEL_ID, "CRU", fss)
+    )
+
+    path = location_filter.geometries_path
+    assert path == location_filter.geometries_path
+    assert [item.name for item in tmp_path.iterdir()] == [os.path.basename(path)]
+    assert shapely.equals(
+        location_filter_module.load_geometries(path), location_filter.geometries
+    ).all()
+    assert location_filter_module.load_geometries(
+        path
+    ) is location_filter_module.load_geometries(path)
+
+    # a request only sends the polygons and a chunk range
+    polygon = list(cached.get_polygons(["WLG"], 300))[0]
+    stop = len(location_filter.geometries)
+    positions = location_filter_module.intersecting_positions(
+        path, 2, stop, shapely.to_wkb([polygon])
+    )
+    expected = np.flatnonzero(
+        shapely.intersects(location_filter.geometries[2:stop], polygon)
+    )
+    assert len(expected)
+    np.testing.assert_array_equal(positions[0], expected)
+
+
+def test_get_process_pool_workers():
+    pool = location_filter_module.get_process_pool(3)
+    assert location_filter_module.get_process_pool(3) is pool
+    assert location_filter_module.get_process_pool(1) is not pool
+    assert pool._max_workers == 3
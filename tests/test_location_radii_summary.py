@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+from graphene.test import Client
+
+from solvis_graphql_api.asgi import OFFLOAD_FIELDS
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.composite_solution.mfd import build_mfd
+from solvis_graphql_api.execution import HEAVY_FIELDS
+from solvis_graphql_api.schema import RADII, schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+
+QUERY = """
+query ($site: LocationRadiiSummaryArgsInput!, $radii_set_id: Int!) {
+    location_radii_summary(site: $site, radii_set_id: $radii_set_id) {
+        radii_set_id
+        bin_centers
+        radii { radius_km rupture_count total_rate rates cumulative_rates }
+    }
+}
+"""
+
+
+@pytest.mark.parametrize("fault_system", ["CRU", "PUY"])
+def test_radii_summary_matches_radius_filters(
+    archive_fixture_tiny, monkeypatch, fault_system
+):
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", "distance")
+    radii_km = tuple(radius / 1e3 for radius in RADII[-1]["radii"])
+    lat, lon = cached.get_site_point("WLG")
+
+    summary, histograms = cached.location_radii_summary(
+        MODEL_ID, fault_system, lat=lat, lon=lon, radii_km=radii_km
+    )
+    assert list(summary.radius_km) == list(radii_km)
+    assert summary.rupture_count.is_monotonic_increasing
+
+    for row, histogram in zip(summary.itertuples(), histograms):
+        ruptures = cached._matched_rupture_sections(
+            FilterKey.create(
+                MODEL_ID,
+                fault_system,
+                location_ids=["WLG"],
+                radius_km=row.radius_km,
+            )
+        )
+        assert row.rupture_count == len(ruptures)
+        assert row.total_rate == pytest.approx(ruptures.rate_weighted_mean.sum())
+        pd.testing.assert_frame_equal(histogram, build_mfd(ruptures))
+
+
+def test_radii_summary_query(archive_fixture_tiny):
+    site = dict(
+        model_id=MODEL_ID,
+        fault_system="CRU",
+        point=dict(latitude=-41.3, longitude=174.78),
+    )
+    executed = Client(schema_root).execute(
+        QUERY, variable_values=dict(site=site, radii_set_id=6)
+    )
+    assert "errors" not in executed, executed
+    result = executed["data"]["location_radii_summary"]
+    assert result["radii_set_id"] == 6
+    assert [radius["radius_km"] for radius in result["radii"]] == [
+        10,
+        20,
+        30,
+        40,
+        50,
+        100,
+    ]
+    for radius in result["radii"]:
+        assert len(radius["rates"]) == len(result["bin_centers"])
+        assert radius["cumulative_rates"][0] == pytest.approx(sum(radius["rates"]))
+
+    executed = Client(schema_root).execute(
+        QUERY, variable_values=dict(site=site, radii_set_id=99)
+    )
+    assert "not found" in executed["errors"][0]["message"]
+
+
+def test_radii_summary_has_no_maximum_distance(archive_fixture_tiny):
+    site = dict(
+        model_id=MODEL_ID,
+        fault_system="CRU",
+        location_id="WLG",
+        maximum_distance_km=10,
+    )
+    executed = Client(schema_root).execute(
+        QUERY, variable_values=dict(site=site, radii_set_id=6)
+    )
+    assert "maximum_distance_km" in executed["errors"][0]["message"]
+
+
+def test_radii_summary_offloaded():
+    assert "location_radii_summary" in HEAVY_FIELDS
+    assert "location_radii_summary" in OFFLOAD_FIELDS
@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.composite_solution.mfd import MFD_BIN_CENTERS, build_mfd
+
+MODEL_ID = "NSHM_v1.0.4"
+
+
+def reference_build_mfd(
+    fault_sections_gdf: pd.DataFrame,
+    rate_col: str,
+    magnitude_col: str,
+    min_mag: float = 6.8,
+    max_mag: float = 9.8,
+) -> pd.DataFrame:
+    """The pd.cut implementation replaced by mfd.build_mfd()."""
+    bins = [round(x / 100, 2) for x in range(500, 1000, 10)]
+    df = pd.DataFrame(
+        {
+            "rate": fault_sections_gdf[rate_col],
+            "magnitude": fault_sections_gdf[magnitude_col],
+        }
+    )
+    df["bins"] = pd.cut(df["magnitude"], bins=bins)
+    df["bin_center"] = df["bins"].apply(lambda x: x.mid)
+    df = df.drop(columns=["magnitude"])
+    df = pd.DataFrame(df.groupby(df.bin_center, observed=False).sum(numeric_only=True))
+    df["cumulative_rate"] = df.loc[::-1, "rate"].cumsum()[::-1]
+    df = df.reset_index()
+    df.bin_center = pd.to_numeric(df.bin_center)
+    df = df[df.bin_center.between(min_mag, max_mag)]
+    return df.reset_index(drop=True)
+
+
+def random_ruptures(count: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            # include values on the bin edges and outside the bin range
+            "Magnitude": np.concatenate(
+                [rng.uniform(4.5, 10.5, count - 4), [5.0, 6.8, 6.9, 9.9]]
+            ),
+            "rate_weighted_mean": rng.uniform(1e-9, 1e-3, count),
+        }
+    )
+
+
+@pytest.mark.parametrize("count", [4, 100, 10000])
+def test_build_mfd_matches_reference(count):
+    ruptures = random_ruptures(count)
+    pd.testing.assert_frame_equal(
+        build_mfd(ruptures),
+        reference_build_mfd(ruptures, "rate_weighted_mean", "Magnitude"),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_build_mfd_empty():
+    mfd = build_mfd(pd.DataFrame(dict(Magnitude=[], rate_weighted_mean=[])))
+    assert list(mfd.bin_center) == list(
+        MFD_BIN_CENTERS[(MFD_BIN_CENTERS >= 6.8) & (MFD_BIN_CENTERS <= 9.8)]
+    )
+    assert (mfd.rate == 0).all()
+    assert (mfd.cumulative_rate == 0).all()
+
+
+@pytest.mark.parametrize("fault_system", ["CRU", "HIK", "PUY"])
+def test_mfd_histogram_matches_reference(archive_fixture_tiny, fault_system):
+    filter_key = FilterKey.create(MODEL_ID, fault_system)
+    ruptures = cached.matched_rupture_sections(filter_key)
+    pd.testing.assert_frame_equal(
+        cached.mfd_histogram(filter_key),
+        reference_build_mfd(ruptures, "rate_weighted_mean", "Magnitude"),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+@pytest.mark.slow
+def test_build_mfd_benchmark():
+    ruptures = random_ruptures(200000)
+
+    tic0 = time.perf_counter()
+    reference_build_mfd(ruptures, "rate_weighted_mean", "Magnitude")
+    tic1 = time.perf_counter()
+    build_mfd(ruptures)
+    tic2 = time.perf_counter()
+
+    print(f"pd.cut: {tic1 - tic0:2.4f}s, digitize/bincount: {tic2 - tic1:2.4f}s")
+    assert tic2 - tic1 < tic1 - tic0
@@ -0,0 +1,71 @@
+import pytest
+from graphene.test import Client
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.schema import schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+
+QUERY = """
+query {
+  mfd_histograms(
+    filters: [
+      {model_id: "NSHM_v1.0.4" fault_system: "CRU"}
+      {model_id: "NSHM_v1.0.4" fault_system: "HIK"}
+      {model_id: "NSHM_v1.0.4" fault_system: "PUY" minimum_mag: 7.2}
+      {model_id: "NSHM_v1.0.4" fault_system: "CRU"}
+    ]
+  )
+  {
+    bin_centers
+    histograms {
+      filter_arguments { fault_system minimum_mag }
+      rates
+      cumulative_rates
+    }
+  }
+}
+"""
+
+
+@pytest.fixture
+def client():
+    return Client(schema_root)
+
+
+def test_mfd_histograms(client, archive_fixture_tiny):
+    executed = client.execute(QUERY)
+    print(executed)
+    result = executed["data"]["mfd_histograms"]
+
+    assert result["bin_centers"][0] == pytest.approx(6.85)
+    assert len(result["histograms"]) == 4
+    assert [h["filter_arguments"]["fault_system"] for h in result["histograms"]] == [
+        "CRU",
+        "HIK",
+        "PUY",
+        "CRU",
+    ]
+    assert result["histograms"][0] == result["histograms"][3]
+
+    for histogram, filter_key in zip(
+        result["histograms"],
+        [
+            FilterKey.create(MODEL_ID, "CRU"),
+            FilterKey.create(MODEL_ID, "HIK"),
+            FilterKey.create(MODEL_ID, "PUY", min_mag=7.2),
+        ],
+    ):
+        expected = cached.mfd_histogram(filter_key)
+        assert len(histogram["rates"]) == len(result["bin_centers"])
+        assert result["bin_centers"] == pytest.approx(expected.bin_center.tolist())
+        assert histogram["rates"] == pytest.approx(expected.rate.tolist())
+        assert histogram["cumulative_rates"] == pytest.approx(
+            expected.cumulative_rate.tolist()
+        )
+
+
+def test_mfd_histograms_empty(client, archive_fixture_tiny):
+    executed = client.execute("query { mfd_histograms(filters: []) { bin_centers } }")
+    assert executed["data"]["mfd_histograms"]["bin_centers"] == []
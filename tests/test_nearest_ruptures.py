@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+import shapely
+from graphene.test import Client
+from nzshm_common.location.location import location_by_id
+
+from solvis_graphql_api.asgi import OFFLOAD_FIELDS
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.location_filter import SectionLocationFilter
+from solvis_graphql_api.composite_solution.rupture_section_matrix import (
+    RuptureSectionMatrix,
+)
+from solvis_graphql_api.execution import ThreadPoolExecutionContext
+from solvis_graphql_api.schema import schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+
+WLG = location_by_id("WLG")
+
+QUERY = """
+query ($site: NearestRupturesArgsInput!, $first: Int, $after: String) {
+    nearest_ruptures(site: $site, first: $first, after: $after) {
+        total_count
+        pageInfo { endCursor hasNextPage }
+        edges {
+            distance_km
+            node { fault_system rupture_index rate_weighted_mean }
+        }
+    }
+}
+"""
+
+
+@pytest.mark.parametrize("fault_system", ["CRU", "PUY", "HIK"])
+def test_rupture_distances(archive_fixture_tiny, fault_system):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions[fault_system]
+    location_filter = cached.get_section_location_filter(MODEL_ID, fault_system, fss)
+    lat, lon = WLG["latitude"], WLG["longitude"]
+
+    distances = location_filter.rupture_distances(lat, lon)
+    assert len(distances) == len(location_filter.matrix.rupture_ids)
+
+    # a rupture is within a radius when any of its sections is
+    for radius_km in [50, 200]:
+        np.testing.assert_array_equal(
+            location_filter.matrix.rupture_ids[distances <= radius_km],
+            location_filter.rupture_ids_for_locations([(lat, lon)], radius_km),
+        )
+
+
+def section_location_filter(section_ids, matrix_section_ids):
+    # one point section per id, the nth section is n degrees of latitude south of the site
+    geometries = np.asarray(
+        [shapely.Point(174.0, -40.0 - section_id) for section_id in section_ids],
+        dtype=object,
+    )
+    matrix = RuptureSectionMatrix(
+        rupture_ids=np.array([0, 1]),
+        section_ids=np.asarray(matrix_section_ids, dtype=float),
+        indptr=np.array([0, 1, 3]),
+        indices=np.array([2, 0, 1]),
+        rates=np.array([1e-3, 1e-4]),
+        magnitudes=np.array([7.0, 7.5]),
+    )
+    return SectionLocationFilter(
+        np.asarray(section_ids, dtype=float), geometries, matrix
+    )
+
+
+def test_rupture_distances_unsorted_sections():
+    location_filter = section_location_filter([3, 1, 2], [1, 2, 3])
+    distances = location_filter.rupture_distances(-40.0, 174.0)
+    # rupture 0 is on section 3, rupture 1 on sections 1 and 2
+    np.testing.assert_allclose(distances / distances[1], [3.0, 1.0], rtol=1e-3)
+
+
+def test_rupture_distances_missing_section():
+    location_filter = section_location_filter([1, 3], [1, 2, 3])
+    with pytest.raises(ValueError, match="2.0"):
+        location_filter.rupture_distances(-40.0, 174.0)
+
+
+def test_nearest_ruptures_ordering(archive_fixture_tiny):
+    ruptures = cached.nearest_ruptures(
+        MODEL_ID, "CRU", lat=WLG["latitude"], lon=WLG["longitude"], min_rate=1e-6
+    )
+    assert len(ruptures)
+    assert (ruptures.rate_weighted_mean > 1e-6).all()
+    assert ruptures.distance_km.is_monotonic_increasing
+    for _, ties in ruptures.groupby("distance_km"):
+        assert ties.rate_weighted_mean.is_monotonic_decreasing
+
+    median_km = float(ruptures.distance_km.median())
+    within = cached.nearest_ruptures(
+        MODEL_ID,
+        "CRU",
+        lat=WLG["latitude"],
+        lon=WLG["longitude"],
+        max_distance_km=median_km,
+        min_rate=1e-6,
+    )
+    assert 0 < len(within) < len(ruptures)
+    assert (within.distance_km <= median_km).all()
+
+
+def test_nearest_ruptures_query_pages(archive_fixture_tiny):
+    site = dict(model_id=MODEL_ID, fault_system="CRU", location_id="WLG")
+    expected = cached.nearest_ruptures(
+        MODEL_ID, "CRU", lat=WLG["latitude"], lon=WLG["longitude"]
+    )
+
+    edges, after = [], None
+    for _ in range(2):
+        executed = Client(schema_root).execute(
+            QUERY, variable_values=dict(site=site, first=3, after=after)
+        )
+        assert "errors" not in executed, executed
+        connection = executed["data"]["nearest_ruptures"]
+        assert connection["total_count"] == len(expected)
+        assert connection["pageInfo"]["hasNextPage"]
+        edges += connection["edges"]
+        after = connection["pageInfo"]["endCursor"]
+
+    assert [edge["node"]["rupture_index"] for edge in edges] == list(
+        expected["Rupture Index"][:6]
+    )
+    assert [edge["distance_km"] for edge in edges] == pytest.approx(
+        list(expected.distance_km[:6])
+    )
+
+
+def test_nearest_ruptures_query_point(archive_fixture_tiny):
+    point = dict(latitude=WLG["latitude"], longitude=WLG["longitude"])
+    results = [
+        Client(schema_root).execute(
+            QUERY,
+            variable_values=dict(
+                site=dict(model_id=MODEL_ID, fault_system="PUY", **site), first=4
+            ),
+        )
+        for site in [dict(location_id="WLG"), dict(point=point)]
+    ]
+    assert results[0] == results[1]
+
+    executed = Client(schema_root).execute(
+        QUERY, variable_values=dict(site=dict(model_id=MODEL_ID, fault_system="PUY"))
+    )
+    assert "`location_id` or `point` is required" in executed["errors"][0]["message"]
+
+
+def test_nearest_ruptures_resolved_in_thread_pool(archive_fixture_tiny):
+    assert "nearest_ruptures" in OFFLOAD_FIELDS
+    query = QUERY.replace("nearest_ruptures(", "about\n    nearest_ruptures(")
+    variable_values = dict(
+        site=dict(model_id=MODEL_ID, fault_system="CRU", location_id="WLG"), first=3
+    )
+    serial = schema_root.execute(query, variable_values=variable_values)
+    concurrent = schema_root.execute(
+        query,
+        variable_values=variable_values,
+        execution_context_class=ThreadPoolExecutionContext,
+    )
+    assert serial.errors is None
+    assert concurrent.errors is None
+    assert concurrent.data == serial.data
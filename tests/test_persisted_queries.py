@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from solvis_graphql_api import http_cache, persisted_queries
+from solvis_graphql_api.persisted_queries import (
+    PERSISTED_QUERY_NOT_FOUND,
+    DocumentCache,
+    query_hash,
+)
+from solvis_graphql_api.schema import schema_root
+from solvis_graphql_api.solvis_graphql_api import create_app
+
+QUERY = "query ($id: Int!) { get_radii_set(radii_set_id: $id) { radii_set_id radii } }"
+
+
+def apq(sha256_hash):
+    return dict(persistedQuery=dict(version=1, sha256Hash=sha256_hash))
+
+
+@pytest.fixture
+def client():
+    persisted_queries.document_cache.clear()
+    http_cache.response_cache.clear()
+    app = create_app()
+    app.testing = True
+    yield app.test_client()
+    persisted_queries.document_cache.clear()
+    http_cache.response_cache.clear()
+
+
+def test_document_cache_skips_parse(monkeypatch):
+    cache = DocumentCache(maxsize=2)
+    schema = schema_root.graphql_schema
+    document, errors = cache.get_document(schema, QUERY)
+    assert not errors
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query parsed again")
+
+    monkeypatch.setattr(persisted_queries, "parse", fail)
+    monkeypatch.setattr(persisted_queries, "validate", fail)
+    assert cache.get_document(schema, QUERY) == (document, [])
+    assert cache.get_document(schema, None, query_hash(QUERY)) == (document, [])
+
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["currsize"]) == (2, 1, 1)
+    assert info["seconds_saved"] > 0
+
+
+def test_document_cache_invalid_queries():
+    cache = DocumentCache()
+    schema = schema_root.graphql_schema
+    document, errors = cache.get_document(schema, "query { nope }")
+    assert document is None
+    assert "nope" in errors[0].message
+    assert cache.get_document(schema, "query {")[0] is None
+    assert cache.info()["currsize"] == 0
+
+
+def test_apq_register_and_execute(client):
+    sha256_hash = query_hash(QUERY)
+    body = dict(variables=dict(id=2), extensions=apq(sha256_hash))
+
+    not_found = client.post("/graphql", json=body)
+    assert json.loads(not_found.data)["errors"][0]["message"] == (
+        PERSISTED_QUERY_NOT_FOUND
+    )
+
+    registered = client.post("/graphql", json=dict(query=QUERY, **body))
+    assert json.loads(registered.data)["data"]["get_radii_set"]["radii_set_id"] == 2
+
+    # hash only, over GET as sent by Apollo clients
+    response = client.get(
+        "/graphql",
+        query_string=dict(
+            variables=json.dumps(dict(id=3)), extensions=json.dumps(body["extensions"])
+        ),
+    )
+    assert response.status_code == 200
+    assert json.loads(response.data)["data"]["get_radii_set"]["radii_set_id"] == 3
+    assert response.headers["Cache-Control"].startswith("public")
+    assert persisted_queries.document_cache.info()["hits"] == 1
+
+
+def test_apq_hash_mismatch(client):
+    response = client.post(
+        "/graphql",
+        json=dict(query=QUERY, variables=dict(id=2), extensions=apq("0" * 64)),
+    )
+    assert response.status_code == 400
+    assert "sha does not match" in json.loads(response.data)["errors"][0]["message"]
+
+
+def test_plain_queries_use_document_cache(client):
+    for radii_set_id in [1, 2]:
+        response = client.post(
+            "/graphql", json=dict(query=QUERY, variables=dict(id=radii_set_id))
+        )
+        assert json.loads(response.data)["data"]["get_radii_set"]["radii"]
+    assert persisted_queries.document_cache.info()["hits"] == 1
+
+    # a missing variable is an execution error, as for GraphQLView
+    response = client.post("/graphql", json=dict(query=QUERY))
+    assert response.status_code == 400
+    assert "errors" in json.loads(response.data)
@@ -0,0 +1,176 @@
+"""
+Check the cached query functions use the second-tier (persistent) query cache.
+"""
+
+import pandas as pd
+import pytest
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.data_store import query_cache
+from solvis_graphql_api.schema import schema_root
+
+MODEL_ID = "NSHM_v1.0.4"
+SECRET = b"test secret"
+
+FILTER_SET_OPTIONS = frozenset(
+    dict(multiple_locations=2, multiple_faults=1, locations_and_faults=2).items()
+)
+
+
+@pytest.fixture
+def filesystem_query_cache(monkeypatch, tmp_path):
+    cache = query_cache.QueryCache(
+        query_cache.FilesystemQueryCacheBackend(tmp_path), SECRET
+    )
+    monkeypatch.setattr(cached, "get_query_cache", lambda: cache)
+    yield cache
+
+
+def test_matched_rupture_sections_persisted(
+    archive_fixture_tiny, filesystem_query_cache, monkeypatch
+):
+    args = (MODEL_ID, "CRU", ("AKL",), 100)
+    kwargs = dict(
+        min_rate=1e-20,
+        max_rate=None,
+        min_mag=None,
+        max_mag=None,
+        filter_set_options=FILTER_SET_OPTIONS,
+    )
+    cached.matched_rupture_sections.cache_clear()
+    computed = cached.matched_rupture_sections_gdf(*args, **kwargs)
+
+    # a recycled container has empty in-process caches and must not load the solution
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+
+    def fail(model_id, fault_system=None):
+        raise AssertionError("composite solution should not be loaded")
+
+    monkeypatch.setattr(cached, "get_composite_solution", fail)
+    monkeypatch.setattr(cached, "get_fault_system_solution", fail)
+    persisted = cached.matched_rupture_sections_gdf(*args, **kwargs)
+    cached.matched_rupture_sections.cache_clear()
+
+    pd.testing.assert_frame_equal(persisted, computed)
+
+
+def test_fault_section_aggregates_persisted(
+    archive_fixture_tiny, filesystem_query_cache
+):
+    args = (MODEL_ID, "CRU", ("AKL",), 100, 1e-20, None, None, None, FILTER_SET_OPTIONS)
+    cached.fault_section_aggregates.cache_clear()
+    computed = cached.fault_section_aggregates_gdf(*args, trace_only=True)
+    filter_key = FilterKey.create(
+        MODEL_ID,
+        "CRU",
+        location_ids=("AKL",),
+        radius_km=100,
+        filter_set_options=FILTER_SET_OPTIONS,
+    )
+    traces_key = query_cache.canonical_key(
+        "fault_section_aggregates",
+        cached.query_arguments(dict(filter_key.as_dict(), trace_only=True)),
+    )
+    assert filesystem_query_cache.backend.get(traces_key) is not None
+
+    cached.fault_section_aggregates.cache_clear()
+    persisted = cached.fault_section_aggregates_gdf(*args, trace_only=True)
+    cached.fault_section_aggregates.cache_clear()
+
+    pd.testing.assert_frame_equal(persisted, computed)
+
+
+DEFAULT_VIEW_QUERY = """
+query {
+  composite_solution(model_id: "NSHM_v1.0.4") { fault_systems }
+  get_parent_fault_names(model_id: "NSHM_v1.0.4", fault_system: "CRU")
+  filter_rupture_sections(
+    filter: {model_id: "NSHM_v1.0.4", fault_system: "CRU", location_ids: [], radius_km: 10}
+  ) {
+    section_count
+    fault_surfaces
+    fault_traces
+    mfd_histogram { bin_center rate cumulative_rate }
+  }
+}
+"""
+
+
+def clear_default_view_caches():
+    for function in [
+        cached.matched_rupture_sections,
+        cached.fault_section_aggregates,
+        cached.mfd_histogram,
+        cached.get_fault_systems,
+        cached.get_parent_fault_names,
+    ]:
+        function.cache_clear()
+    cached.superset_results.clear()
+
+
+def test_default_view_served_from_artefacts(
+    archive_fixture_tiny, tmp_path, monkeypatch
+):
+    clear_default_view_caches()
+    computed = schema_root.execute(DEFAULT_VIEW_QUERY)
+    assert computed.errors is None
+
+    cache = query_cache.QueryCache(
+        query_cache.FilesystemQueryCacheBackend(tmp_path), SECRET
+    )
+    stored = cached.precompute_default_artefacts(MODEL_ID, cache)
+    assert len(stored) == 1 + 3 * 5
+    assert ("parent_fault_names", dict(model_id=MODEL_ID, fault_system="HIK")) in stored
+
+    # the API serves the default view without loading the solution, whatever its location engine
+    clear_default_view_caches()
+    monkeypatch.setattr(cached, "get_query_cache", lambda: cache)
+    monkeypatch.setattr(cached, "LOCATION_FILTER_ENGINE", "other engine")
+
+    def fail(model_id, fault_system=None):
+        raise AssertionError("composite solution should not be loaded")
+
+    monkeypatch.setattr(cached, "get_composite_solution", fail)
+    monkeypatch.setattr(cached, "get_fault_system_solution", fail)
+    persisted = schema_root.execute(DEFAULT_VIEW_QUERY)
+    clear_default_view_caches()
+
+    assert persisted.errors is None
+    assert persisted.data == computed.data
+
+
+def test_location_filter_engine_keys_only_location_filters(archive_fixture_tiny):
+    unfiltered = FilterKey.create(MODEL_ID, "CRU").as_dict()
+    assert "location_filter_engine" not in cached.query_arguments(unfiltered)
+
+    for location_arguments in [
+        dict(location_ids=["AKL"], radius_km=100),
+        dict(points=[(-36.85, 174.76)], radius_km=100),
+    ]:
+        filter_key = FilterKey.create(MODEL_ID, "CRU", **location_arguments)
+        arguments = cached.query_arguments(filter_key.as_dict())
+        assert arguments["location_filter_engine"] == cached.LOCATION_FILTER_ENGINE
+
+
+def test_reuploaded_archive_is_a_miss(archive_fixture_tiny, filesystem_query_cache):
+    arguments = dict(model_id=MODEL_ID, fault_system="CRU")
+    cached.persisted_query(
+        "parent_fault_names",
+        arguments,
+        lambda: cached._parent_fault_names(MODEL_ID, "CRU"),
+    )
+    assert (
+        filesystem_query_cache.get_dataframe(
+            "parent_fault_names", cached.query_arguments(arguments)
+        )
+        is not None
+    )
+    assert (
+        filesystem_query_cache.get_dataframe(
+            "parent_fault_names",
+            dict(cached.query_arguments(arguments), archive="re-uploaded"),
+        )
+        is None
+    )
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.rupture_section_matrix import (
+    RuptureSectionMatrix,
+)
+
+MODEL_ID = "NSHM_v1.0.4"
+
+
+def pivot_aggregates(fsr: pd.DataFrame) -> pd.DataFrame:
+    """The reference implementation replaced by RuptureSectionMatrix.section_aggregates()."""
+    section_aggregates = fsr.pivot_table(
+        index=["section"],
+        aggfunc=dict(
+            rate_weighted_mean=["sum", "min", "max", "mean"],
+            Magnitude=["count", "min", "max", "mean"],
+        ),
+    )
+    section_aggregates.columns = [
+        ".".join(a) for a in section_aggregates.columns.to_flat_index()
+    ]
+    return section_aggregates
+
+
+@pytest.mark.parametrize("fault_system", ["CRU", "HIK", "PUY"])
+def test_section_aggregates_match_pivot_table(archive_fixture_tiny, fault_system):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions[fault_system]
+    fsr = fss.model.fault_sections_with_rupture_rates
+    matrix = RuptureSectionMatrix.from_fault_sections_with_rupture_rates(fsr)
+
+    assert matrix.nnz == len(fsr)
+
+    rupture_ids = fsr["Rupture Index"].unique()
+    for selection in [rupture_ids, rupture_ids[::2], rupture_ids[-3:]]:
+        aggregates = matrix.section_aggregates(selection)
+        expected = pivot_aggregates(fsr[fsr["Rupture Index"].isin(selection)])
+        # pivot_table drops the Magnitude columns when every magnitude is NA, the matrix keeps them
+        pd.testing.assert_frame_equal(aggregates[expected.columns], expected)
+        if "Magnitude.count" not in expected.columns:
+            assert (aggregates["Magnitude.count"] == 0).all()
+            assert aggregates["Magnitude.mean"].isna().all()
+
+
+def test_section_aggregates_empty_selection(archive_fixture_tiny):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["PUY"]
+    matrix = cached.get_rupture_section_matrix(MODEL_ID, "PUY", fss)
+    assert matrix.section_aggregates([]).empty
+    assert matrix.section_aggregates([-1]).empty
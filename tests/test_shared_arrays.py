@@ -0,0 +1,141 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.shared_arrays import (
+    load_rupture_section_matrix,
+    load_ruptures_frame,
+    matrix_path,
+    ruptures_path,
+    save_rupture_section_matrix,
+    save_ruptures_frame,
+)
+
+MODEL_ID = "NSHM_v1.0.4"
+ARCHIVE_VERSION = "tiny"
+
+
+def worker_section_aggregates(root, rupture_ids):
+    matrix = load_rupture_section_matrix(root, MODEL_ID, ARCHIVE_VERSION, "PUY")
+    assert isinstance(matrix.indices, np.memmap)
+    return matrix.section_aggregates(rupture_ids)
+
+
+def worker_ruptures(root):
+    ruptures = load_ruptures_frame(root, MODEL_ID, ARCHIVE_VERSION, "PUY")
+    return ruptures[ruptures.Magnitude > 7]
+
+
+def test_save_and_map(archive_fixture_tiny, tmp_path):
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["PUY"]
+    matrix = cached.get_rupture_section_matrix(MODEL_ID, "PUY", fss)
+    assert (
+        load_rupture_section_matrix(tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY") is None
+    )
+
+    folder = save_rupture_section_matrix(
+        matrix, tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY"
+    )
+    assert folder == matrix_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY")
+    assert list(folder.parent.iterdir()) == [folder]
+
+    # saving again is a no-op
+    assert (
+        save_rupture_section_matrix(matrix, tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY")
+        == folder
+    )
+
+    # the arrays of another archive version are not shared
+    assert load_rupture_section_matrix(tmp_path, MODEL_ID, "other", "PUY") is None
+
+    rupture_ids = matrix.rupture_ids[::2]
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        results = pool.starmap(worker_section_aggregates, [(tmp_path, rupture_ids)] * 2)
+    for result in results:
+        pd.testing.assert_frame_equal(result, matrix.section_aggregates(rupture_ids))
+
+
+def test_save_and_map_ruptures(archive_fixture_tiny, tmp_path):
+    ruptures = (
+        cached.get_composite_solution(MODEL_ID)
+        ._solutions["PUY"]
+        .model.ruptures_with_rupture_rates
+    )
+    assert load_ruptures_frame(tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY") is None
+
+    folder = save_ruptures_frame(ruptures, tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY")
+    assert folder == ruptures_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY")
+
+    mapped = load_ruptures_frame(tmp_path, MODEL_ID, ARCHIVE_VERSION, "PUY")
+    pd.testing.assert_frame_equal(mapped, ruptures)
+    assert isinstance(mapped["rate_weighted_mean"].to_numpy().base, np.memmap)
+    assert isinstance(mapped["Magnitude"].array._data, np.memmap)
+
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        results = pool.map(worker_ruptures, [tmp_path] * 2)
+    for result in results:
+        pd.testing.assert_frame_equal(result, ruptures[ruptures.Magnitude > 7])
+
+
+def test_get_rupture_section_matrix_shares_arrays(
+    archive_fixture_tiny, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(cached, "SOLUTION_ARRAYS_PATH", str(tmp_path))
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["HIK"]
+    cached.get_rupture_section_matrix.cache_clear()
+
+    built = cached.get_rupture_section_matrix(MODEL_ID, "HIK", fss)
+    assert not isinstance(built.indices, np.memmap)
+    assert matrix_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, "HIK").exists()
+
+    # another process (simulated by clearing the cache) maps the saved arrays
+    cached.get_rupture_section_matrix.cache_clear()
+    mapped = cached.get_rupture_section_matrix(MODEL_ID, "HIK", fss)
+    assert isinstance(mapped.indices, np.memmap)
+    pd.testing.assert_frame_equal(
+        mapped.section_aggregates(mapped.rupture_ids),
+        built.section_aggregates(built.rupture_ids),
+    )
+    cached.get_rupture_section_matrix.cache_clear()
+
+
+def test_get_ruptures_with_rupture_rates_shares_arrays(
+    archive_fixture_tiny, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(cached, "SOLUTION_ARRAYS_PATH", str(tmp_path))
+    fss = cached.get_composite_solution(MODEL_ID)._solutions["HIK"]
+    cached.get_ruptures_with_rupture_rates.cache_clear()
+
+    built = cached.get_ruptures_with_rupture_rates(MODEL_ID, "HIK", fss)
+    assert built is fss.model.ruptures_with_rupture_rates
+    assert ruptures_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, "HIK").exists()
+
+    cached.get_ruptures_with_rupture_rates.cache_clear()
+    mapped = cached.get_ruptures_with_rupture_rates(MODEL_ID, "HIK", fss)
+    assert isinstance(mapped["rate_weighted_mean"].to_numpy().base, np.memmap)
+    pd.testing.assert_frame_equal(mapped, built)
+    cached.get_ruptures_with_rupture_rates.cache_clear()
+
+
+def test_preload_solution_arrays(archive_fixture_tiny, tmp_path, monkeypatch):
+    monkeypatch.setattr(cached, "SOLUTION_ARRAYS_PATH", str(tmp_path))
+    cached.get_rupture_section_matrix.cache_clear()
+    cached.get_ruptures_with_rupture_rates.cache_clear()
+
+    # the fixture solutions are not loaded through get_fault_system_solution
+    def get_fault_system_solution(model_id, fault_system):
+        fss = cached.get_composite_solution(model_id)._solutions[fault_system]
+        cached.get_ruptures_with_rupture_rates(model_id, fault_system, fss)
+        cached.get_rupture_section_matrix(model_id, fault_system, fss)
+        return fss
+
+    monkeypatch.setattr(cached, "get_fault_system_solution", get_fault_system_solution)
+    cached.preload_solution_arrays([MODEL_ID])
+
+    for fault_system in cached.FAULT_SYSTEMS:
+        assert matrix_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, fault_system).exists()
+        assert ruptures_path(tmp_path, MODEL_ID, ARCHIVE_VERSION, fault_system).exists()
+    cached.get_rupture_section_matrix.cache_clear()
+    cached.get_ruptures_with_rupture_rates.cache_clear()
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from solvis_graphql_api.composite_solution import cached
+from solvis_graphql_api.composite_solution.filter_key import FilterKey
+from solvis_graphql_api.composite_solution.subsumption import SupersetResults
+
+MODEL_ID = "NSHM_v1.0.4"
+
+
+@pytest.fixture
+def clear_caches():
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+    yield
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+
+
+@pytest.mark.parametrize(
+    "wide, narrow, expected",
+    [
+        (dict(min_mag=7), dict(min_mag=7.5), True),
+        (dict(min_mag=7), dict(min_mag=7), True),
+        (dict(min_mag=7.5), dict(min_mag=7), False),
+        (dict(), dict(min_mag=7, max_mag=8), True),
+        (dict(max_mag=8), dict(max_mag=7.5), True),
+        (dict(max_mag=8), dict(), False),
+        (dict(min_rate=1e-6), dict(min_rate=1e-5, max_rate=1e-3), True),
+        (dict(min_rate=1e-5), dict(), False),
+        (dict(min_mag=7), dict(min_mag=7.5, location_ids=["WLG"]), False),
+    ],
+)
+def test_covers(wide, narrow, expected):
+    assert (
+        FilterKey.create(MODEL_ID, "PUY", **wide).covers(
+            FilterKey.create(MODEL_ID, "PUY", **narrow)
+        )
+        is expected
+    )
+
+
+def test_superset_results_eviction():
+    results = SupersetResults(maxsize=2)
+    df = pd.DataFrame(dict(Magnitude=[7.0, 8.0], rate_weighted_mean=[1e-3, 1e-4]))
+    for min_mag in [6, 6.5, 6.8]:
+        results.put(FilterKey.create(MODEL_ID, "PUY", min_mag=min_mag), df)
+    assert len(results) == 2
+    assert results.get(FilterKey.create(MODEL_ID, "PUY", min_mag=6.6)) is not None
+    assert results.get(FilterKey.create(MODEL_ID, "PUY", min_mag=6.2)) is None
+
+
+def test_narrow_filter_answered_from_superset(
+    archive_fixture_tiny, clear_caches, monkeypatch
+):
+    wide = cached.matched_rupture_sections(
+        FilterKey.create(MODEL_ID, "PUY", min_mag=7.0)
+    )
+    narrow_key = FilterKey.create(MODEL_ID, "PUY", min_mag=7.5, max_rate=1e-3)
+    expected = narrow_key.filter_attributes(wide)
+
+    def fail(model_id, fault_system=None):
+        raise AssertionError("composite solution should not be used")
+
+    with monkeypatch.context() as mp:
+        mp.setattr(cached, "get_composite_solution", fail)
+        mp.setattr(cached, "get_fault_system_solution", fail)
+        narrow = cached.matched_rupture_sections(narrow_key)
+
+    assert cached.query_cache_info()["superset_results"]["hits"] == 1
+    assert list(narrow["Rupture Index"]) == [8, 10, 11, 12]
+    pd.testing.assert_frame_equal(narrow, expected)
+
+    # and the result agrees with a full evaluation
+    cached.matched_rupture_sections.cache_clear()
+    cached.superset_results.clear()
+    pd.testing.assert_frame_equal(cached.matched_rupture_sections(narrow_key), narrow)